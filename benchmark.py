@@ -0,0 +1,438 @@
+# Joey: Pipeline Benchmarks (OkDriver Project)
+# Measures the cost of individual stages of Joey's pipeline so changes can be compared.
+#
+# Usage:
+#   python benchmark.py resample [--rate 48000] [--seconds 20] [--wav recording.wav]
+#   python benchmark.py intent [--sizes 250 1000 5000 20000 50000] [--queries 500]
+#   python benchmark.py e2e --clips clips/labels.jsonl [--speed 1] [--policy both] [--command-mode off] [--no-early-commit] [--asr-alternatives 3]
+#   python benchmark.py sessions --clips clips/labels.jsonl [--sessions 1 2 4 8 16] [--workers 4] [--rounds 2]
+#   python benchmark.py vehicle [--seconds 5] [--reads 100000] [--commands 50] [--rate 10]
+#   python benchmark.py tts [--backends espeak gtts] [--repeats 3]
+#
+# The e2e manifest has one labelled clip per line, with paths relative to the manifest:
+#   {"wav": "en/ask_time_01.wav", "lang": "en", "intent": "ask_time"}
+# A compound command is labelled with its intents in order:
+#   {"wav": "hi/ac_and_music_01.wav", "lang": "hi", "intent": ["turn_ac_on", "play_music"]}
+
+import argparse
+import asyncio
+import base64
+import collections
+import contextlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+
+import main
+
+
+# --- Helpers ---
+
+def synthetic_speech(rate, seconds, seed=0):
+    """Speech-like int16 audio: a gliding harmonic voice gated into syllables, over cabin noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(rate * seconds)) / rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = (np.sin(2 * np.pi * 3.0 * t) > 0).astype(float)
+    audio = 6000 * voice * syllables + rng.normal(0, 200, len(t))
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def split_blocks(audio, rate):
+    block = int(rate * main.BLOCK_DURATION_MS / 1000)
+    return [audio[i:i + block] for i in range(0, len(audio) - block + 1, block)]
+
+
+def cpu_per_block(blocks, fn):
+    """Runs fn over every block and returns the per-block CPU times in milliseconds."""
+    times = []
+    for block in blocks:
+        start = time.process_time()
+        fn(block)
+        times.append((time.process_time() - start) * 1000)
+    return np.array(times)
+
+
+def report(rows, audio_seconds):
+    print(f"{'stage':<34}{'mean ms/block':>14}{'p95 ms/block':>14}{'cpu s / audio s':>17}")
+    for name, times in rows:
+        print(f"{name:<34}{times.mean():>14.3f}{np.percentile(times, 95):>14.3f}{times.sum() / 1000 / audio_seconds:>17.4f}")
+
+
+def grow_intents(size, seed=0):
+    """
+    Joey's intent table padded with synthetic intents until it holds about `size` phrases.
+    Synthetic words follow a Zipf-like distribution so postings lists look like a real vocabulary.
+    """
+    rng = np.random.default_rng(seed)
+    intents = {intent: list(phrases) for intent, phrases in main.INTENTS.items()}
+    count = sum(len(phrases) for phrases in intents.values())
+    vocabulary = [f"w{i}" for i in range(max(200, size // 2))]
+    ranks = np.arange(1, len(vocabulary) + 1)
+    probabilities = (1 / ranks) / (1 / ranks).sum()
+    while count < size:
+        phrases = [' '.join(rng.choice(vocabulary, rng.integers(2, 6), p=probabilities)) for _ in range(8)]
+        intents[f"synthetic_{len(intents)}"] = phrases
+        count += len(phrases)
+    return intents
+
+
+def load_clips(manifest):
+    """Reads a JSON-lines manifest of labelled clips, resolving WAV paths relative to it."""
+    base = os.path.dirname(manifest)
+    with open(manifest, encoding='utf-8') as f:
+        clips = [json.loads(line) for line in f if line.strip()]
+    for clip in clips:
+        clip['wav'] = os.path.join(base, clip['wav'])
+    return clips
+
+
+# --- Benchmarks ---
+
+def bench_resample(args):
+    """Per-block CPU of decoding at the device rate versus resampling to 16 kHz first."""
+    if args.wav:
+        audio, rate = main.read_wav(args.wav)
+    else:
+        rate = args.rate
+        audio = synthetic_speech(rate, args.seconds)
+    blocks = split_blocks(audio, rate)
+    audio_seconds = len(blocks) * main.BLOCK_DURATION_MS / 1000
+    print(f"[BENCH] {len(blocks)} blocks of {main.BLOCK_DURATION_MS} ms at {rate} Hz -> {main.TARGET_SAMPLERATE} Hz\n")
+
+    resampler = main.PolyphaseResampler(rate, main.TARGET_SAMPLERATE)
+    rows = [('resample only', cpu_per_block(blocks, resampler.process))]
+
+    if os.path.exists(args.model):
+        from vosk import Model, KaldiRecognizer
+        model = Model(args.model)
+        rec_native = KaldiRecognizer(model, rate)
+        rows.append((f'before: decode at {rate} Hz', cpu_per_block(blocks, lambda b: rec_native.AcceptWaveform(b.tobytes()))))
+        rec_16k = KaldiRecognizer(model, main.TARGET_SAMPLERATE)
+        resampler.reset()
+        rows.append((f'after: resample + decode at {main.TARGET_SAMPLERATE} Hz',
+                     cpu_per_block(blocks, lambda b: rec_16k.AcceptWaveform(resampler.process(b).tobytes()))))
+    else:
+        print(f"[BENCH] Model not found at '{args.model}'; reporting resampler cost only.\n")
+    report(rows, audio_seconds)
+
+
+def bench_intent(args):
+    """Per-query matching latency of the dense cosine_similarity scan versus the sparse top-k IntentIndex."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    print(f"{'phrases':>8}{'dense ms/query':>16}{'index ms/query':>16}{'speedup':>9}{'agreement':>11}")
+    for size in args.sizes:
+        corpus, intent_map = main.build_corpus(grow_intents(size))
+        vectorizer = TfidfVectorizer()
+        corpus_vectors = vectorizer.fit_transform(corpus)
+        index = main.IntentIndex.from_matrix(corpus_vectors, intent_map)
+        rng = np.random.default_rng(1)
+        queries = [corpus[i] for i in rng.integers(0, len(corpus), args.queries)]
+        vectors = [vectorizer.transform([query]) for query in queries] # Same for both paths, so not timed
+
+        dense, start = [], time.perf_counter()
+        for vector in vectors:
+            similarities = cosine_similarity(vector, corpus_vectors)
+            best = np.argmax(similarities)
+            dense.append((intent_map[best], similarities[0, best]))
+        dense_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        sparse, start = [], time.perf_counter()
+        for vector in vectors:
+            sparse.append(index.top_k(vector.indices, vector.data))
+        index_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        # Exact ties may be broken differently by floating-point noise; those count as agreeing
+        agree = sum(1 for (intent, score), top in zip(dense, sparse)
+                    if (top[0][0] == intent or abs(top[0][1] - score) < 1e-9 if top else score == 0))
+        print(f"{len(corpus):>8}{dense_ms:>16.3f}{index_ms:>16.3f}{dense_ms / index_ms:>8.1f}x{agree / len(queries):>10.1%}")
+
+
+def bench_e2e(args):
+    """
+    Replays labelled clips through Joey's real turn loop (listen -> handle_command -> speak), with a null
+    speech sink instead of the speakers. Latencies are taken from each turn's trace and measured from the
+    end of the clip's speech; an early commit can answer before it, giving a negative latency.
+    """
+    if not os.path.exists(main.MODEL_EN_PATH) or not os.path.exists(main.MODEL_HI_PATH):
+        print(f"[BENCH] Vosk models not found at '{main.MODEL_EN_PATH}' and '{main.MODEL_HI_PATH}'; e2e needs both.")
+        return
+    clips = load_clips(args.clips)
+    source = main.ReplaySource(speed=args.speed)
+    sink = main.NullSpeechSink()
+    # Joey narrates every turn; keep the report readable unless asked otherwise
+    quiet = contextlib.nullcontext if args.verbose else lambda: contextlib.redirect_stdout(io.StringIO())
+    with quiet():
+        joey = main.Joey(decode_policy=args.policy, audio_source=source, speech_sink=sink, tracer=main.TurnTracer(enabled=True),
+                         early_commit=not args.no_early_commit, command_mode=args.command_mode, asr_alternatives=args.asr_alternatives)
+        for lang in ('en', 'hi'):
+            joey.wait_for_model(lang)
+
+    to_intent, intent_to_audio, to_audio, cpu = [], [], [], 0.0
+    correct = {'en': [0, 0], 'hi': [0, 0]}
+    early = collections.Counter()
+    reasks = 0 # Turns answered with "Sorry, I didn't quite get that", each costing the driver another turn
+    actions = 0 # Commands acted on; more than one per turn when compound commands are split
+    audio_start = source.seconds_delivered
+    for clip in clips:
+        joey.set_language(clip['lang'])
+        joey.wait_for_model(clip['lang']) # Model loading isn't part of a turn's latency
+        joey.context = {} # Every clip is an independent first turn
+        source.play(clip['wav'])
+        played = len(sink.played)
+        with quiet():
+            start_cpu = time.process_time()
+            joey.take_turn()
+            joey.output.wait()
+            cpu += time.process_time() - start_cpu
+        record = joey.tracer.turns[-1]
+        # The turn's final intent: an early commit that was confirmed never re-ran recognition on its own
+        intent = record.get('early_intent') if record.get('early_commit') == 'confirmed' else record.get('intent')
+        intents = record.get('intents') or [intent]
+        expected = clip.get('intent')
+        correct[clip['lang']][0] += intents == (expected if isinstance(expected, list) else [expected])
+        actions += sum(1 for intent in intents if intent is not None)
+        correct[clip['lang']][1] += 1
+        early[record.get('early_commit', 'none')] += 1
+        reasks += intent is None or (record.get('early_commit') != 'confirmed' and record.get('confidence', 0.0) < main.CONFIDENCE_THRESHOLD)
+        # Everything on the turn's own timeline, in ms since capture start
+        decided = record['stages'].get('early_commit' if record.get('early_commit') == 'confirmed' else 'intent')
+        first_audio = (sink.played[played][0] - record['monotonic']) * 1000 if len(sink.played) > played else None
+        if decided is not None and first_audio is not None:
+            intent_to_audio.append(first_audio - decided)
+        if source.speech_ended is None: continue
+        speech_end = (source.speech_ended - record['monotonic']) * 1000
+        if decided is not None: to_intent.append(decided - speech_end)
+        if first_audio is not None: to_audio.append(first_audio - speech_end)
+    joey.close()
+
+    audio_seconds = source.seconds_delivered - audio_start
+    pace = f"{args.speed:g}x real time" if args.speed else "full speed"
+    print(f"[BENCH] {len(clips)} clips, {audio_seconds:.1f} s of audio replayed at {pace}, "
+          f"decode policy '{args.policy}', command mode '{args.command_mode}', {args.asr_alternatives} ASR alternatives\n")
+    print(f"{'latency (ms)':<30}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, values in (('end of speech -> intent', to_intent), ('intent -> first audio', intent_to_audio),
+                         ('end of speech -> first audio', to_audio)):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) if values else (float('nan'),) * 3
+        print(f"{name:<30}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}")
+    print(f"\n{'cpu s / audio s':<30}{cpu / audio_seconds:>9.4f}")
+    for lang, (hits, total) in correct.items():
+        if total: print(f"{'intent accuracy (' + lang + ')':<30}{hits / total:>9.1%}  ({hits}/{total})")
+    print(f"{'actions per turn':<30}{actions / len(clips):>9.2f}")
+    print(f"{'re-asks (fallback replies)':<30}{reasks / len(clips):>9.1%}  ({reasks}/{len(clips)})")
+    if not args.no_early_commit:
+        print(f"{'early commits':<30}{sum(early.values()) - early['none']:>9}  (confirmed {early['confirmed']}, rolled back {early['rolled_back']})")
+
+
+async def drive_sessions(joey, workers, sessions, clips, rounds):
+    """
+    Runs `sessions` concurrent clients against an in-process JoeyServer, each streaming `rounds` clips
+    in 100 ms chunks as fast as the server answers. Returns (audio seconds sent, wall seconds,
+    per-request latencies, end-of-utterance latencies, intent hits, utterances).
+    """
+    server = main.JoeyServer(joey, workers)
+    with contextlib.redirect_stdout(io.StringIO()):
+        listener = await server.start('127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    sent, requests, utterances, hits = [0.0], [], [], [0]
+
+    async def client(number):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port, limit=main.SERVER_LINE_LIMIT)
+        for round_ in range(rounds):
+            clip, blocks = clips[(number + round_) % len(clips)]
+            session = f"car-{number}-{round_}" # Every clip is an independent conversation
+            for i, block in enumerate(blocks):
+                last = i == len(blocks) - 1
+                message = {'session': session, 'lang': clip['lang'], 'audio': base64.b64encode(block.tobytes()).decode('ascii'), 'final': last}
+                start = time.perf_counter()
+                writer.write((json.dumps(message) + '\n').encode('utf-8'))
+                await writer.drain()
+                reply = json.loads(await reader.readline())
+                requests.append((time.perf_counter() - start) * 1000)
+                sent[0] += len(block) / main.TARGET_SAMPLERATE
+                if reply.get('heard') is not None: # The utterance ended; the rest of the clip is trailing silence
+                    utterances.append(requests[-1])
+                    expected = clip.get('intent')
+                    hits[0] += reply['intents'] == (expected if isinstance(expected, list) else [expected])
+                    break
+            writer.write((json.dumps({'session': session, 'close': True}) + '\n').encode('utf-8'))
+            await writer.drain()
+            await reader.readline()
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(sessions)))
+    wall = time.perf_counter() - start
+    listener.close()
+    await listener.wait_closed()
+    server.close()
+    return sent[0], wall, requests, utterances, hits[0]
+
+
+def bench_sessions(args):
+    """
+    Server mode capacity: concurrent client sessions stream labelled clips through a JoeyServer that shares
+    one set of models. A live session needs one second of audio decoded per second, so audio seconds
+    decoded per wall second, divided by the cores in use, is how many live sessions one core carries.
+    """
+    if not os.path.exists(main.MODEL_EN_PATH) or not os.path.exists(main.MODEL_HI_PATH):
+        print(f"[BENCH] Vosk models not found at '{main.MODEL_EN_PATH}' and '{main.MODEL_HI_PATH}'; sessions needs both.")
+        return
+    clips = []
+    for clip in load_clips(args.clips):
+        audio, rate = main.read_wav(clip['wav'])
+        if rate != main.TARGET_SAMPLERATE:
+            audio = main.PolyphaseResampler(rate, main.TARGET_SAMPLERATE).process(audio)
+        clips.append((clip, split_blocks(audio, main.TARGET_SAMPLERATE)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        joey = main.Joey(audio_source=main.ReplaySource(), speech_sink=main.NullSpeechSink(),
+                         tracer=main.TurnTracer(enabled=True), early_commit=False)
+        for lang in ('en', 'hi'):
+            joey.wait_for_model(lang)
+
+    print(f"[BENCH] {len(clips)} clips, {args.rounds} per session, streamed in {main.BLOCK_DURATION_MS} ms chunks "
+          f"(decode policy '{main.SERVER_DECODE_POLICY}')\n")
+    print(f"{'workers':>8}{'sessions':>9}{'audio s/s':>11}{'live/core':>11}{'req p50':>9}{'req p95':>9}{'eou p50':>9}{'eou p95':>9}{'accuracy':>10}")
+    best = 0.0
+    for workers in args.workers:
+        cores = min(workers, os.cpu_count() or 1)
+        for sessions in args.sessions:
+            with contextlib.redirect_stdout(io.StringIO()):
+                audio_seconds, wall, requests, utterances, hits = asyncio.run(drive_sessions(joey, workers, sessions, clips, args.rounds))
+            per_core = audio_seconds / wall / cores
+            best = max(best, per_core)
+            req = np.percentile(requests, [50, 95]) if requests else (float('nan'),) * 2
+            eou = np.percentile(utterances, [50, 95]) if utterances else (float('nan'),) * 2
+            accuracy = hits / (sessions * args.rounds)
+            print(f"{workers:>8}{sessions:>9}{audio_seconds / wall:>11.1f}{per_core:>11.1f}{req[0]:>9.1f}{req[1]:>9.1f}"
+                  f"{eou[0]:>9.1f}{eou[1]:>9.1f}{accuracy:>10.1%}")
+    joey.close()
+    print(f"\n[BENCH] About {best:.1f} live sessions per core at best (latencies in ms; eou = end of utterance -> reply).")
+
+
+def bench_vehicle(args):
+    """Signal updates per second through the bus thread into snapshots, snapshot read cost, and command round trips."""
+    # Throughput: an unpaced simulated bus delivers frames as fast as the reader decodes them
+    vehicle = main.VehicleState(main.SimulatedBus(rate=0, seed=0))
+    time.sleep(0.2) # Let the reader warm up
+    frames, versions, start = vehicle.frames, vehicle.snapshot.version, time.perf_counter()
+    time.sleep(args.seconds)
+    elapsed = time.perf_counter() - start
+    frames, versions = vehicle.frames - frames, vehicle.snapshot.version - versions
+    # Reads happen while the reader keeps publishing
+    start = time.perf_counter()
+    for _ in range(args.reads):
+        vehicle.snapshot.signals['fuel_percent']
+    read_ns = (time.perf_counter() - start) / args.reads * 1e9
+    vehicle.close()
+
+    # Command round trips on a bus paced like the real one: queued, sent, applied next cycle, acknowledged
+    vehicle = main.VehicleState(main.SimulatedBus(rate=args.rate, seed=0))
+    latencies = []
+    for i in range(args.commands):
+        start = time.perf_counter()
+        vehicle.command('ac_on', i % 2).result(timeout=main.VEHICLE_ACK_TIMEOUT)
+        latencies.append((time.perf_counter() - start) * 1000)
+    vehicle.close()
+
+    print(f"[BENCH] {len(main.VEHICLE_SIGNALS)} signals per bus cycle, {args.seconds:g} s unpaced\n")
+    print(f"{'signal updates / s':<30}{frames / elapsed:>12,.0f}")
+    print(f"{'snapshots published / s':<30}{versions / elapsed:>12,.0f}")
+    print(f"{'snapshot read (ns)':<30}{read_ns:>12.0f}")
+    p50, p95 = np.percentile(latencies, [50, 95])
+    print(f"{'command ack p50 / p95 (ms)':<30}{p50:>12.1f}{p95:>9.1f}  (bus at {args.rate:g} Hz)")
+
+
+# Hindi replies as Joey speaks them, entities filled in, so none of them could have been cached ahead of time
+HINDI_REPLIES = [
+    "ठीक है, इंडिया गेट के लिए नेविगेशन शुरू कर रही हूँ।",
+    "फ़्यूल 23 प्रतिशत है, टायर प्रेशर सामान्य है, केबिन का तापमान 24 डिग्री है, और हम 57 किलोमीटर प्रति घंटा पर चल रहे हैं।",
+    "ठीक है, मैं आपको 10 मिनट में मम्मी को फ़ोन करने के लिए याद दिलाऊंगी।",
+    "टीचर: 'बच्चों, मुश्किल का सामना हिम्मत से करना चाहिए।' पप्पू: 'सर, कल रात मैंने मुश्किल का सामना हिम्मत से किया, पर मुश्किल के पापा ने मुझे बहुत मारा!'",
+]
+
+
+def bench_tts(args):
+    """Time to first audio per Hindi speech backend: rendering each reply whole versus only its first chunk (streamed)."""
+    backends = {'espeak': main.EspeakBackend, 'gtts': main.GTTSBackend}
+    print(f"[BENCH] {len(HINDI_REPLIES)} uncached Hindi replies x {args.repeats}; time to first audio in ms\n")
+    print(f"{'backend':<10}{'whole p50':>11}{'whole p95':>11}{'streamed p50':>14}{'streamed p95':>14}")
+    for name in args.backends:
+        if name == 'espeak' and not main.EspeakBackend.available():
+            print(f"{name:<10}  skipped: '{main.ESPEAK_COMMAND}' is not installed")
+            continue
+        backend = backends[name]()
+        whole, streamed = [], []
+        try:
+            for _ in range(args.repeats):
+                for text in HINDI_REPLIES:
+                    start = time.perf_counter()
+                    backend.render(text)
+                    whole.append((time.perf_counter() - start) * 1000)
+                    start = time.perf_counter()
+                    backend.render(main.speech_chunks(text)[0]) # Playback starts on this; the rest renders behind it
+                    streamed.append((time.perf_counter() - start) * 1000)
+        except Exception as e:
+            print(f"{name:<10}  failed: {e}")
+            continue
+        w50, w95 = np.percentile(whole, [50, 95])
+        s50, s95 = np.percentile(streamed, [50, 95])
+        print(f"{name:<10}{w50:>11.1f}{w95:>11.1f}{s50:>14.1f}{s95:>14.1f}")
+
+
+# --- Entry Point ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for Joey's audio and NLU pipeline.")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    resample = subparsers.add_parser('resample', help="Per-block CPU before and after 16 kHz resampling.")
+    resample.add_argument('--rate', type=int, default=48000, help="Device sample rate to simulate.")
+    resample.add_argument('--seconds', type=float, default=20, help="Length of the synthetic recording.")
+    resample.add_argument('--wav', help="Use a mono 16-bit WAV recording instead of synthetic audio.")
+    resample.add_argument('--model', default=main.MODEL_EN_PATH, help="Vosk model to decode with.")
+    resample.set_defaults(run=bench_resample)
+
+    intent = subparsers.add_parser('intent', help="Dense cosine scan versus the sparse top-k intent index.")
+    intent.add_argument('--sizes', type=int, nargs='+', default=[250, 1000, 5000, 20000, 50000], help="Corpus sizes (phrases).")
+    intent.add_argument('--queries', type=int, default=500, help="Queries timed per corpus size.")
+    intent.set_defaults(run=bench_intent)
+
+    e2e = subparsers.add_parser('e2e', help="End-to-end latency, CPU and intent accuracy over labelled WAV clips.")
+    e2e.add_argument('--clips', default=os.path.join('clips', 'labels.jsonl'), help="JSON-lines manifest of labelled clips.")
+    e2e.add_argument('--speed', type=float, default=1.0, help="Replay speed: 1 is real time, 0 is as fast as possible.")
+    e2e.add_argument('--policy', choices=main.DECODE_POLICIES, default=main.DECODE_POLICY, help="Bilingual decode policy.")
+    e2e.add_argument('--command-mode', choices=main.COMMAND_MODES, default=main.COMMAND_MODE, help="Grammar command recognizer mode.")
+    e2e.add_argument('--no-early-commit', action='store_true', help="Only act on final results, for comparison.")
+    e2e.add_argument('--asr-alternatives', type=int, default=main.ASR_ALTERNATIVES,
+                     help="Hypotheses per recognizer rescored against the intents; 0 for the longest 1-best transcript.")
+    e2e.add_argument('--verbose', action='store_true', help="Show Joey's own output while replaying.")
+    e2e.set_defaults(run=bench_e2e)
+
+    sessions = subparsers.add_parser('sessions', help="Server mode: concurrent sessions sharing one set of models, per core.")
+    sessions.add_argument('--clips', default=os.path.join('clips', 'labels.jsonl'), help="JSON-lines manifest of labelled clips.")
+    sessions.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8, 16], help="Concurrent sessions to try.")
+    sessions.add_argument('--workers', type=int, nargs='+', default=[main.SERVER_WORKERS], help="Server worker pool sizes to try.")
+    sessions.add_argument('--rounds', type=int, default=2, help="Clips streamed per session.")
+    sessions.set_defaults(run=bench_sessions)
+
+    vehicle = subparsers.add_parser('vehicle', help="Vehicle bus: signal update throughput, snapshot reads and command acks.")
+    vehicle.add_argument('--seconds', type=float, default=5, help="How long to run the unpaced bus for throughput.")
+    vehicle.add_argument('--reads', type=int, default=100000, help="Snapshot reads timed.")
+    vehicle.add_argument('--commands', type=int, default=50, help="Actuator commands timed to their acknowledgement.")
+    vehicle.add_argument('--rate', type=float, default=main.VEHICLE_UPDATE_HZ, help="Bus cycles per second for the command round trips.")
+    vehicle.set_defaults(run=bench_vehicle)
+
+    tts = subparsers.add_parser('tts', help="Hindi speech backends: time to first audio, whole reply versus streamed first chunk.")
+    tts.add_argument('--backends', nargs='+', choices=['espeak', 'gtts'], default=['espeak', 'gtts'], help="Backends to time.")
+    tts.add_argument('--repeats', type=int, default=3, help="Times each reply is rendered per backend.")
+    tts.set_defaults(run=bench_tts)
+
+    args = parser.parse_args()
+    args.run(args)
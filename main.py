@@ -3,28 +3,2039 @@
 # This version includes expanded jokes, riddles, and facts in both languages,
 # driver-specific commands, and intelligent intent recognition.
 
+import time
+_PROCESS_START = time.perf_counter() # Reference point for --profile-startup
+
+import argparse
+import asyncio
+import base64
+import collections
+import contextlib
+import functools
+import hashlib
+import heapq
+import io
 import json
+import logging
+import logging.handlers
+import math
 import os
 import queue
-import sounddevice as sd
 import sys
 import threading
-import time
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from gtts import gTTS
-from pygame import mixer
-import pyttsx3
 import random
+import re
+import shutil
+import subprocess
+import unicodedata
 import numpy as np
 from vosk import Model, KaldiRecognizer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+# gTTS, pygame, pyttsx3 and scikit-learn are slow to import, so they are imported where first used.
+# sounddevice needs PortAudio, so it is only imported when a live microphone is actually used.
+
+_IMPORTS_DONE = time.perf_counter()
 
 # --- Configuration & Setup ---
 # IMPORTANT: Paths to Vosk models
 MODEL_EN_PATH = 'vosk-model-en-in-0.5'
 MODEL_HI_PATH = 'vosk-model-hi-0.22'
 CONFIDENCE_THRESHOLD = 0.25 # Adjusted threshold for improved recognition, especially in Hindi
+INTENT_TOP_K = 3 # Number of (intent, score) candidates kept per query
+INTENT_MODEL_DIR = 'intent_model' # Compiled TF-IDF index; recompiled only when the intent table changes
+INTENT_MODEL_FORMAT = 1
+VECTORIZER_SETTINGS = {'lowercase': True, 'token_pattern': r"(?u)\b\w\w+\b", 'smooth_idf': True, 'sublinear_tf': False,
+                       'normalize': True} # normalize: phrases and queries go through normalize_text first
+INTENT_CACHE_SIZE = 256 # Recent (normalized command -> intent) results kept; drivers repeat a small set of commands
+TRANSLITERATION_CACHE_SIZE = 4096 # Normalized spellings of recent tokens
+
+# --- Audio Capture & Endpointing ---
+TARGET_SAMPLERATE = 16000 # Rate the Vosk models are trained at; capture is resampled to this when needed
+RESAMPLER_TAPS_PER_PHASE = 32 # Filter length per polyphase branch (quality vs. CPU)
+BLOCK_DURATION_MS = 100 # Size of each audio block pulled from the capture stream
+AUDIO_RING_SECONDS = 5 # Capture buffered ahead of decoding; beyond this the oldest audio is dropped
+LISTEN_TIMEOUT = 5 # Seconds to wait for speech to start before giving up on a turn
+MAX_UTTERANCE_SECONDS = 8 # Hard cap on a single utterance so a noisy cabin can't hang the loop
+VAD_SPEECH_FACTOR = 3.0 # A block is speech when its energy is this many times the noise floor
+VAD_MIN_ENERGY = 300 # Minimum RMS (int16 units) for a block to count as speech
+VAD_MIN_SPEECH_MS = 100 # Speech needed before we call it an utterance (ignores clicks and bumps)
+VAD_HANGOVER_MS = 400 # Trailing silence that ends an utterance
+VAD_PREROLL_MS = 300 # Audio kept from just before speech onset so the first word isn't clipped
+
+# --- Model Memory ---
+# 'both': keep English and Hindi resident for the whole session (fastest, most RAM)
+# 'active': keep only the active language; the other loads in the background when the driver switches
+# 'budget': keep the most recently used models that fit in MODEL_MEMORY_BUDGET_MB, load the rest on demand
+MODEL_POLICY = 'both'
+MODEL_POLICIES = ('both', 'active', 'budget')
+MODEL_MEMORY_BUDGET_MB = 1024 # Estimated from each model's size on disk
+
+# --- Bilingual Decoding ---
+# 'primary': decode only the active language (cheapest, for low-end head units)
+# 'both': decode English and Hindi concurrently on every block
+# 'secondary_on_silence': decode the other language only when the active one heard nothing
+DECODE_POLICY = 'both'
+DECODE_POLICIES = ('primary', 'both', 'secondary_on_silence')
+# Each recognizer returns its N best hypotheses; all of them are scored against the intent index together.
+# 0 keeps the old behaviour: one hypothesis per language and the longest transcript wins.
+ASR_ALTERNATIVES = 3
+ASR_WEIGHT = 0.3 # Share of a hypothesis' score from its ASR likelihood; the rest is intent similarity
+ASR_CONFIDENCE_SCALE = 10.0 # Vosk confidence difference that makes one alternative e times likelier than another
+
+# --- Command Mode ---
+# 'off': open-vocabulary decoding only
+# 'alongside': a recognizer restricted to the intent table's phrases decodes next to the open one; its result wins when it's a known phrase
+# 'first': only the command recognizer decodes; the open one gets the utterance (from memory) when it wasn't a known phrase
+COMMAND_MODE = 'off'
+COMMAND_MODES = ('off', 'alongside', 'first')
+# Models for grammar recognizers (command mode and the wake word). Grammars need models with a runtime
+# graph, like the small Vosk models below; the large static-graph models above can't take them.
+GRAMMAR_MODEL_PATHS = {'en': 'vosk-model-small-en-in-0.4', 'hi': 'vosk-model-small-hi-0.22'}
+
+# --- Wake Word ---
+WAKE_WORD_GATE = False # Sleep on a tiny wake-word spotter between commands (also Joey.start(wake_word=...))
+WAKE_WORDS = {'en': ['hey joey', 'ok driver', 'okay driver', 'joey'], 'hi': ['नमस्ते जोई', 'जोई']}
+WAKE_FOLLOW_UP_SECONDS = 10 # After a wake word or a command, follow-ups don't need the wake word for this long
+
+# --- Compound Commands ---
+# "headlights on and volume up" is split into one command per piece, acted on in order with one merged reply.
+# Pieces are cut at these conjunctions (English, romanized and Devanagari Hindi) and wherever the driver paused.
+COMPOUND_CONJUNCTIONS = ['and then', 'and also', 'and', 'then', 'also', 'aur phir', 'aur', 'phir', 'fir',
+                         'और फिर', 'और', 'फिर', 'तथा', 'एवं']
+COMPOUND_PAUSE_SECONDS = 0.35 # A gap this long between two words (Vosk word timings) is a boundary
+
+# --- Early Commit ---
+# Slot-free commands Joey may act on from the partial result, before the utterance has ended,
+# mapped to the intent that undoes them if the final result turns out to be something else.
+# The reply waits until the driver has finished, so Joey never talks over (or hears herself in) the command.
+SPECULATIVE_INTENTS = {
+    'turn_ac_on': 'turn_ac_off', 'turn_ac_off': 'turn_ac_on',
+    'headlights_on': 'headlights_off', 'headlights_off': 'headlights_on',
+    'volume_up': 'volume_down', 'volume_down': 'volume_up',
+    'play_music': 'pause_music', 'pause_music': 'play_music',
+    'next_song': 'previous_song', 'previous_song': 'next_song',
+}
+SPECULATIVE_CONFIDENCE = 0.6 # Partial results must match this well (higher than CONFIDENCE_THRESHOLD)
+SPECULATIVE_STABLE_BLOCKS = 2 # ...and keep matching the same intent for this many consecutive blocks
+
+# --- Hindi Speech ---
+# 'gtts': Google's voice over the network (cached), espeak-ng as a fallback; 'espeak': offline, with the local espeak-ng;
+# 'auto': espeak-ng when it's installed, otherwise gTTS
+TTS_BACKEND_HI = 'gtts'
+TTS_BACKENDS = ('auto', 'espeak', 'gtts')
+TTS_NETWORK_TIMEOUT = 3.0 # Seconds gTTS waits on the network before the reply falls back to espeak-ng
+TTS_CACHE_DIR = 'tts_cache' # Rendered Hindi replies, reused across turns and sessions
+TTS_CACHE_MAX_BYTES = 50 * 1024 * 1024 # Least recently used clips are evicted beyond this
+TTS_VOICE_HI = 'co.in' # gTTS accent (Google domain) used for Hindi
+ESPEAK_COMMAND = 'espeak-ng'
+ESPEAK_VOICE_HI = 'hi'
+ESPEAK_RATE = 150 # Words per minute
+SPEECH_CHUNK_CHARS = 80 # Replies are rendered and played a sentence at a time; longer sentences are split at commas
+
+# --- Speech Output ---
+PRIORITY_URGENT = 0 # Emergency messages: pre-empt everything and survive barge-in
+PRIORITY_NORMAL = 1 # Regular replies
+PRIORITY_ENTERTAINMENT = 2 # Jokes, facts and riddles
+BARGE_IN_FACTOR = 2.0 # While Joey is talking, the driver must be this much louder than usual to interrupt
+
+# --- Turn Tracing ---
+TRACE_FILE = 'joey_trace.jsonl' # Default destination for --trace
+TRACE_MAX_BYTES = 5 * 1024 * 1024 # The trace file is rotated beyond this
+TRACE_BACKUPS = 3 # Rotated trace files kept (joey_trace.jsonl.1 ... .3)
+TRACE_RING_SIZE = 500 # Recent turns kept in memory for the latency summary
+
+# --- Vehicle ---
+# Signals the car broadcasts on its CAN bus: arbitration id -> (signal, scale of the frame's raw int16 value)
+VEHICLE_WHEELS = ('front_left', 'front_right', 'rear_left', 'rear_right')
+VEHICLE_SIGNALS = {
+    0x101: ('speed_kmh', 0.01), 0x102: ('fuel_percent', 0.01),
+    0x110: ('tire_front_left_psi', 0.01), 0x111: ('tire_front_right_psi', 0.01),
+    0x112: ('tire_rear_left_psi', 0.01), 0x113: ('tire_rear_right_psi', 0.01),
+    0x120: ('cabin_temp_c', 0.01), 0x121: ('ac_setpoint_c', 0.01), 0x122: ('ac_on', 1), 0x123: ('headlights_on', 1),
+}
+# Actuators Joey may command: signal -> arbitration id of its command frame. The car acknowledges each on VEHICLE_ACK_ID.
+VEHICLE_ACTUATORS = {'ac_on': 0x201, 'headlights_on': 0x202, 'ac_setpoint_c': 0x203}
+VEHICLE_ACK_ID = 0x2FF
+VEHICLE_UPDATE_HZ = 10 # Bus cycles per second; every signal (and so the snapshot) is refreshed once per cycle
+VEHICLE_ACK_TIMEOUT = 1.0 # Seconds to wait for the car to acknowledge a command before telling the driver
+AC_SETPOINT_RANGE = (16.0, 30.0) # Degrees Celsius the climate control accepts
+TIRE_PRESSURE_MIN_PSI = 28.0 # Below this a tyre is reported as low
+
+# --- Reminders & Alerts ---
+REMINDER_FILE = 'reminders.json' # The local driver's pending reminders, kept across restarts
+ALERT_CHECK_SECONDS = 5 # How often the car's snapshot is checked for things worth speaking up about
+LOW_FUEL_PERCENT = 15 # Fuel alert threshold; tyres use TIRE_PRESSURE_MIN_PSI
+# Spoken relative times ("in twenty five minutes", "in one hour thirty minutes", "दस मिनट में", "aadhe ghante baad")
+DURATION_NUMBERS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9,
+    'ten': 10, 'eleven': 11, 'twelve': 12, 'fifteen': 15, 'twenty': 20, 'thirty': 30, 'forty': 40, 'fifty': 50,
+    'sixty': 60, 'half a': 0.5, 'half an': 0.5,
+    'एक': 1, 'दो': 2, 'तीन': 3, 'चार': 4, 'पांच': 5, 'पाँच': 5, 'छह': 6, 'सात': 7, 'आठ': 8, 'नौ': 9, 'दस': 10,
+    'पंद्रह': 15, 'बीस': 20, 'पच्चीस': 25, 'तीस': 30, 'चालीस': 40, 'पैंतालीस': 45, 'पचास': 50, 'साठ': 60,
+    'आधा': 0.5, 'आधे': 0.5, 'डेढ़': 1.5, 'ढाई': 2.5,
+    'ek': 1, 'teen': 3, 'char': 4, 'paanch': 5, 'das': 10, 'pandrah': 15, 'bees': 20, 'tees': 30,
+    'aadha': 0.5, 'aadhe': 0.5, 'dedh': 1.5, 'dhai': 2.5,
+}
+DURATION_UNITS = {
+    'second': 1, 'seconds': 1, 'sec': 1, 'secs': 1, 'सेकंड': 1,
+    'minute': 60, 'minutes': 60, 'min': 60, 'mins': 60, 'मिनट': 60,
+    'hour': 3600, 'hours': 3600, 'घंटा': 3600, 'घंटे': 3600, 'ghanta': 3600, 'ghante': 3600,
+}
+DURATION_PREFIXES = ['in', 'after']
+DURATION_JOINERS = ['and', 'और', 'aur'] # Between the parts of a compound time ("an hour and ten minutes")
+DURATION_SUFFIXES = ['from now', 'later', 'में', 'बाद', 'mein', 'baad']
+
+# --- Server Mode ---
+SERVER_HOST = '127.0.0.1' # Local socket only; put a real gateway in front for remote clients
+SERVER_PORT = 8765
+SERVER_WORKERS = os.cpu_count() or 1 # Threads decoding and classifying for all sessions (Vosk releases the GIL)
+SERVER_QUEUE_PER_WORKER = 4 # Requests in flight per worker before the server stops reading from clients
+SERVER_MAX_SESSIONS = 256
+SERVER_DECODE_POLICY = 'secondary_on_silence' # Per-session decoding never fans out to threads of its own
+SERVER_LINE_LIMIT = 1024 * 1024 # Longest request line (base64 audio) a client may send
+
+# --- MASSIVELY EXPANDED Intent Dictionary for Demo ---
+INTENTS = {
+    # --- Conversational ---
+    'greeting': ['hello', 'hi', 'hey joey', 'namaste', 'ok driver', 'hey', 'start', 'wake up joey', 'joey', 'नमस्ते'],
+    'small_talk_how_are_you': [
+        'how are you', 'what\'s up', 'kya hal hai', 'kya chal raha hai', # Keep Romanized if Vosk gives Romanized for these
+        'कैसे हो', 'आप कैसे हो', 'आप कैसे हैं', # CHANGE TO DEVANAGARI
+        'कैसा है', 'तुम कैसे हो', 'आप ठीक हैं', 'आपकी तबियत कैसी है' # CHANGE TO DEVANAGARI
+    ],
+    'introduce_self': ['my name is', 'i am', 'मेरा नाम है', 'मैं हूँ'], # CHANGE TO DEVANAGARI
+    'thank_you': ['thank you', 'thanks a lot', 'शुक्रिया', 'धन्यवाद', 'बहुत शुक्रिया', 'thank u', 'शुक्रीया'], # CHANGE TO DEVANAGARI
+    'goodbye': ['goodbye', 'bye', 'exit', 'shut down', 'बंद हो जाओ', 'अलविदा', 'stop', 'टाटा'], # CHANGE TO DEVANAGARI
+    
+    # --- Language Switching ---
+    'change_language_hi': [
+        'hindi mode', 'switch to hindi', 'hindi mein bolo', 'hindi mein baat karo', 'talk to me in hindi',
+        'change to hindi', 'hindi chalu karo', 'hindi mein baat kar', 'hindi bhasha', 'हिंदी में बोलो',
+        'हिंदी मोड', 'हिंदी चलाओ' # CHANGED TO DEVANAGARI
+    ],
+    'change_language_en': [
+        'english mode', 'switch to english', 'english mein bolo', 'speak in english', 'talk to me in english',
+        'change to english', 'english chalu karo', 'english mein baat kar', 'english bhasha',
+        'अंग्रेजी में बात करें', 'इंग्लिश में बोलो', 'वापस इंग्लिश में', 'इंग्लिश मोड में आओ' # CHANGED TO DEVANAGARI
+    ],
+
+    # --- Core Features ---
+    'ask_name': ["what's your name", 'what is your name', 'who are you', 'तुम्हारा नाम क्या है', 'आपका नाम क्या है', 'तुम कौन हो', 'what do people call you'], # CHANGE TO DEVANAGARI
+    'ask_creator': ['who made you', 'who created you', 'तुम्हें किसने बनाया', 'आपको किसने बनाया', 'who is your developer'], # CHANGE TO DEVANAGARI
+    'ask_time': ['what time is it', 'time kya hua hai', 'समय क्या हुआ है', 'tell me the time', 'टाइम बताओ', 'घड़ी में क्या बजा है', 'कितने बजे हैं'], # CHANGE TO DEVANAGARI
+    'ask_weather': [
+        "what's the weather", 'how is the weather', 'weather kaisa hai', 'मौसम का हाल', 'आज का मौसम कैसा है',
+        'weather update do', 'मौसम की जानकारी दो', 'आज का वेदर कैसा था', 'आज का वेदर कैसा था', 'will it rain today',
+        'कल का मौसम', 'आज का तापमान', 'बारिश होगी' # CHANGE TO DEVANAGARI
+    ],
+    'ask_location': ['where are we', 'current location', 'हम कहाँ हैं', 'मेरी लोकेशन बताओ', 'हमारी लोकेशन क्या है', 'where am i', 'लोकेशन बताओ', 'मेरी स्थिति क्या है'], # CHANGE TO DEVANAGARI
+    'vehicle_status': ['car status', 'vehicle status', 'check the car', 'गाड़ी की स्थिति', 'मेरी गाड़ी का स्टेटस बताओ', 'what\'s my car\'s status', 'इंजन चेक', 'गाड़ी का हाल'], # CHANGE TO DEVANAGARI
+    
+    # --- NEW DRIVER FEATURES ---
+    'ask_fuel_level': ['what\'s the fuel level', 'how much fuel is left', 'fuel status', 'check fuel', 'कितना पेट्रोल बचा है', 'फ्यूल कितना है', 'तेल कितना है', 'गाड़ी में पेट्रोल कितना है', 'ईंधन का स्तर बताओ'],
+    'ask_tire_pressure': ['what\'s the tire pressure', 'check tire pressure', 'tire pressure status', 'टायर में हवा कितनी है', 'टायर प्रेशर बताओ', 'टायर का दबाव कैसा है'],
+    'increase_temperature': ['increase temperature', 'make it warmer', 'temperature up', 'turn up the heat', 'तापमान बढ़ाओ', 'गर्मी बढ़ाओ', 'टेंपरेचर बढ़ाओ'],
+    'decrease_temperature': ['decrease temperature', 'make it cooler', 'temperature down', 'turn down the heat', 'तापमान घटाओ', 'ठंडा करो', 'टेंपरेचर कम करो'],
+    'turn_ac_on': ['turn ac on', 'switch on ac', 'ac chalao', 'एसी चलाओ', 'एसी ऑन करो', 'एसी चालू करो'],
+    'turn_ac_off': ['turn ac off', 'switch off ac', 'ac band karo', 'एसी बंद करो', 'एसी ऑफ़ करो'],
+    'find_nearest': ['find nearest', 'where is the nearest', 'locate nearest', 'सबसे नज़दीकी कहाँ है', 'नज़दीकी ढूंढो'], # Entity extracted for what to find
+    'traffic_update': ['traffic update', 'how\'s the traffic', 'is there traffic ahead', 'ट्रैफिक बताओ', 'यातायात कैसा है', 'आगे ट्रैफिक है क्या'],
+    'ask_eta': ['what\'s my eta', 'estimated time of arrival', 'when will i arrive', 'पहुँचने में कितना समय लगेगा', 'ईटीए बताओ', 'कब पहुंचेंगे'],
+    'headlights_on': ['turn headlights on', 'headlights on', 'हेडलाइट ऑन करो', 'लाइट जलाओ'],
+    'headlights_off': ['turn headlights off', 'headlights off', 'हेडलाइट बंद करो', 'लाइट बुझाओ'],
+    # --- END NEW DRIVER FEATURES ---
+
+    'navigate': [
+        'navigate to', 'take me to', 'mujhe le jao', 'get directions to', 'mujhe jana hai', 'chalo', 'go to', 'drive to',
+        'मुझे घर ले चलो', 'मुझे हॉस्पिटल ले जाओ', 'नेविगेशन शुरू करो', 'रास्ता बताओ', 'नेविगेट करो' # CHANGE TO DEVANAGARI
+    ],
+    'cancel_navigation': ['cancel navigation', 'stop navigation', 'रुक जाओ', 'नेविगेशन बंद करो', 'रूट कैंसिल करो'], # CHANGE TO DEVANAGARI
+    
+    # --- Entertainment ---
+    'tell_joke': ['tell me a joke', 'जोक सुनाओ', 'कोई चुटकुला सुनाओ', 'make me laugh', 'हंसाओ', 'एक जोक सुनाओ'], # CHANGE TO DEVANAGARI
+    'joke_feedback': ['not funny', 'that was a bad joke', 'बेकार था', 'अच्छा नहीं था', 'lame joke', 'मजा नहीं आया'], # CHANGE TO DEVANAGARI
+    'tell_riddle': ['tell me a riddle', 'ask me a riddle', 'रिडल पूछो', 'एक पहेली पूछो', 'पहेली सुनाओ'], # CHANGE TO DEVANAGARI
+    'answer_riddle': ['what is the answer', 'आंसर क्या है', 'tell me the solution', 'जवाब बताओ', 'रिडल का आंसर'], # CHANGE TO DEVANAGARI
+    'tell_fact': ['tell me a fact', 'share a fact', 'कोई तथ्य बताओ', 'ज्ञान की बात', 'इंट्रेस्टिंग फैक्ट'], # CHANGE TO DEVANAGARI
+
+    # --- Music Control (Simulated) ---
+    'play_music': ['play music', 'play a song', 'गाना बजाओ', 'म्यूजिक चलाओ', 'play something', 'सॉन्ग चलाओ'], # CHANGE TO DEVANAGARI
+    'pause_music': ['pause music', 'stop music', 'गाना रोको', 'म्यूजिक बंद करो', 'पॉज सॉन्ग'], # CHANGE TO DEVANAGARI
+    'next_song': ['next song', 'अगला गाना', 'skip song', 'नेक्स्ट ट्रैक'], # CHANGE TO DEVANAGARI
+    'previous_song': ['previous song', 'पिछला गाना', 'प्रीवियस ट्रैक'], # CHANGE TO DEVANAGARI
+    'volume_up': ['volume up', 'आवाज बढ़ाओ', 'raise volume', 'वॉल्यूम तेज करो'], # CHANGE TO DEVANAGARI
+    'volume_down': ['volume down', 'आवाज कम करो', 'lower volume', 'वॉल्यूम धीमा करो'], # CHANGE TO DEVANAGARI
+
+    # --- Calling/Messaging (Simulated) ---
+    'make_call': ['call', 'make a call', 'फ़ोन लगा दो', 'call someone', 'किसी को कॉल करो'], # CHANGE TO DEVANAGARI
+    'send_message': ['send message', 'text', 'मैसेज भेजो', 'टेक्स्ट करो'], # CHANGE TO DEVANAGARI
+    
+    # --- Utility & Help ---
+    'translate': ['translate', 'can you translate', 'ट्रांसलेट कर दो', 'अनुवाद करो'], # CHANGE TO DEVANAGARI
+    'help': ['what can you do', 'help', 'help me', 'क्या कर सकते हो', 'मदद करो', 'capabilities', 'commands', 'व्हाट कैन आई आस्क'], # CHANGE TO DEVANAGARI
+    'emergency': ['emergency', 'call police', 'call ambulance', 'i need help', 'trouble', 'sos', 'हेल्प मी नाउ'], # CHANGE TO DEVANAGARI
+    'set_reminder': ['set a reminder', 'remind me', 'मुझे याद दिलाओ', 'रिमाइंडर सेट करो'], # CHANGE TO DEVANAGARI
+    'open_app': ['open app', 'launch app', 'ऐप खोलो'], # CHANGE TO DEVANAGARI
+    'what_is': ['what is', 'define', 'क्या है'], # CHANGE TO DEVANAGARI
+}
+
+# --- Slot Intents ---
+# Intents that carry a slot (a place, contact, app...). Their carrier phrases are the intent's own
+# phrases above plus any extra spoken variants listed here, so adding a slot intent is data-only.
+#   anchored: the carrier must open the utterance ("navigate to <place>")
+#   span: 'after' takes everything after the carrier; 'rest' takes whatever is left on either side,
+#         which also covers Hindi word order ("मम्मी को फ़ोन लगा दो")
+SLOT_INTENTS = {
+    'navigate': {'anchored': True, 'span': 'after', 'extra': [
+        'mujhe ghar le chalo', 'mujhe hospital le jaao', 'navigasyon shuru karo', 'rasta batao', 'navigated to',
+        'मुझे ले जाओ', 'मुझे जाना है', 'चलो', 'मुझे अस्पताल ले जाओ']},
+    'find_nearest': {'anchored': True, 'span': 'after', 'extra': []},
+    'introduce_self': {'anchored': False, 'span': 'after', 'extra': []},
+    'make_call': {'anchored': False, 'span': 'rest', 'extra': []},
+    'send_message': {'anchored': False, 'span': 'rest', 'extra': ['send message to']},
+    'set_reminder': {'anchored': False, 'span': 'rest', 'extra': ['remind me to', 'set a reminder for']},
+    'open_app': {'anchored': False, 'span': 'rest', 'extra': ['open', 'launch']},
+    'what_is': {'anchored': False, 'span': 'rest', 'extra': []},
+}
+
+def build_corpus(intents):
+    """Flattens the intent table into parallel (phrase, intent) lists for vectorizing."""
+    corpus, intent_map = [], []
+    for intent, phrases in intents.items():
+        for phrase in phrases:
+            corpus.append(phrase)
+            intent_map.append(intent)
+    return corpus, intent_map
+
+# --- Text Normalization ---
+# Romanized and Devanagari Hindi are folded onto one approximate Roman spelling, so 'hindi mein bolo'
+# and 'हिंदी में बोलो' become the same tokens, and common spelling variants ('gaana'/'gana') coincide.
+DEVANAGARI_CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n', 'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n', 'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'f', 'ब': 'b', 'भ': 'bh', 'म': 'm', 'य': 'y', 'र': 'r', 'ल': 'l', 'व': 'v',
+    'श': 'sh', 'ष': 'sh', 'स': 's', 'ह': 'h', 'ळ': 'l',
+}
+DEVANAGARI_VOWELS = {'अ': 'a', 'आ': 'a', 'इ': 'i', 'ई': 'i', 'उ': 'u', 'ऊ': 'u', 'ऋ': 'ri', 'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au', 'ऑ': 'o', 'ऍ': 'e'}
+DEVANAGARI_VOWEL_SIGNS = {'ा': 'a', 'ि': 'i', 'ी': 'i', 'ु': 'u', 'ू': 'u', 'ृ': 'ri', 'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au', 'ॉ': 'o', 'ॅ': 'e'}
+DEVANAGARI_NASALS = {'ं': 'n', 'ँ': 'n', 'ः': 'h'} # Anusvara, chandrabindu, visarga
+DEVANAGARI_VIRAMA = '्'
+DEVANAGARI_NUKTA = '़' # क़ ज़ फ़ ड़ ... fold onto क ज फ ड
+DEVANAGARI_DIGITS = str.maketrans('०१२३४५६७८९', '0123456789')
+# Applied in order to every Roman token, including transliterated ones
+ROMAN_FOLDS = [('ee', 'i'), ('ii', 'i'), ('oo', 'u'), ('uu', 'u'), ('ei', 'e'), ('ph', 'f'), ('w', 'v'), ('z', 'j'), ('q', 'k'),
+               ('chh', 'ch'), ('chch', 'ch'), ('cch', 'ch')]
+
+def _devanagari_to_roman(token):
+    """Transliterates one Devanagari word, dropping the inherent 'a' where Hindi doesn't pronounce it."""
+    letters = [] # [roman, vowel] per letter; vowel is None while a consonant still carries its inherent 'a'
+    for char in token:
+        if char in DEVANAGARI_CONSONANTS:
+            letters.append([DEVANAGARI_CONSONANTS[char], None])
+        elif char in DEVANAGARI_VOWELS:
+            letters.append(['', DEVANAGARI_VOWELS[char]])
+        elif char in DEVANAGARI_VOWEL_SIGNS and letters:
+            letters[-1][1] = DEVANAGARI_VOWEL_SIGNS[char]
+        elif char == DEVANAGARI_VIRAMA and letters:
+            letters[-1][1] = ''
+        elif char in DEVANAGARI_NASALS and letters:
+            letters[-1][1] = (letters[-1][1] if letters[-1][1] is not None else 'a') + DEVANAGARI_NASALS[char]
+        else:
+            letters.append([char, ''])
+    # Schwa deletion, right to left: silent at the end of a word, and after a vowel when the next letter is voiced
+    for i in reversed(range(len(letters))):
+        if letters[i][1] is not None: continue
+        if i and (i == len(letters) - 1 or (letters[i - 1][1] != '' and letters[i + 1][1] != '')):
+            letters[i][1] = ''
+        else:
+            letters[i][1] = 'a'
+    return ''.join(roman + vowel for roman, vowel in letters)
+
+@functools.lru_cache(maxsize=TRANSLITERATION_CACHE_SIZE)
+def normalize_token(token):
+    """One token's canonical spelling: Devanagari transliterated to Roman, then spelling variants folded."""
+    if any('\u0900' <= char <= '\u097f' for char in token):
+        token = _devanagari_to_roman(token.translate(DEVANAGARI_DIGITS))
+    for variant, canonical in ROMAN_FOLDS:
+        token = token.replace(variant, canonical)
+    return re.sub(r'(.)\1+', r'\1', token) # Doubled letters: 'gaana', 'accha'
+
+def normalize_text(text):
+    """The NLU front end: Unicode NFC, lowercase, nukta folding, punctuation stripped, tokens normalized."""
+    text = unicodedata.normalize('NFC', text).lower().replace(DEVANAGARI_NUKTA, '')
+    text = re.sub(r"[^\w\s\u0900-\u0963\u0966-\u097F]", ' ', text) # Keeps vowel signs; drops danda and punctuation
+    return ' '.join(normalize_token(token) for token in text.split())
+
+# --- Voice Activity Detection ---
+
+class EnergyVAD:
+    """
+    Lightweight energy-based voice activity detector.
+    Tracks an adaptive noise floor and reports when an utterance starts and ends.
+    """
+    def __init__(self, block_ms=BLOCK_DURATION_MS, speech_factor=VAD_SPEECH_FACTOR, min_energy=VAD_MIN_ENERGY,
+                 min_speech_ms=VAD_MIN_SPEECH_MS, hangover_ms=VAD_HANGOVER_MS):
+        self.speech_factor = speech_factor
+        self.min_energy = min_energy
+        self.min_speech_blocks = max(1, min_speech_ms // block_ms)
+        self.hangover_blocks = max(1, hangover_ms // block_ms)
+        self.noise_floor = None
+        self.reset()
+
+    def reset(self):
+        """Clears the utterance state between turns. The noise floor is kept."""
+        self.in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+
+    @staticmethod
+    def energy(block):
+        """RMS energy of an int16 block."""
+        if not block.size: return 0.0
+        samples = block.astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples)))
+
+    def is_speech(self, block, factor=1.0, adapt=True):
+        """
+        Classifies a block against the current noise floor, adapting the floor on non-speech.
+        factor raises the threshold (e.g. while Joey's own voice is leaking into the mic).
+        """
+        energy = self.energy(block)
+        if self.noise_floor is None:
+            self.noise_floor = min(energy, self.min_energy)
+        speech = energy > factor * max(self.min_energy, self.noise_floor * self.speech_factor)
+        if adapt and not speech: # Only learn from background noise so the driver's voice doesn't raise the floor
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+        return speech
+
+    def process(self, block, factor=1.0, adapt=True):
+        """Feeds one int16 block. Returns 'start' or 'end' on an utterance boundary, otherwise None."""
+        speech = self.is_speech(block, factor, adapt)
+        if not self.in_speech:
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._speech_run >= self.min_speech_blocks:
+                self.in_speech = True
+                self._silence_run = 0
+                return 'start'
+        else:
+            self._silence_run = 0 if speech else self._silence_run + 1
+            if self._silence_run >= self.hangover_blocks:
+                self.in_speech = False
+                self._speech_run = 0
+                return 'end'
+        return None
+
+# --- Speech Cache ---
+
+class TTSCache:
+    """
+    Content-addressed on-disk cache of rendered speech.
+    Clips are keyed by a hash of (text, lang, voice); once the cache grows past its size budget,
+    the least recently used clips are evicted.
+    """
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(text, lang, voice):
+        return hashlib.sha256(f"{lang}\0{voice}\0{text}".encode('utf-8')).hexdigest()
+
+    def _path(self, text, lang, voice):
+        return os.path.join(self.cache_dir, self.key(text, lang, voice) + '.mp3')
+
+    def get(self, text, lang, voice):
+        """Returns the cached clip as bytes, or None on a miss."""
+        path = self._path(text, lang, voice)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path) # Mark as recently used for eviction
+            return data
+        except FileNotFoundError:
+            return None
+
+    def put(self, text, lang, voice, data):
+        """Stores a clip atomically, then trims the cache back under budget."""
+        path = self._path(text, lang, voice)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.mp3'):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError: # Evicted by another writer
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes: break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+# --- Speech Backends ---
+# A backend renders text in one language to audio bytes: name, voice, format (for pygame: 'mp3' or 'wav'),
+# cacheable (worth keeping in the TTSCache) and render(text).
+
+def speech_chunks(text):
+    """Splits a reply into the pieces rendered and played one after another: sentences, and long sentences at commas."""
+    chunks = []
+    for sentence in re.split(r'(?<=[.!?।॥])\s+|(?<=[.!?।॥][\'"])\s+', text.strip()):
+        pieces = re.split(r'(?<=[,;:])\s+', sentence) if len(sentence) > SPEECH_CHUNK_CHARS else [sentence]
+        current = ''
+        for piece in pieces:
+            if current and len(current) + 1 + len(piece) > SPEECH_CHUNK_CHARS:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}".strip()
+        if current: chunks.append(current)
+    return chunks
+
+class GTTSBackend:
+    """Google Translate's voice via gTTS: natural Hindi, but every clip not yet cached needs the network."""
+    name = 'gtts'
+    format = 'mp3'
+    cacheable = True
+
+    def __init__(self, lang='hi', tld=TTS_VOICE_HI, timeout=TTS_NETWORK_TIMEOUT):
+        self.lang = lang
+        self.voice = tld
+        self.timeout = timeout
+
+    def render(self, text):
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=self.lang, tld=self.voice, slow=False, timeout=self.timeout).write_to_fp(buffer)
+        return buffer.getvalue()
+
+class EspeakBackend:
+    """Offline speech from the local espeak-ng. Robotic next to gTTS, but it needs no network and renders a sentence in milliseconds."""
+    name = 'espeak'
+    format = 'wav'
+    cacheable = False # Rendering again is as quick as reading it back
+
+    def __init__(self, voice=ESPEAK_VOICE_HI, rate=ESPEAK_RATE, command=ESPEAK_COMMAND):
+        self.voice = voice
+        self.rate = rate
+        self.command = command
+
+    @staticmethod
+    def available(command=ESPEAK_COMMAND):
+        return shutil.which(command) is not None
+
+    def render(self, text):
+        result = subprocess.run([self.command, '-v', self.voice, '-s', str(self.rate), '--stdout', text],
+                                capture_output=True, check=True, timeout=10)
+        return fix_wav_sizes(result.stdout)
+
+def fix_wav_sizes(data):
+    """Fills in the RIFF and data chunk sizes, which a WAV streamed to a pipe leaves as placeholders."""
+    data = bytearray(data)
+    marker = data.find(b'data', 12)
+    if data[:4] != b'RIFF' or marker < 0: return bytes(data)
+    data[4:8] = (len(data) - 8).to_bytes(4, 'little')
+    data[marker + 4:marker + 8] = (len(data) - marker - 8).to_bytes(4, 'little')
+    return bytes(data)
+
+def hindi_speech_backends(choice=TTS_BACKEND_HI):
+    """The Hindi backends to try, in order, for a TTS_BACKENDS choice."""
+    if choice not in TTS_BACKENDS:
+        raise ValueError(f"Unknown TTS backend '{choice}'. Expected one of {TTS_BACKENDS}.")
+    offline = [EspeakBackend()] if EspeakBackend.available() else []
+    if choice == 'gtts': return [GTTSBackend()] + offline
+    if choice == 'espeak' and not offline:
+        print(f"[JOEY TTS WARNING] '{ESPEAK_COMMAND}' not found; Hindi speech falls back to gTTS (needs the network).")
+    return offline or [GTTSBackend()]
+
+# --- Audio Sources ---
+# An audio source delivers mono int16 blocks of BLOCK_DURATION_MS as NumPy arrays. It has `rate`, `blocksize`,
+# `live` and `dropped` (frames lost to overflow), and start(), read(timeout) and close(); read() raises
+# queue.Empty on timeout.
+
+class AudioRing:
+    """
+    Preallocated ring buffer of int16 frames between the capture callback and its readers.
+    Every frame is stored twice (at i and i + capacity), so any span of up to `capacity` frames is one
+    contiguous slice and readers get zero-copy views. The writer never blocks or allocates: a reader
+    that falls more than `capacity` frames behind loses its oldest audio, and the loss is counted.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = np.zeros(2 * capacity, dtype=np.int16)
+        self.written = 0 # Frames written since the start
+        self._cond = threading.Condition()
+        self._readers = {}
+
+    def write(self, frames):
+        frames = frames[-self.capacity:]
+        n = len(frames)
+        with self._cond:
+            start = self.written % self.capacity
+            first = min(n, self.capacity - start) # Frames before the wrap point
+            self._buffer[start:start + n] = frames
+            self._buffer[start + self.capacity:start + self.capacity + first] = frames[:first]
+            self._buffer[:n - first] = frames[first:]
+            self.written += n
+            self._cond.notify_all()
+
+    def reader(self, name):
+        """A new reader that starts at the current write position."""
+        with self._cond:
+            reader = self._readers[name] = RingReader(self, name)
+            return reader
+
+    def stats(self):
+        """Capacity, frames written and, per reader, its occupancy (frames waiting) and frames dropped."""
+        with self._cond:
+            return {'capacity': self.capacity, 'written': self.written,
+                    'readers': {name: {'occupancy': reader.occupancy, 'dropped': reader.dropped} for name, reader in self._readers.items()}}
+
+class RingReader:
+    """One consumer's position in an AudioRing."""
+    def __init__(self, ring, name):
+        self.ring = ring
+        self.name = name
+        self.pos = ring.written
+        self.dropped = 0
+
+    @property
+    def occupancy(self):
+        return min(self.ring.written - self.pos, self.ring.capacity)
+
+    def read(self, frames, timeout=None):
+        """
+        Returns a view of the next `frames` frames, or raises queue.Empty after timeout seconds.
+        A lapped reader skips ahead to half the capacity behind the writer, so the views it hands
+        out stay valid for at least half the capacity's worth of audio.
+        """
+        ring = self.ring
+        with ring._cond:
+            if not ring._cond.wait_for(lambda: ring.written - self.pos >= frames, timeout):
+                raise queue.Empty
+            if ring.written - self.pos > ring.capacity:
+                resume = ring.written - max(frames, ring.capacity // 2)
+                self.dropped += resume - self.pos
+                self.pos = resume
+            start = self.pos % ring.capacity
+            self.pos += frames
+        return ring._buffer[start:start + frames]
+
+def read_wav(path):
+    """Reads a mono int16 WAV file. Returns (samples, rate)."""
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise ValueError(f"{path}: expected mono 16-bit PCM")
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16), wav.getframerate()
+
+class MicrophoneSource:
+    """Live capture from the default input device through sounddevice."""
+    live = True
+
+    def __init__(self):
+        import sounddevice as sd
+        self._sd = sd
+        self.device_info = sd.query_devices(sd.default.device[0], 'input')
+        self.rate = self._negotiate_rate()
+        self.blocksize = int(self.rate * BLOCK_DURATION_MS / 1000)
+        self.ring = AudioRing(int(self.rate * AUDIO_RING_SECONDS)) # Other consumers can attach with ring.reader()
+        self._reader = self.ring.reader('joey')
+        self._stream = None # Opened once on the first listen and kept running for the whole session
+
+    def _negotiate_rate(self):
+        """Asks the input device for 16 kHz directly; falls back to its default rate."""
+        try:
+            self._sd.check_input_settings(device=self.device_info['index'], samplerate=TARGET_SAMPLERATE, channels=1, dtype='int16')
+            return TARGET_SAMPLERATE
+        except Exception:
+            return int(self.device_info['default_samplerate'])
+
+    def _callback(self, indata, frames, time, status):
+        """Copies each captured block straight from PortAudio's buffer into the ring."""
+        if status: print(status, file=sys.stderr)
+        self.ring.write(np.frombuffer(indata, dtype=np.int16))
+
+    def start(self):
+        """Opens the long-lived capture stream on first use. Audio spoken between turns stays queued."""
+        if self._stream is None:
+            self._stream = self._sd.RawInputStream(samplerate=self.rate, blocksize=self.blocksize, device=self.device_info['index'],
+                                                   dtype='int16', channels=1, callback=self._callback)
+            self._stream.start()
+
+    def read(self, timeout=None):
+        return self._reader.read(self.blocksize, timeout)
+
+    @property
+    def dropped(self):
+        return self._reader.dropped
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+class ReplaySource:
+    """
+    Replays recorded clips (WAV files or int16 arrays) as if they came from the microphone, paced in
+    real time (speed=1), faster (speed=4) or as fast as they are read (speed=0). Each clip is framed by
+    quiet cabin noise so the VAD sees a normal onset and endpoint; once everything has been played the
+    source keeps delivering that noise.
+    """
+    live = False
+    dropped = 0
+
+    def __init__(self, clips=(), rate=TARGET_SAMPLERATE, speed=1.0, lead_ms=500, tail_ms=1000, noise_rms=30):
+        self.rate = rate
+        self.blocksize = int(rate * BLOCK_DURATION_MS / 1000)
+        self.speed = speed
+        self.lead = int(rate * lead_ms / 1000)
+        self.tail = int(rate * tail_ms / 1000)
+        self.noise_rms = noise_rms
+        self._rng = np.random.default_rng(0)
+        self._blocks = collections.deque() # (samples, whether the clip's speech ends in this block)
+        self._due = None # perf_counter time the next block would arrive from a real microphone
+        self.seconds_delivered = 0.0
+        self.speech_ended = None # When the block holding the end of the last clip's speech was delivered
+        for clip in clips:
+            self.play(clip)
+
+    def _noise(self, n):
+        return np.clip(self._rng.normal(0, self.noise_rms, n), -32768, 32767).astype(np.int16)
+
+    def play(self, clip):
+        """Queues a clip: a WAV path, or int16 samples at self.rate."""
+        if isinstance(clip, str):
+            samples, rate = read_wav(clip)
+            if rate != self.rate:
+                samples = PolyphaseResampler(rate, self.rate).process(samples)
+        else:
+            samples = np.asarray(clip, dtype=np.int16)
+        if not self._blocks:
+            self._due = None # Idle until now, so pacing restarts with this clip
+        self.speech_ended = None
+        audio = np.concatenate([self._noise(self.lead), samples, self._noise(self.tail)])
+        audio = np.concatenate([audio, self._noise(-len(audio) % self.blocksize)])
+        speech_end = self.lead + len(samples)
+        for start in range(0, len(audio), self.blocksize):
+            self._blocks.append((audio[start:start + self.blocksize], start < speech_end <= start + self.blocksize))
+
+    def start(self):
+        pass
+
+    def read(self, timeout=None):
+        samples, ends_speech = self._blocks.popleft() if self._blocks else (self._noise(self.blocksize), False)
+        if self.speed > 0:
+            # Each block arrives one block duration after the previous one, like a live stream
+            now = time.perf_counter()
+            if self._due is None: self._due = now
+            self._due += BLOCK_DURATION_MS / 1000 / self.speed
+            if self._due > now: time.sleep(self._due - now)
+        self.seconds_delivered += self.blocksize / self.rate
+        if ends_speech: self.speech_ended = time.perf_counter()
+        return samples
+
+    def close(self):
+        self._blocks.clear()
+
+# --- Turn Tracing ---
+
+class Turn:
+    """
+    Timeline of one turn: milliseconds since capture started for each stage, plus annotations such as
+    the winning recognizer and the intent confidence. The turn stays open until it has been handled
+    and every reply queued during it has finished playing, then it is handed back to its tracer.
+    """
+    def __init__(self, tracer, number):
+        self._tracer = tracer
+        self._t0 = time.perf_counter()
+        self.record = {'turn': number, 'time': datetime.now().isoformat(timespec='milliseconds'), 'monotonic': self._t0,
+                       'stages': {'capture_start': 0.0}}
+        self._open = 1 # The turn itself, plus one per reply still queued or playing
+
+    def mark(self, stage, once=False, **fields):
+        """Records a stage (the latest time, or the first one if once=True) and any annotations."""
+        if once and stage in self.record['stages']: return
+        self.record['stages'][stage] = round((time.perf_counter() - self._t0) * 1000, 2)
+        self.record.update(fields)
+
+    def hold(self):
+        with self._tracer._lock:
+            if self._open: self._open += 1
+
+    def release(self):
+        with self._tracer._lock:
+            if not self._open: return
+            self._open -= 1
+            if self._open: return
+        self._tracer._finish(self.record)
+
+class _NullTurn:
+    """What a disabled tracer hands out: every call is a no-op."""
+    record = None
+    def mark(self, stage, once=False, **fields): pass
+    def hold(self): pass
+    def release(self): pass
+
+NULL_TURN = _NullTurn()
+
+class TurnTracer:
+    """
+    Collects per-turn latency traces. Finished turns are kept in a ring buffer for summary() and,
+    if a path is given, appended as JSON lines to a size-rotated file. When disabled, begin()
+    returns NULL_TURN, so tracing costs a no-op method call per stage.
+    """
+    def __init__(self, enabled=False, path=None, ring_size=TRACE_RING_SIZE, max_bytes=TRACE_MAX_BYTES, backups=TRACE_BACKUPS):
+        self.enabled = enabled or path is not None
+        self.turns = collections.deque(maxlen=ring_size)
+        self._lock = threading.Lock()
+        self._count = 0
+        self._log = None
+        if path is not None:
+            self._log = logging.getLogger(f'joey.trace.{os.path.abspath(path)}')
+            self._log.propagate = False
+            self._log.setLevel(logging.INFO)
+            if not self._log.handlers:
+                handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                self._log.addHandler(handler)
+
+    def begin(self):
+        """Starts tracing a new turn at capture start."""
+        if not self.enabled: return NULL_TURN
+        with self._lock:
+            self._count += 1
+            return Turn(self, self._count)
+
+    def _finish(self, record):
+        with self._lock:
+            self.turns.append(record)
+        if self._log is not None:
+            self._log.info(json.dumps(record, ensure_ascii=False))
+
+    def summary(self):
+        """Per-stage histogram over the ring buffer: {stage: (turns, p50, p95, p99)}, in ms since capture start."""
+        by_stage = collections.defaultdict(list)
+        with self._lock:
+            records = list(self.turns)
+        for record in records:
+            for stage, ms in record['stages'].items():
+                by_stage[stage].append(ms)
+        return {stage: (len(times), *np.percentile(times, [50, 95, 99])) for stage, times in by_stage.items()}
+
+    def report(self):
+        summary = self.summary()
+        print(f"\n[JOEY] Turn latency over the last {len(self.turns)} turns (ms since capture start):")
+        print(f"    {'stage':<18}{'turns':>6}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for stage, (count, p50, p95, p99) in sorted(summary.items(), key=lambda item: item[1][1]):
+            print(f"    {stage:<18}{count:>6}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}")
+
+# --- Speech Output ---
+
+class SpeechOutput:
+    """
+    Asynchronous speech channel. Replies are queued by priority and played on a worker thread,
+    so Joey can keep listening while she talks. A higher-priority reply pre-empts the one playing,
+    and cancel() cuts playback short when the driver starts speaking (barge-in).
+    """
+    def __init__(self, play):
+        self._play = play # play(text, lang, interrupted) blocks until done or until interrupted is set
+        self._queue = queue.PriorityQueue()
+        self._seq = 0 # Keeps replies of equal priority in order
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._current = None # Priority of the reply being played
+        self.turn = NULL_TURN # Turn of the reply being played, for play() to trace synthesis and playback
+        self._interrupted = threading.Event()
+        self._worker = threading.Thread(target=self._run, name='joey-speech', daemon=True)
+        self._worker.start()
+
+    @property
+    def is_busy(self):
+        with self._lock:
+            return self._pending > 0
+
+    def say(self, text, lang, priority=PRIORITY_NORMAL, turn=NULL_TURN):
+        """Queues a reply and returns immediately. The turn stays open until the reply is done."""
+        turn.hold()
+        with self._lock:
+            self._seq += 1
+            self._pending += 1
+            if self._current is not None and priority < self._current:
+                self._interrupted.set() # Pre-empt the less important reply that's playing
+            self._queue.put((priority, self._seq, text, lang, turn))
+
+    def cancel(self, keep_priority=PRIORITY_URGENT):
+        """
+        Stops the reply playing and drops queued ones, except those at keep_priority or more urgent.
+        Returns the (text, lang) of the dropped replies.
+        """
+        kept, dropped = [], []
+        with self._lock:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item[0] <= keep_priority or item[2] is None:
+                    kept.append(item)
+                else:
+                    dropped.append(item)
+                    self._pending -= 1
+            for item in kept:
+                self._queue.put(item)
+            if self._current is not None and self._current > keep_priority:
+                self._interrupted.set()
+            self._idle.notify_all()
+        for item in dropped:
+            item[4].release()
+        return [(text, lang) for _, _, text, lang, _ in dropped]
+
+    def wait(self, timeout=None):
+        """Blocks until everything queued has been spoken (or cancelled)."""
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        self.cancel(keep_priority=-1)
+        self._queue.put((float('inf'), 0, None, None, NULL_TURN))
+
+    def _run(self):
+        while True:
+            priority, _, text, lang, turn = self._queue.get()
+            if text is None: break
+            with self._lock:
+                self._current = priority
+                self.turn = turn
+                self._interrupted.clear()
+            try:
+                self._play(text, lang, self._interrupted)
+            except Exception as e:
+                print(f"[JOEY TTS ERROR] Playback failed: {e}")
+            finally:
+                turn.mark('playback_end', barge_in=self._interrupted.is_set())
+                turn.release() # Before wait() returns, so a finished reply means a finished turn
+                with self._lock:
+                    self._current = None
+                    self.turn = NULL_TURN
+                    self._pending -= 1
+                    self._idle.notify_all()
+
+class NullSpeechSink:
+    """Stands in for the speakers: records what would have been said, and when, without any TTS."""
+    def __init__(self):
+        self.played = [] # (perf_counter time, text, lang)
+
+    def __call__(self, text, lang, interrupted):
+        self.played.append((time.perf_counter(), text, lang))
+
+# --- Resampling ---
+
+class PolyphaseResampler:
+    """
+    Streaming rational-ratio resampler for mono int16 blocks (e.g. 48 kHz or 44.1 kHz down to 16 kHz).
+    Only the kept output samples are computed, each as a dot product with one phase of a windowed-sinc
+    low-pass filter, and a whole block is done in one vectorized NumPy step. Filter state carries over
+    between blocks so there are no seams at block boundaries.
+    """
+    def __init__(self, in_rate, out_rate, taps_per_phase=RESAMPLER_TAPS_PER_PHASE):
+        g = math.gcd(int(in_rate), int(out_rate))
+        self.up, self.down = int(out_rate) // g, int(in_rate) // g
+        self.taps = taps_per_phase
+
+        # Prototype low-pass at the upsampled rate, cut off just below the lower of the two Nyquist rates
+        n = self.up * taps_per_phase
+        cutoff = 0.9 / max(self.up, self.down)
+        t = np.arange(n) - (n - 1) / 2
+        h = cutoff * np.sinc(cutoff * t) * np.kaiser(n, 8.0)
+        h *= self.up / h.sum() # Unity gain once the zero-stuffed samples are accounted for
+
+        # Phase p uses taps h[p], h[p + up], ...; reversed so it lines up with an ascending input window
+        self.phases = np.ascontiguousarray(h.reshape(taps_per_phase, self.up).T[:, ::-1], dtype=np.float32)
+        self._offsets = np.arange(taps_per_phase)
+        self.reset()
+
+    def reset(self):
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._next = 0 # Upsampled-grid position of the next output sample, relative to the next block
+
+    def process(self, block):
+        """Resamples one int16 block and returns the int16 output block."""
+        x = np.concatenate((self._history, block.astype(np.float32)))
+        total = len(block) * self.up
+        count = max(0, -(-(total - self._next) // self.down)) # ceil division
+        k = self._next + np.arange(count) * self.down
+        windows = x[(k // self.up)[:, None] + self._offsets] # Each row is the input history for one output
+        out = np.einsum('ij,ij->i', windows, self.phases[k % self.up])
+
+        self._next += count * self.down - total
+        self._history = x[len(x) - (self.taps - 1):]
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+# --- Bilingual Decoder ---
+
+def hypotheses(result):
+    """Non-empty (text, confidence) hypotheses of a Vosk result, best first. A plain result is a single hypothesis."""
+    result = json.loads(result)
+    alternatives = result.get('alternatives', [result])
+    return [(text, alt.get('confidence', 0.0)) for alt in alternatives if (text := transcript(alt))]
+
+def transcript(hypothesis):
+    """A hypothesis' text, with a comma wherever the word timings show a pause (compound commands split there)."""
+    words = hypothesis.get('result')
+    if not words: return hypothesis.get('text', '').strip()
+    parts = [words[0]['word']]
+    for before, word in zip(words, words[1:]):
+        if word['start'] - before['end'] >= COMPOUND_PAUSE_SECONDS: parts[-1] += ','
+        parts.append(word['word'])
+    return ' '.join(parts)
+
+def best_text(hyps):
+    return hyps[0][0] if hyps else ''
+
+def relative_likelihoods(hyps, scale=ASR_CONFIDENCE_SCALE):
+    """
+    One recognizer's hypotheses as (text, likelihood relative to its best, which gets 1.0). Raw Vosk
+    confidences aren't comparable between models; these are, so languages compete on intent similarity.
+    """
+    if not hyps: return []
+    confidences = np.array([confidence for _, confidence in hyps])
+    return [(text, float(weight)) for (text, _), weight in zip(hyps, np.exp((confidences - confidences.max()) / scale))]
+
+class BilingualDecoder:
+    """
+    Feeds audio blocks to the English and Hindi recognizers according to a decode policy.
+    Vosk releases the GIL while decoding, so with the 'both' policy the secondary language
+    decodes on a worker thread while the primary decodes on the caller's thread.
+    """
+    def __init__(self, recognizers, policy=DECODE_POLICY):
+        if policy not in DECODE_POLICIES:
+            raise ValueError(f"Unknown decode policy '{policy}'. Expected one of {DECODE_POLICIES}.")
+        self.recognizers = dict(recognizers) # {'en': KaldiRecognizer, 'hi': KaldiRecognizer}; replaced, never mutated
+        self.policy = policy
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='joey-decode')
+        self._held_audio = [] # Utterance audio kept for a deferred secondary pass
+        self._lock = threading.Lock()
+        self._incoming = {} # Recognizers that arrived mid-utterance; added at the next reset
+        self._outgoing = set() # Languages unloaded mid-utterance; removed at the next reset
+        self._in_utterance = False
+
+    def add_recognizer(self, lang, recognizer):
+        """Registers a recognizer whose model finished loading. Never joins an utterance halfway through."""
+        with self._lock:
+            if self._in_utterance:
+                self._incoming[lang] = recognizer
+            else:
+                self.recognizers = {**self.recognizers, lang: recognizer}
+
+    def remove_recognizer(self, lang):
+        """Drops a language whose model is being unloaded, after the current utterance if there is one."""
+        with self._lock:
+            self._incoming.pop(lang, None)
+            if self._in_utterance:
+                self._outgoing.add(lang)
+            else:
+                self.recognizers = {other: rec for other, rec in self.recognizers.items() if other != lang}
+
+    def _secondaries(self, primary):
+        return [lang for lang in self.recognizers if lang != primary]
+
+    def accept(self, data, primary):
+        """Decodes one block. Returns True when the primary recognizer reached an endpoint."""
+        self._in_utterance = True
+        if self.policy == 'both':
+            futures = [self._pool.submit(self.recognizers[lang].AcceptWaveform, data) for lang in self._secondaries(primary)]
+            endpoint = self.recognizers[primary].AcceptWaveform(data)
+            for future in futures: future.result() # Surface decoder errors and keep the streams in step
+            return bool(endpoint)
+        if self.policy == 'secondary_on_silence':
+            self._held_audio.append(data)
+        return bool(self.recognizers[primary].AcceptWaveform(data))
+
+    def result(self, lang):
+        """Hypotheses for the utterance segment a recognizer just endpointed."""
+        return hypotheses(self.recognizers[lang].Result())
+
+    def partial(self, lang):
+        """A recognizer's current hypothesis for the utterance so far."""
+        return json.loads(self.recognizers[lang].PartialResult()).get('partial', '')
+
+    def final_results(self, primary):
+        """Flushes the recognizers at the end of an utterance. Returns {lang: hypotheses, best first}."""
+        results = {lang: [] for lang in self.recognizers}
+        if self.policy == 'both':
+            futures = {lang: self._pool.submit(self.recognizers[lang].FinalResult) for lang in self._secondaries(primary)}
+            results[primary] = hypotheses(self.recognizers[primary].FinalResult())
+            for lang, future in futures.items():
+                results[lang] = hypotheses(future.result())
+            return results
+
+        results[primary] = hypotheses(self.recognizers[primary].FinalResult())
+        if self.policy == 'secondary_on_silence' and not results[primary] and self._held_audio:
+            # The active language heard nothing; give the utterance to the other language(s) in one go
+            audio = b''.join(self._held_audio)
+            for lang in self._secondaries(primary):
+                self.recognizers[lang].AcceptWaveform(audio)
+                results[lang] = hypotheses(self.recognizers[lang].FinalResult())
+        return results
+
+    @staticmethod
+    def pick(results, primary):
+        """Merges per-language 1-best texts: the longest non-empty text wins, ties go to the active language."""
+        ranked = sorted(results.items(), key=lambda item: (len(item[1]), item[0] == primary), reverse=True)
+        lang, text = ranked[0] if ranked else (primary, '')
+        return (lang, text) if text else (primary, '')
+
+    def reset(self):
+        """Readies the recognizers for the next utterance."""
+        for rec in self.recognizers.values():
+            rec.Reset()
+        self._held_audio = []
+        with self._lock:
+            self._in_utterance = False
+            if self._incoming or self._outgoing:
+                merged = {**self.recognizers, **self._incoming}
+                self.recognizers = {lang: rec for lang, rec in merged.items() if lang not in self._outgoing}
+                self._incoming, self._outgoing = {}, set()
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+# --- Command Mode ---
+
+def phrase_language(phrase):
+    return 'hi' if re.search('[\u0900-\u097F]', phrase) else 'en'
+
+def command_grammar(intents, lang, slot_intents=SLOT_INTENTS):
+    """
+    Vosk grammar for one language's command recognizer: every fixed phrase in that script, every slot
+    carrier also followed (or surrounded) by an [unk] wildcard, and [unk] alone for anything else.
+    """
+    phrases = []
+    for intent, intent_phrases in intents.items():
+        spec = slot_intents.get(intent)
+        for phrase in list(intent_phrases) + (spec['extra'] if spec else []):
+            if phrase_language(phrase) != lang: continue
+            words = ' '.join(re.sub(r"[^\w\s'\u0900-\u097F]", ' ', phrase.lower()).split())
+            if not words: continue
+            phrases.append(words)
+            if spec:
+                phrases.append(f"{words} [unk]" if spec['anchored'] else f"[unk] {words} [unk]")
+    return list(dict.fromkeys(phrases)) + ['[unk]']
+
+def supports_grammar(model_path):
+    """Whether a Vosk model has the runtime graph (HCLr.fst + Gr.fst) that grammars are compiled against."""
+    return all(os.path.exists(os.path.join(model_path, 'graph', name)) for name in ('HCLr.fst', 'Gr.fst'))
+
+class CommandDecoder:
+    """
+    Grammar-constrained command recognizers in front of a BilingualDecoder, with the same interface.
+    A command recognizer only knows the intent table's phrases, so it is cheaper to run and can't drift
+    into similar-sounding words. Its result is used when it's a complete phrase; anything containing
+    [unk] falls back to open-vocabulary decoding. In 'alongside' mode both decode every block; in
+    'first' mode the open decoder only sees the utterance, replayed from memory, on a fallback.
+    """
+    def __init__(self, decoder, mode=COMMAND_MODE):
+        if mode not in COMMAND_MODES or mode == 'off':
+            raise ValueError(f"Unknown command mode '{mode}'. Expected 'alongside' or 'first'.")
+        self.decoder = decoder
+        self.mode = mode
+        self.commands = {} # {lang: grammar KaldiRecognizer}; replaced, never mutated
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='joey-command')
+        self._held_audio = []
+        self._command = None # Command recognizer of the current utterance, if its language has one
+        self._started = False
+
+    @property
+    def recognizers(self):
+        return self.decoder.recognizers
+
+    def add_recognizer(self, lang, recognizer):
+        self.decoder.add_recognizer(lang, recognizer)
+
+    def add_command_recognizer(self, lang, recognizer):
+        self.commands = {**self.commands, lang: recognizer} # Only picked up at the start of an utterance
+
+    def remove_recognizer(self, lang):
+        self.commands = {other: rec for other, rec in self.commands.items() if other != lang}
+        self.decoder.remove_recognizer(lang)
+
+    def accept(self, data, primary):
+        """Decodes one block. Returns True when the open primary recognizer reached an endpoint."""
+        if not self._started:
+            self._started = True
+            self._command = self.commands.get(primary)
+        if self._command is None:
+            return self.decoder.accept(data, primary)
+        if self.mode == 'first':
+            self._held_audio.append(data)
+            self._command.AcceptWaveform(data)
+            return False # The VAD ends the utterance; the open decoder hasn't heard anything yet
+        future = self._pool.submit(self._command.AcceptWaveform, data)
+        endpoint = self.decoder.accept(data, primary)
+        future.result()
+        return endpoint
+
+    def _command_text(self):
+        """The command recognizer's final text if it's a complete phrase, else None."""
+        text = json.loads(self._command.FinalResult()).get('text', '')
+        return text if text and '[unk]' not in text.split() else None
+
+    def result(self, lang):
+        hyps = self.decoder.result(lang)
+        if self._command is not None:
+            text = self._command_text()
+            if text: return [(text, 0.0)]
+        return hyps
+
+    def partial(self, lang):
+        recognizer = self._command if self._command is not None else self.decoder.recognizers[lang]
+        partial = json.loads(recognizer.PartialResult()).get('partial', '')
+        return ' '.join(word for word in partial.split() if word != '[unk]')
+
+    def final_results(self, primary):
+        if self._command is not None:
+            text = self._command_text()
+            if text is not None:
+                print(f"[VOSK] Command mode ({primary.upper()}): '{text}'")
+                return {lang: ([(text, 0.0)] if lang == primary else []) for lang in self.decoder.recognizers}
+            if self.mode == 'first' and self._held_audio:
+                self.decoder.accept(b''.join(self._held_audio), primary) # Not a known command; decode it in full
+        return self.decoder.final_results(primary)
+
+    pick = staticmethod(BilingualDecoder.pick)
+
+    def reset(self):
+        for recognizer in self.commands.values():
+            recognizer.Reset()
+        self._held_audio = []
+        self._command = None
+        self._started = False
+        self.decoder.reset()
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.decoder.close()
+
+# --- Wake Word ---
+
+class WakeWordGate:
+    """
+    Low-power gate in front of the main decoders. While Joey sleeps, speech blocks only go to small
+    grammar recognizers that know nothing but the wake phrases (and [unk]); the large English and
+    Hindi recognizers decode nothing until a wake phrase is heard.
+    """
+    def __init__(self, wake_words=WAKE_WORDS):
+        self.wake_words = {lang: sorted(phrases, key=len, reverse=True) for lang, phrases in wake_words.items()}
+        self.recognizers = {} # {lang: spotter}; replaced, never mutated
+
+    def grammar(self, lang):
+        return self.wake_words[lang] + ['[unk]']
+
+    def add_recognizer(self, lang, recognizer):
+        self.recognizers = {**self.recognizers, lang: recognizer}
+
+    def remove_recognizer(self, lang):
+        self.recognizers = {other: rec for other, rec in self.recognizers.items() if other != lang}
+
+    def accept(self, data):
+        """Feeds one block to every spotter. Returns the wake phrase as soon as one is heard, else None."""
+        for lang, recognizer in self.recognizers.items():
+            if recognizer.AcceptWaveform(data):
+                text = json.loads(recognizer.Result()).get('text', '')
+            else:
+                text = json.loads(recognizer.PartialResult()).get('partial', '')
+            for phrase in self.wake_words[lang]:
+                if f" {phrase} " in f" {text} ":
+                    self.reset()
+                    return phrase
+        return None
+
+    def reset(self):
+        for recognizer in self.recognizers.values():
+            recognizer.Reset()
+
+# --- Intent Index ---
+
+class IntentIndex:
+    """
+    Inverted index over the L2-normalised TF-IDF phrase vectors.
+    Scoring a query only touches the postings of the terms it contains, so the cost grows with the
+    number of phrases sharing a word with the query rather than with the size of the whole table.
+    Scores are cosine similarities (dot products of unit vectors), max-pooled per intent.
+    """
+    def __init__(self, indptr, rows, weights, intents, row_intent):
+        self.indptr = indptr # Postings of term j are rows[indptr[j]:indptr[j + 1]]
+        self.rows = rows
+        self.weights = weights
+        self.intents = list(intents)
+        self.row_intent = row_intent # Index into self.intents for every phrase row
+
+    @classmethod
+    def from_matrix(cls, corpus_vectors, intent_map):
+        """Builds the index from a fitted (phrases x terms) TF-IDF matrix."""
+        postings = corpus_vectors.tocsc() # Column j lists the phrases containing term j
+        postings.sort_indices()
+        intents = list(dict.fromkeys(intent_map))
+        intent_ids = {intent: i for i, intent in enumerate(intents)}
+        row_intent = np.array([intent_ids[intent] for intent in intent_map], dtype=np.int32)
+        return cls(postings.indptr, postings.indices, postings.data, intents, row_intent)
+
+    def scores(self, term_ids, term_weights):
+        """Sparse dot product of one query with every phrase sharing a term with it. Returns (rows, scores)."""
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        starts, ends = self.indptr[term_ids], self.indptr[term_ids + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        # Gather every posting of every query term in one step
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+        contributions = self.weights[offsets] * np.repeat(np.asarray(term_weights), lengths)
+        rows, inverse = np.unique(self.rows[offsets], return_inverse=True)
+        return rows, np.bincount(inverse, weights=contributions, minlength=len(rows))
+
+    def best_batch(self, query_ptr, term_ids, term_weights):
+        """
+        Scores a batch of queries in one pass (query q's terms are term_ids[query_ptr[q]:query_ptr[q + 1]]).
+        Returns the best (intent, score) per query, (None, 0.0) when it shares no term with any phrase.
+        Ties go to the earlier phrase, as in top_k.
+        """
+        best = [(None, 0.0)] * (len(query_ptr) - 1)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        starts, ends = self.indptr[term_ids], self.indptr[term_ids + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total: return best
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(total)
+        contributions = self.weights[offsets] * np.repeat(np.asarray(term_weights), lengths)
+        # One key per (query, phrase) pair, so every query is scored in the same bincount
+        query_of_term = np.repeat(np.arange(len(best)), np.diff(query_ptr))
+        keys, inverse = np.unique(np.repeat(query_of_term, lengths) * len(self.row_intent) + self.rows[offsets], return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions, minlength=len(keys))
+        queries, rows = np.divmod(keys, len(self.row_intent))
+        order = np.lexsort((rows, -np.round(scores, 12), queries))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = queries[order][1:] != queries[order][:-1]
+        for i in order[first]:
+            best[queries[i]] = (self.intents[self.row_intent[rows[i]]], float(scores[i]))
+        return best
+
+    def top_k(self, term_ids, term_weights, k=INTENT_TOP_K):
+        """Returns up to k (intent, score, row) candidates, best first, each intent scored by its best phrase."""
+        rows, scores = self.scores(term_ids, term_weights)
+        if not len(rows): return []
+        intents = self.row_intent[rows]
+        # Best phrase per intent; equal scores go to the earlier phrase, like np.argmax over the dense scores.
+        # Rounding first makes exact ties independent of floating-point summation order.
+        keys = -np.round(scores, 12)
+        order = np.lexsort((rows, keys, intents))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = intents[order][1:] != intents[order][:-1]
+        best = order[first]
+        ranked = best[np.lexsort((rows[best], keys[best]))][:k]
+        return [(self.intents[intents[i]], float(scores[i]), int(rows[i])) for i in ranked]
+
+# --- Intent Model Artifact ---
+
+class TfidfEncoder:
+    """
+    Query-side TF-IDF transform rebuilt from a fitted vectorizer's vocabulary and IDF weights,
+    so the runtime doesn't need scikit-learn. Produces the same L2-normalised vector as
+    TfidfVectorizer.transform, as sparse (term_ids, weights) arrays.
+    """
+    def __init__(self, vocabulary, idf, settings=VECTORIZER_SETTINGS):
+        self.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        self.idf = idf
+        self.lowercase = settings['lowercase']
+        self.normalize = settings.get('normalize', False)
+        self.sublinear_tf = settings['sublinear_tf']
+        self.token_pattern = re.compile(settings['token_pattern'])
+
+    def prepare(self, text):
+        """The text front end the vectorizer was fitted with."""
+        if self.normalize: return normalize_text(text)
+        return text.lower() if self.lowercase else text
+
+    def transform(self, text):
+        return self.encode(self.prepare(text))
+
+    def encode(self, text):
+        """Vectorizes text that has already been through prepare()."""
+        counts = collections.Counter(self.vocabulary[token] for token in self.token_pattern.findall(text) if token in self.vocabulary)
+        if not counts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        term_ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.sublinear_tf: tf = 1 + np.log(tf)
+        weights = tf * self.idf[term_ids]
+        return term_ids, weights / np.linalg.norm(weights)
+
+    def transform_batch(self, texts):
+        """Transforms several texts at once. Returns CSR-style (indptr, term_ids, weights), text i at indptr[i]:indptr[i + 1]."""
+        counts = [collections.Counter(self.vocabulary[token] for token in self.token_pattern.findall(self.prepare(text))
+                                      if token in self.vocabulary) for text in texts]
+        lengths = np.fromiter((len(c) for c in counts), dtype=np.int64, count=len(counts))
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        term_ids = np.fromiter((term for c in counts for term in c.keys()), dtype=np.int64, count=indptr[-1])
+        tf = np.fromiter((n for c in counts for n in c.values()), dtype=np.float64, count=indptr[-1])
+        if self.sublinear_tf: tf = 1 + np.log(tf)
+        weights = tf * self.idf[term_ids]
+        text_of_term = np.repeat(np.arange(len(counts)), lengths)
+        norms = np.sqrt(np.bincount(text_of_term, weights=weights ** 2, minlength=len(counts)))
+        return indptr, term_ids, weights / norms[text_of_term]
+
+def intent_table_hash(intents, settings=VECTORIZER_SETTINGS):
+    """Identifies a compiled intent model: changes whenever a phrase, intent, vectorizer setting or normalizer table does."""
+    normalizer = [DEVANAGARI_CONSONANTS, DEVANAGARI_VOWELS, DEVANAGARI_VOWEL_SIGNS, DEVANAGARI_NASALS, DEVANAGARI_VIRAMA,
+                  DEVANAGARI_NUKTA, DEVANAGARI_DIGITS, ROMAN_FOLDS] if settings.get('normalize') else None
+    key = json.dumps({'format': INTENT_MODEL_FORMAT, 'intents': intents, 'settings': settings, 'normalizer': normalizer},
+                     sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def compile_intent_model(intents, path=INTENT_MODEL_DIR, settings=VECTORIZER_SETTINGS):
+    """
+    Fits TF-IDF on the intent table and, if path is given, writes the vocabulary, IDF weights,
+    normalised postings and intent map there. Returns (encoder, index).
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    corpus, intent_map = build_corpus(intents)
+    vectorizer = TfidfVectorizer(lowercase=settings['lowercase'], token_pattern=settings['token_pattern'], norm='l2',
+                                 preprocessor=normalize_text if settings['normalize'] else None,
+                                 smooth_idf=settings['smooth_idf'], sublinear_tf=settings['sublinear_tf'])
+    index = IntentIndex.from_matrix(vectorizer.fit_transform(corpus), intent_map)
+    vocabulary = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    encoder = TfidfEncoder(vocabulary, vectorizer.idf_, settings)
+    if path is None:
+        return encoder, index
+
+    try:
+        # Write to a scratch directory and swap it in, so a crash never leaves a half-written model
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        arrays = {'idf': vectorizer.idf_, 'indptr': index.indptr, 'rows': index.rows, 'weights': index.weights, 'row_intent': index.row_intent}
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), np.ascontiguousarray(array))
+        meta = {'format': INTENT_MODEL_FORMAT, 'hash': intent_table_hash(intents, settings), 'settings': settings,
+                'vocabulary': vocabulary, 'intents': index.intents}
+        with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        if os.path.isdir(path): shutil.rmtree(path)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"[JOEY WARNING] Could not save the compiled intent model to '{path}': {e}")
+    return encoder, index
+
+def load_intent_model(intents, path=INTENT_MODEL_DIR, settings=VECTORIZER_SETTINGS):
+    """Memory-maps a compiled intent model. Returns (encoder, index), or None if it's missing or stale."""
+    try:
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('hash') != intent_table_hash(intents, settings):
+            return None
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+                  for name in ('idf', 'indptr', 'rows', 'weights', 'row_intent')}
+    except (OSError, ValueError):
+        return None
+    encoder = TfidfEncoder(meta['vocabulary'], arrays['idf'], settings)
+    index = IntentIndex(arrays['indptr'], arrays['rows'], arrays['weights'], meta['intents'], arrays['row_intent'])
+    return encoder, index
+
+# --- Slot Extraction ---
+
+class SlotExtractor:
+    """
+    Carrier-phrase slot extraction compiled once from the intent table.
+    Each slot intent gets one precompiled regex whose alternation holds all of its carrier phrases,
+    longest first, so locating the carrier and capturing the slot is a single pass over the text.
+    """
+    def __init__(self, intents, slot_intents=SLOT_INTENTS):
+        self.patterns = {}
+        for intent, spec in slot_intents.items():
+            carriers = sorted(set(intents.get(intent, [])) | set(spec['extra']), key=len, reverse=True)
+            alternation = '|'.join(re.escape(carrier) for carrier in carriers)
+            # Whitespace boundaries rather than \b, which misfires on Devanagari vowel signs
+            before = '' if spec['anchored'] else r'(?P<before>.*?)(?<!\S)'
+            pattern = re.compile(rf'^{before}(?:{alternation})(?!\S)(?P<after>.*)$', re.DOTALL)
+            self.patterns[intent] = (pattern, spec['span'])
+
+    def extract(self, intent, text):
+        """Returns the slot text for a slot intent, or None if there is no carrier or nothing around it."""
+        entry = self.patterns.get(intent)
+        if entry is None: return None
+        pattern, span = entry
+        match = pattern.match(text)
+        if not match: return None
+        slot = match.group('after')
+        if span == 'rest':
+            slot = f"{match.groupdict().get('before') or ''} {slot}"
+        return ' '.join(slot.split()) or None
+
+# --- Compound Commands ---
+
+COMPOUND_BOUNDARY = re.compile(r'\s*(,)\s*|\s+(' + '|'.join(
+    re.escape(conjunction) for conjunction in sorted(COMPOUND_CONJUNCTIONS, key=len, reverse=True)) + r')(?=\s)\s*')
+
+def compound_pieces(text):
+    """
+    Cuts an utterance at pauses (commas in the transcript) and conjunctions, except for a conjunction inside
+    a spoken time ("in one hour and ten minutes", "एक घंटे और दस मिनट में"), which belongs to its command.
+    Returns [(separator, piece)], the separator being the conjunction before the piece ('' for a pause or the first piece).
+    """
+    durations = [match.span('parts') for match in DURATION_PATTERN.finditer(text)]
+    pieces, separator, start = [], '', 0
+    for boundary in COMPOUND_BOUNDARY.finditer(text):
+        if any(begin < boundary.start() and boundary.end() < end for begin, end in durations): continue
+        piece = text[start:boundary.start()].strip()
+        if piece:
+            pieces.append((separator, piece))
+            separator = ''
+        separator = boundary.group(2) or separator # A pause keeps the conjunction before it
+        start = boundary.end()
+    if text[start:].strip():
+        pieces.append((separator, text[start:].strip()))
+    return pieces
+
+WAKE_PHRASES = {phrase for phrases in WAKE_WORDS.values() for phrase in phrases} # "joey, ..." is an address, not a command
+
+def without_pauses(text):
+    return ' '.join(text.replace(',', ' ').split())
+
+# --- Early Commit ---
+
+class EarlyCommit:
+    """
+    Watches the partial hypothesis of the active recognizer during an utterance. Once a speculative
+    intent has matched with high confidence for `stable_blocks` blocks in a row, update() returns it,
+    at most once per utterance.
+    """
+    def __init__(self, classify, intents=SPECULATIVE_INTENTS, min_confidence=SPECULATIVE_CONFIDENCE,
+                 stable_blocks=SPECULATIVE_STABLE_BLOCKS):
+        self.classify = classify # classify(text) -> (intent, confidence), or (None, 0.0)
+        self.intents = intents
+        self.min_confidence = min_confidence
+        self.stable_blocks = stable_blocks
+        self.reset()
+
+    def reset(self):
+        self._text = None
+        self._intent = None
+        self._streak = 0
+        self.committed = None
+
+    def update(self, partial):
+        if self.committed is not None: return None
+        if partial != self._text: # Partials repeat between words; only re-score new text
+            self._text = partial
+            intent, confidence = self.classify(partial) if partial else (None, 0.0)
+            candidate = intent if intent in self.intents and confidence >= self.min_confidence else None
+            self._streak = self._streak if candidate == self._intent else 0
+            self._intent = candidate
+        if self._intent is None: return None
+        self._streak += 1
+        if self._streak < self.stable_blocks: return None
+        self.committed = self._intent
+        return self.committed
+
+# --- Startup Profiling ---
+
+class StartupProfiler:
+    """
+    Wall-clock timeline of the startup phases, measured from process start.
+    Phases can overlap: the models load in the background while the mic diagnostic runs.
+    """
+    def __init__(self, origin=_PROCESS_START):
+        self.origin = origin
+        self.phases = {} # name -> [start, end]; end is None while the phase is running
+        self._lock = threading.Lock()
+
+    def record(self, name, start, end=None):
+        with self._lock:
+            self.phases[name] = [start, end]
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        self.record(name, start)
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.record(name, now, now)
+
+    def elapsed(self):
+        return time.perf_counter() - self.origin
+
+    def report(self):
+        with self._lock:
+            phases = sorted(self.phases.items(), key=lambda item: item[1][0])
+        print("\n[JOEY] Startup profile (seconds since launch):")
+        print(f"    {'phase':<16}{'start':>8}{'end':>8}{'wall':>8}")
+        for name, (start, end) in phases:
+            if end is None:
+                print(f"    {name:<16}{start - self.origin:>8.2f}{'...':>8}{'running':>8}")
+            else:
+                print(f"    {name:<16}{start - self.origin:>8.2f}{end - self.origin:>8.2f}{end - start:>8.2f}")
+
+# --- Model Memory ---
+
+def directory_size(path):
+    """Bytes on disk under path; a Vosk model's resident size is close to it."""
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def process_rss():
+    """Resident memory of this process in bytes, or None where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class ModelManager:
+    """
+    Decides which Vosk models are resident under a memory policy (see MODEL_POLICIES) and loads them on
+    background threads. Activating a language preloads it; models the policy no longer wants are only
+    unloaded once the active one is ready, so listening never goes deaf during a switch (the budget
+    may be exceeded for the length of one load).
+    """
+    def __init__(self, paths, load, unload, policy=MODEL_POLICY, budget_mb=MODEL_MEMORY_BUDGET_MB):
+        if policy not in MODEL_POLICIES:
+            raise ValueError(f"Unknown model policy '{policy}'. Expected one of {MODEL_POLICIES}.")
+        self.paths = dict(paths)
+        self._load = load # load(lang, path) -> model, on a loader thread
+        self._unload = unload # unload(lang), to drop everything built on the model
+        self.policy = policy
+        self.budget = budget_mb * 1024 * 1024
+        self.sizes = {lang: directory_size(path) for lang, path in self.paths.items()}
+        self.models = {} # Resident models only
+        self._futures = {} # Models loading or resident
+        self._recent = [] # Languages by last activation, most recent last
+        self._listeners = [] # Called with the language after every load
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='joey-model')
+
+    @property
+    def loading(self):
+        with self._lock:
+            return any(not future.done() for future in self._futures.values())
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def start(self, active):
+        """Loads what the policy keeps resident from the outset, active language first."""
+        self._touch(active)
+        for lang in [active] + [lang for lang in self.paths if lang != active]:
+            planned = sum(self.sizes[other] for other in self._futures)
+            if lang == active or self.policy == 'both' or (self.policy == 'budget' and planned + self.sizes[lang] <= self.budget):
+                self.ensure(lang)
+
+    def ensure(self, lang):
+        """Starts loading a model unless it's resident or already loading. Returns its future."""
+        with self._lock:
+            if lang not in self._futures:
+                self._futures[lang] = self._pool.submit(self._load_resident, lang)
+            return self._futures[lang]
+
+    def activate(self, lang):
+        """Makes lang the active language: preloads it, then lets the policy evict the others."""
+        self._touch(lang)
+        future = self.ensure(lang)
+        if future.done(): self._trim() # Otherwise trimmed when it finishes loading
+        return future
+
+    def _touch(self, lang):
+        with self._lock:
+            if lang in self._recent: self._recent.remove(lang)
+            self._recent.append(lang)
+
+    def _load_resident(self, lang):
+        try:
+            model = self._load(lang, self.paths[lang])
+        except BaseException:
+            with self._lock:
+                self._futures.pop(lang, None) # Callers still get this error; the next ensure() retries
+            raise
+        with self._lock:
+            self.models[lang] = model
+        for listener in self._listeners:
+            listener(lang)
+        if not self._trim(): self.report()
+        return model
+
+    def _trim(self):
+        """Unloads the models the policy no longer wants. Returns True if any were unloaded."""
+        if self.policy == 'both': return False
+        with self._lock:
+            active = self._recent[-1]
+            if active not in self.models: return False # Keep the others until the active model is ready
+            # Least recently activated first
+            candidates = sorted((lang for lang in self.models if lang != active),
+                                key=lambda lang: self._recent.index(lang) if lang in self._recent else -1)
+            total = sum(self.sizes[lang] for lang in self.models)
+            victims = []
+            for lang in candidates:
+                if self.policy == 'budget' and total <= self.budget: break
+                victims.append(lang)
+                total -= self.sizes[lang]
+            for lang in victims:
+                del self.models[lang]
+                del self._futures[lang]
+        for lang in victims:
+            self._unload(lang)
+            print(f"[JOEY] Unloaded the '{lang}' model ({self.sizes[lang] / 2**20:.0f} MB).")
+        if victims: self.report()
+        return bool(victims)
+
+    def report(self):
+        """Prints the resident models with their estimated sizes, and the process's resident memory."""
+        with self._lock:
+            resident = ', '.join(f"{lang} ({self.sizes[lang] / 2**20:.0f} MB)" for lang in self.models) or 'none'
+        rss = process_rss()
+        print(f"[JOEY] Models resident: {resident}" + (f"; process RSS {rss / 2**20:.0f} MB." if rss else "."))
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+# --- Vehicle ---
+
+CanFrame = collections.namedtuple('CanFrame', 'arbitration_id data')
+VehicleSnapshot = collections.namedtuple('VehicleSnapshot', 'version time signals') # version 0: nothing received yet
+
+def encode_signal(value, scale):
+    return int(round(value / scale)).to_bytes(2, 'big', signed=True)
+
+def decode_signal(data, scale):
+    return int.from_bytes(data[:2], 'big', signed=True) * scale
+
+class SimulatedBus:
+    """
+    Stand-in for the car's CAN bus: a small vehicle model that broadcasts every signal in VEHICLE_SIGNALS
+    once per cycle and acts on actuator frames, acknowledging each on VEHICLE_ACK_ID. rate is in cycles per
+    second (0: a new cycle whenever the last one has been read, for benchmarking). A real backend only has
+    to offer the same send(frame) / recv(timeout) pair, as python-can's Bus does.
+    """
+    UNPACED_STEP = 0.1 # Seconds of simulated driving per cycle when rate is 0
+    AMBIENT_C = 32.0 # The cabin drifts towards this with the AC off
+
+    def __init__(self, rate=VEHICLE_UPDATE_HZ, seed=None):
+        self.rate = rate
+        self.step = 1 / rate if rate else self.UNPACED_STEP
+        self.state = {'speed_kmh': 0.0, 'fuel_percent': 80.0, 'cabin_temp_c': 31.0, 'ac_setpoint_c': 22.0, 'ac_on': 0, 'headlights_on': 0}
+        self.state.update({f'tire_{wheel}_psi': 32.0 for wheel in VEHICLE_WHEELS})
+        self._random = random.Random(seed)
+        self._scales = dict(VEHICLE_SIGNALS.values())
+        self._actuators = {arbitration_id: signal for signal, arbitration_id in VEHICLE_ACTUATORS.items()}
+        self._frames = collections.deque() # Frames of the current cycle not yet received
+        self._commands = queue.SimpleQueue() # Actuator frames sent to the car
+        self._next_cycle = time.monotonic()
+
+    def send(self, frame):
+        self._commands.put(frame)
+
+    def recv(self, timeout=None):
+        """The next frame on the bus, or None if there is none within timeout seconds."""
+        if not self._frames:
+            wait = self._next_cycle - time.monotonic() if self.rate else 0.0
+            if wait > 0:
+                if timeout is not None and timeout < wait:
+                    time.sleep(timeout)
+                    return None
+                time.sleep(wait)
+            self._cycle()
+        return self._frames.popleft()
+
+    def _cycle(self):
+        """One bus cycle: act on (and acknowledge) the commands received, drive on, broadcast every signal."""
+        self._next_cycle = max(self._next_cycle + self.step, time.monotonic())
+        while True:
+            try:
+                frame = self._commands.get_nowait()
+            except queue.Empty:
+                break
+            signal = self._actuators.get(frame.arbitration_id)
+            accepted = signal is not None
+            if accepted:
+                value = decode_signal(frame.data[2:], self._scales[signal])
+                if signal == 'ac_setpoint_c': accepted = AC_SETPOINT_RANGE[0] <= value <= AC_SETPOINT_RANGE[1]
+                if accepted: self.state[signal] = value
+            self._frames.append(CanFrame(VEHICLE_ACK_ID, frame.data[:2] + bytes([0 if accepted else 1])))
+        self._drive(self.step)
+        self._frames.extend(CanFrame(arbitration_id, encode_signal(self.state[signal], scale))
+                            for arbitration_id, (signal, scale) in VEHICLE_SIGNALS.items())
+
+    def _drive(self, dt):
+        state, noise = self.state, self._random.gauss
+        state['speed_kmh'] = min(max(state['speed_kmh'] + (60.0 - state['speed_kmh']) * 0.05 * dt + noise(0, 1.5) * math.sqrt(dt), 0.0), 140.0)
+        state['fuel_percent'] = max(state['fuel_percent'] - state['speed_kmh'] * dt * 2e-5, 0.0)
+        target = state['ac_setpoint_c'] if state['ac_on'] else self.AMBIENT_C
+        state['cabin_temp_c'] += (target - state['cabin_temp_c']) * min(0.02 * dt, 1.0)
+        for wheel in VEHICLE_WHEELS:
+            state[f'tire_{wheel}_psi'] += noise(0, 0.01) * math.sqrt(dt)
+
+class VehicleState:
+    """
+    The car's current state, read from its bus (SimulatedBus or a real CAN interface) on a background thread.
+    Readers take self.snapshot, an immutable VehicleSnapshot the bus thread replaces wholesale after each
+    burst of frames, so a reply reads current values without a lock and never waits on the bus.
+    Actuator commands are queued with command() and sent by a writer thread; each returns a Future that
+    is resolved when the car acknowledges it.
+    """
+    MAX_BURST = 256 # Frames decoded before a snapshot is published, however busy the bus is
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.snapshot = VehicleSnapshot(0, 0.0, {})
+        self.frames = 0 # Signal frames decoded so far
+        self._scales = dict(VEHICLE_SIGNALS.values())
+        self._commands = queue.Queue()
+        self._pending = {} # Sequence number -> (signal, Future) of each command awaiting acknowledgement
+        self._lock = threading.Lock() # Guards _pending between the writer, the reader and close()
+        self._running = True
+        self._reader = threading.Thread(target=self._read, daemon=True, name='joey-vehicle-bus')
+        self._writer = threading.Thread(target=self._write, daemon=True, name='joey-vehicle-commands')
+        self._reader.start()
+        self._writer.start()
+
+    def command(self, signal, value):
+        """
+        Queues an actuator command. The returned Future resolves once the car acknowledges it, or fails if
+        the car rejects it. Cancelling it (e.g. on a timeout) makes a late acknowledgement be ignored.
+        """
+        if signal not in VEHICLE_ACTUATORS:
+            raise ValueError(f"Unknown actuator '{signal}'. Expected one of {tuple(VEHICLE_ACTUATORS)}.")
+        ack = Future()
+        self._commands.put((signal, value, ack))
+        return ack
+
+    def close(self):
+        self._running = False
+        self._commands.put((None, None, None))
+        self._reader.join(timeout=1.0)
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for _, ack in pending.values():
+            ack.cancel()
+
+    def _write(self):
+        sequence = 0
+        while True:
+            signal, value, ack = self._commands.get()
+            if signal is None: break
+            if ack.cancelled(): continue # Timed out before it could be sent
+            sequence = sequence % 0xFFFF + 1
+            with self._lock:
+                self._pending[sequence] = (signal, ack)
+            ack.add_done_callback(lambda ack, sequence=sequence: self._forget(sequence, ack))
+            self.bus.send(CanFrame(VEHICLE_ACTUATORS[signal], sequence.to_bytes(2, 'big') + encode_signal(value, self._scales[signal])))
+
+    def _forget(self, sequence, ack):
+        """Drops a command that timed out (or was answered) from the pending ones."""
+        with self._lock:
+            if self._pending.get(sequence, (None, None))[1] is ack: del self._pending[sequence]
+
+    def _read(self):
+        signals = {}
+        while self._running:
+            try:
+                frame = self.bus.recv(timeout=0.1)
+                if frame is None: continue
+                for _ in range(self.MAX_BURST): # Drain the burst, then publish it as one snapshot
+                    self._decode(frame, signals)
+                    frame = self.bus.recv(timeout=0)
+                    if frame is None: break
+                self.snapshot = VehicleSnapshot(self.snapshot.version + 1, time.monotonic(), dict(signals))
+            except Exception as e:
+                print(f"[JOEY VEHICLE ERROR] Reading the bus failed: {e}")
+                time.sleep(1.0)
+
+    def _decode(self, frame, signals):
+        if frame.arbitration_id == VEHICLE_ACK_ID:
+            with self._lock:
+                signal, ack = self._pending.pop(int.from_bytes(frame.data[:2], 'big'), (None, None))
+            # Claims the Future, so a timeout can no longer cancel it; False if it already has been
+            if ack is None or not ack.set_running_or_notify_cancel(): return
+            if frame.data[2] == 0:
+                ack.set_result(True)
+            else:
+                ack.set_exception(ValueError(f"The car rejected the {signal} command"))
+            return
+        entry = VEHICLE_SIGNALS.get(frame.arbitration_id)
+        if entry is None: return
+        signal, scale = entry
+        signals[signal] = decode_signal(frame.data, scale)
+        self.frames += 1
+
+# --- Reminders ---
+
+def _alternation(words):
+    return '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+DURATION_NUMBER = rf"(?:{_alternation(DURATION_NUMBERS)}|\d+(?:\.\d+)?)"
+# One amount in one unit ("twenty five minutes"); a relative time is one or more of them
+DURATION_AMOUNT = rf"{DURATION_NUMBER}(?:\s+{DURATION_NUMBER})*"
+DURATION_UNIT = rf"(?:{_alternation(DURATION_UNITS)})(?!\S)"
+DURATION_PART = re.compile(rf"(?<!\S)(?P<number>{DURATION_AMOUNT})\s*(?P<unit>{DURATION_UNIT})")
+DURATION_PATTERN = re.compile(
+    rf"(?<!\S)(?:(?:{_alternation(DURATION_PREFIXES)})\s+)?(?P<parts>{DURATION_AMOUNT}\s*{DURATION_UNIT}"
+    rf"(?:\s+(?:(?:{_alternation(DURATION_JOINERS)})\s+)?{DURATION_AMOUNT}\s*{DURATION_UNIT})*)"
+    rf"(?:\s+(?:{_alternation(DURATION_SUFFIXES)}))?(?!\S)")
+
+def parse_duration(text):
+    """
+    Finds a relative time such as 'in 10 minutes', 'in one hour thirty minutes' or 'आधे घंटे बाद' in text.
+    Returns (seconds, what's left of the text), or (None, text) if there is none.
+    """
+    match = DURATION_PATTERN.search(text)
+    if not match: return None, text
+    seconds = 0.0
+    for part in DURATION_PART.finditer(match.group('parts')):
+        numbers = re.findall(rf"(?<!\S){DURATION_NUMBER}(?!\S)", part.group('number'))
+        amount = sum(float(number) if number[0].isdigit() else DURATION_NUMBERS[number] for number in numbers)
+        seconds += amount * DURATION_UNITS[part.group('unit')]
+    rest = ' '.join(f"{text[:match.start()]} {text[match.end():]}".split())
+    return seconds, re.sub(r'^(?:to|that|about)\s+', '', rest)
+
+def describe_duration(seconds, lang):
+    """'1 hour 30 minutes', '10 मिनट'..."""
+    units = {'en': (('hour', 'hours'), ('minute', 'minutes'), ('second', 'seconds')),
+             'hi': (('घंटे', 'घंटे'), ('मिनट', 'मिनट'), ('सेकंड', 'सेकंड'))}[lang]
+    seconds = round(seconds)
+    parts = []
+    for (singular, plural), size in zip(units, (3600, 60, 1)):
+        count, seconds = divmod(seconds, size)
+        if count: parts.append(f"{count} {singular if count == 1 else plural}")
+    return ' '.join(parts) or f"0 {units[2][1]}"
+
+class Scheduler:
+    """
+    Runs callbacks at wall-clock times on one background thread. Pending jobs sit in a heap (O(log n) to
+    add); the thread sleeps until the earliest is due or an earlier one is added. Cancelled jobs are
+    dropped lazily when they reach the top. Callbacks should be quick: speech is queued, not waited on.
+    """
+    def __init__(self):
+        self._heap = [] # [when, sequence, callback, args]; callback is None once cancelled
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True, name='joey-scheduler')
+        self._thread.start()
+
+    def call_at(self, when, callback, *args):
+        """Runs callback(*args) at time.time() == when (right away if that has passed). Returns a handle for cancel()."""
+        with self._condition:
+            self._sequence += 1
+            job = [when, self._sequence, callback, args]
+            heapq.heappush(self._heap, job)
+            if self._heap[0] is job: self._condition.notify() # Earlier than whatever the thread is sleeping towards
+        return job
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.time() + delay, callback, *args)
+
+    def cancel(self, job):
+        with self._condition:
+            job[2] = None
+
+    def close(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join(timeout=1.0)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and (not self._heap or self._heap[0][0] > time.time()):
+                    self._condition.wait(self._heap[0][0] - time.time() if self._heap else None)
+                if not self._running: return
+                _, _, callback, args = heapq.heappop(self._heap)
+            if callback is None: continue
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"[JOEY SCHEDULER ERROR] {getattr(callback, '__name__', callback)} failed: {e}")
+
+class ReminderStore:
+    """The local driver's pending reminders, saved to a small JSON file on every change so they survive a restart."""
+    def __init__(self, path=REMINDER_FILE):
+        self.path = path
+        self.reminders = {} # id -> {'id', 'due' (epoch seconds), 'task', 'lang'}
+        self._lock = threading.Lock()
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.reminders = {reminder['id']: reminder for reminder in json.load(f)}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[JOEY WARNING] Couldn't read reminders from '{path}': {e}")
+
+    def add(self, due, task, lang):
+        with self._lock:
+            reminder = {'id': max(self.reminders, default=0) + 1, 'due': due, 'task': task, 'lang': lang}
+            self.reminders[reminder['id']] = reminder
+            self._save()
+        return reminder
+
+    def remove(self, reminder_id):
+        with self._lock:
+            if self.reminders.pop(reminder_id, None) is not None: self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp{os.getpid()}"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(sorted(self.reminders.values(), key=lambda reminder: reminder['due']), f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[JOEY WARNING] Couldn't save reminders to '{self.path}': {e}")
+
+# --- Sessions ---
+
+class Session:
+    """
+    Per-conversation state: language, the driver's name, multi-turn context and the turn being handled.
+    The models, intent index, replies and handlers live on Joey and are shared by every session.
+    A headless session (server mode) collects its replies for the client instead of speaking them,
+    and decodes its audio with recognizers of its own built on the shared models.
+    """
+    def __init__(self, session_id='local', language='en', headless=False):
+        self.id = session_id
+        self.active_language = language
+        self.user_name = None
+        self.is_listening = True
+        self.context = {} # For multi-turn conversations
+        self.turn = NULL_TURN # The turn being captured and handled
+        self.speculative_intent = None # Intent committed early in the current turn
+        self.replies = [] if headless else None # Replies of the current request, for the client
+        self.merged = None # Replies held back to be spoken as one (compound commands)
+        self.confirmations = [] # Events set once each car command issued while replies are held back has been confirmed
+        self.unprompted = collections.deque() if headless else None # Reminders that fired, for the client's next reply
+        self.decoder = None # Headless only; built when the first audio arrives
+        self.vehicle = None # The car's VehicleState; headless sessions are other cars, with no bus here
+
+    def close(self):
+        if self.decoder is not None: self.decoder.close()
+
+def _session_attribute(name):
+    """A Joey attribute that lives on the session being handled."""
+    return property(lambda self: getattr(self.session, name), lambda self, value: setattr(self.session, name, value))
 
 # --- Main Joey Class ---
 
@@ -32,8 +2043,26 @@ class Joey:
     """
     The core class for our voice assistant, Joey.
     Manages state, language, intelligent intent recognition, and responses.
+    Audio comes from audio_source (the microphone by default) and replies go to speech_sink
+    (the speakers by default); both can be swapped for replay and benchmarking.
+    Per-conversation state lives on a Session: the local driver's, or in server mode the one bound
+    to the thread handling a client's request.
     """
-    def __init__(self):
+    active_language = _session_attribute('active_language')
+    user_name = _session_attribute('user_name')
+    is_listening = _session_attribute('is_listening')
+    context = _session_attribute('context')
+    turn = _session_attribute('turn')
+    speculative_intent = _session_attribute('speculative_intent')
+    vehicle = _session_attribute('vehicle')
+
+    def __init__(self, decode_policy=DECODE_POLICY, profile_startup=False, audio_source=None, speech_sink=None, tracer=None,
+                 early_commit=True, command_mode=COMMAND_MODE, model_policy=MODEL_POLICY, model_budget_mb=MODEL_MEMORY_BUDGET_MB,
+                 asr_alternatives=ASR_ALTERNATIVES, vehicle_bus=None, reminder_file=REMINDER_FILE, tts_backend=TTS_BACKEND_HI):
+        self.profile_startup = profile_startup
+        self.startup = StartupProfiler()
+        self.startup.record('imports', _PROCESS_START, _IMPORTS_DONE)
+
         # --- Model and Library Checks ---
         if not os.path.exists(MODEL_EN_PATH) or not os.path.exists(MODEL_HI_PATH):
             print("\n[JOEY ERROR] Vosk models not found! Please ensure folders are in the right place.")
@@ -42,121 +2071,92 @@ class Joey:
             sys.exit(1)
             
         print("[JOEY] Waking up... Calibrating language modules.")
-        self.model_en = Model(MODEL_EN_PATH)
-        self.model_hi = Model(MODEL_HI_PATH)
 
         # --- State Management ---
-        self.active_language = 'en'
-        self.user_name = None
-        self.is_listening = True
-        self.context = {} # For multi-turn conversations
+        self.local_session = Session()
+        self._bound = threading.local() # Server mode: the session each worker thread is handling
+        self.tracer = tracer or TurnTracer()
 
         # --- Text-to-Speech (TTS) Setup ---
-        self.tts_engine_en = pyttsx3.init()
-        self.tts_engine_en.setProperty('rate', 160)
-        mixer.init() # For playing Hindi audio with gTTS
+        self.tts_engine_en = None # Created on the speech worker thread; pyttsx3 engines aren't thread-safe
+        self.tts_cache = TTSCache() # The pygame mixer for Hindi audio also starts on the worker, on first use
+        self.tts_hi = hindi_speech_backends(tts_backend) # Tried in order for each chunk of a Hindi reply
+        self.output = SpeechOutput(speech_sink or self._play_speech)
+        # Under run(), Hindi replies are rendered by their own stage ahead of playback (on the speakers only)
+        self._render_ahead = speech_sink is None
+        self._loop = None
+        self._renders = None # run()'s queue of Hindi replies to render
+        self._rendering = {} # chunk of a Hindi reply -> Future of its (audio, format), taken by playback
+        self._unplayed = collections.Counter() # Chunks of queued Hindi replies not yet taken by playback
+        self._render_lock = threading.Lock() # Guards both; the render stage, playback and barge-in share them
+        # Under run(), the next capture starts while the last command is handled; it waits at speech onset
+        # until every captured command has been handled, so language and context changes apply to it
+        self._unhandled = 0
+        self._handled = threading.Condition()
+        self._render_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='joey-render')
 
         # --- Voice Recognition Setup ---
-        self.q = queue.Queue()
-        self.device_info = sd.query_devices(sd.default.device[0], 'input')
-        self.samplerate = int(self.device_info['default_samplerate'])
-        
-        # --- MASSIVELY EXPANDED Intent Dictionary for Demo ---
-        self.intents = {
-            # --- Conversational ---
-            'greeting': ['hello', 'hi', 'hey joey', 'namaste', 'ok driver', 'hey', 'start', 'wake up joey', 'joey', 'नमस्ते'],
-            'small_talk_how_are_you': [
-                'how are you', 'what\'s up', 'kya hal hai', 'kya chal raha hai', # Keep Romanized if Vosk gives Romanized for these
-                'कैसे हो', 'आप कैसे हो', 'आप कैसे हैं', # CHANGE TO DEVANAGARI
-                'कैसा है', 'तुम कैसे हो', 'आप ठीक हैं', 'आपकी तबियत कैसी है' # CHANGE TO DEVANAGARI
-            ],
-            'introduce_self': ['my name is', 'i am', 'मेरा नाम है', 'मैं हूँ'], # CHANGE TO DEVANAGARI
-            'thank_you': ['thank you', 'thanks a lot', 'शुक्रिया', 'धन्यवाद', 'बहुत शुक्रिया', 'thank u', 'शुक्रीया'], # CHANGE TO DEVANAGARI
-            'goodbye': ['goodbye', 'bye', 'exit', 'shut down', 'बंद हो जाओ', 'अलविदा', 'stop', 'टाटा'], # CHANGE TO DEVANAGARI
-            
-            # --- Language Switching ---
-            'change_language_hi': [
-                'hindi mode', 'switch to hindi', 'hindi mein bolo', 'hindi mein baat karo', 'talk to me in hindi',
-                'change to hindi', 'hindi chalu karo', 'hindi mein baat kar', 'hindi bhasha', 'हिंदी में बोलो',
-                'हिंदी मोड', 'हिंदी चलाओ' # CHANGED TO DEVANAGARI
-            ],
-            'change_language_en': [
-                'english mode', 'switch to english', 'english mein bolo', 'speak in english', 'talk to me in english',
-                'change to english', 'english chalu karo', 'english mein baat kar', 'english bhasha',
-                'अंग्रेजी में बात करें', 'इंग्लिश में बोलो', 'वापस इंग्लिश में', 'इंग्लिश मोड में आओ' # CHANGED TO DEVANAGARI
-            ],
+        self.audio_source = audio_source or MicrophoneSource()
+        self.samplerate = TARGET_SAMPLERATE # What the recognizers decode at
+        self.capture_rate = self.audio_source.rate
+        self.resampler = None
+        if self.capture_rate != self.samplerate:
+            print(f"[JOEY] Microphone doesn't support {self.samplerate} Hz; resampling from {self.capture_rate} Hz.")
+            self.resampler = PolyphaseResampler(self.capture_rate, self.samplerate)
+
+        # One recognizer per language for the whole session, Reset() between utterances.
+        # Each joins the decoder as soon as its model has loaded.
+        self.decoder = BilingualDecoder({}, decode_policy)
+        self.command_mode = command_mode
+        self.grammar_models = {} # Per language: the model grammar recognizers use
+        self._grammar_lock = threading.Lock()
+        if command_mode != 'off':
+            self.decoder = CommandDecoder(self.decoder, command_mode)
+        self.asr_alternatives = asr_alternatives
+        self.vad = EnergyVAD()
+        self.audio_seconds = 0.0 # Audio read so far; the clock for the wake word's follow-up window
+        self._dropped = 0 # Frames the audio source had dropped when last checked
+        self.wake_gate = None # Set up by start(wake_word=True)
+        self.awake_until = 0.0
+
+        # --- Vehicle ---
+        # Telemetry and actuators for the local driver's car, on the simulated bus unless a real one is given
+        self.vehicle = VehicleState(vehicle_bus or SimulatedBus())
+
+        # --- Reminders & Alerts ---
+        # One scheduler thread for reminders and the vehicle alert checks; what fires is queued for speech
+        self.scheduler = Scheduler()
+        self.reminder_store = ReminderStore(reminder_file)
+        self._reminder_jobs = {} # Stored reminder id -> its scheduler job
+        self._alert_job = None
+        self._alerted = set() # Alerts already given, until their condition clears
+
+        self.intents = INTENTS # Set before the loaders start; they build the command grammars from it
+
+        # The Vosk models load concurrently in the background (Vosk releases the GIL while loading).
+        # Startup only waits for the active language; which others stay resident is up to the model policy.
+        self.model_paths = {'en': MODEL_EN_PATH, 'hi': MODEL_HI_PATH}
+        if command_mode != 'off': self._check_grammar_models('Command mode')
+        self.model_manager = ModelManager(self.model_paths, self._load_model, self._unload_model, model_policy, model_budget_mb)
+        self.models = self.model_manager.models # Resident models only
+        self.model_manager.start(self.active_language)
 
-            # --- Core Features ---
-            'ask_name': ["what's your name", 'what is your name', 'who are you', 'तुम्हारा नाम क्या है', 'आपका नाम क्या है', 'तुम कौन हो', 'what do people call you'], # CHANGE TO DEVANAGARI
-            'ask_creator': ['who made you', 'who created you', 'तुम्हें किसने बनाया', 'आपको किसने बनाया', 'who is your developer'], # CHANGE TO DEVANAGARI
-            'ask_time': ['what time is it', 'time kya hua hai', 'समय क्या हुआ है', 'tell me the time', 'टाइम बताओ', 'घड़ी में क्या बजा है', 'कितने बजे हैं'], # CHANGE TO DEVANAGARI
-            'ask_weather': [
-                "what's the weather", 'how is the weather', 'weather kaisa hai', 'मौसम का हाल', 'आज का मौसम कैसा है',
-                'weather update do', 'मौसम की जानकारी दो', 'आज का वेदर कैसा था', 'आज का वेदर कैसा था', 'will it rain today',
-                'कल का मौसम', 'आज का तापमान', 'बारिश होगी' # CHANGE TO DEVANAGARI
-            ],
-            'ask_location': ['where are we', 'current location', 'हम कहाँ हैं', 'मेरी लोकेशन बताओ', 'हमारी लोकेशन क्या है', 'where am i', 'लोकेशन बताओ', 'मेरी स्थिति क्या है'], # CHANGE TO DEVANAGARI
-            'vehicle_status': ['car status', 'vehicle status', 'check the car', 'गाड़ी की स्थिति', 'मेरी गाड़ी का स्टेटस बताओ', 'what\'s my car\'s status', 'इंजन चेक', 'गाड़ी का हाल'], # CHANGE TO DEVANAGARI
-            
-            # --- NEW DRIVER FEATURES ---
-            'ask_fuel_level': ['what\'s the fuel level', 'how much fuel is left', 'fuel status', 'check fuel', 'कितना पेट्रोल बचा है', 'फ्यूल कितना है', 'तेल कितना है', 'गाड़ी में पेट्रोल कितना है', 'ईंधन का स्तर बताओ'],
-            'ask_tire_pressure': ['what\'s the tire pressure', 'check tire pressure', 'tire pressure status', 'टायर में हवा कितनी है', 'टायर प्रेशर बताओ', 'टायर का दबाव कैसा है'],
-            'increase_temperature': ['increase temperature', 'make it warmer', 'temperature up', 'turn up the heat', 'तापमान बढ़ाओ', 'गर्मी बढ़ाओ', 'टेंपरेचर बढ़ाओ'],
-            'decrease_temperature': ['decrease temperature', 'make it cooler', 'temperature down', 'turn down the heat', 'तापमान घटाओ', 'ठंडा करो', 'टेंपरेचर कम करो'],
-            'turn_ac_on': ['turn ac on', 'switch on ac', 'ac chalao', 'एसी चलाओ', 'एसी ऑन करो', 'एसी चालू करो'],
-            'turn_ac_off': ['turn ac off', 'switch off ac', 'ac band karo', 'एसी बंद करो', 'एसी ऑफ़ करो'],
-            'find_nearest': ['find nearest', 'where is the nearest', 'locate nearest', 'सबसे नज़दीकी कहाँ है', 'नज़दीकी ढूंढो'], # Entity extracted for what to find
-            'traffic_update': ['traffic update', 'how\'s the traffic', 'is there traffic ahead', 'ट्रैफिक बताओ', 'यातायात कैसा है', 'आगे ट्रैफिक है क्या'],
-            'ask_eta': ['what\'s my eta', 'estimated time of arrival', 'when will i arrive', 'पहुँचने में कितना समय लगेगा', 'ईटीए बताओ', 'कब पहुंचेंगे'],
-            'headlights_on': ['turn headlights on', 'headlights on', 'हेडलाइट ऑन करो', 'लाइट जलाओ'],
-            'headlights_off': ['turn headlights off', 'headlights off', 'हेडलाइट बंद करो', 'लाइट बुझाओ'],
-            # --- END NEW DRIVER FEATURES ---
-
-            'navigate': [
-                'navigate to', 'take me to', 'mujhe le jao', 'get directions to', 'mujhe jana hai', 'chalo', 'go to', 'drive to',
-                'मुझे घर ले चलो', 'मुझे हॉस्पिटल ले जाओ', 'नेविगेशन शुरू करो', 'रास्ता बताओ', 'नेविगेट करो' # CHANGE TO DEVANAGARI
-            ],
-            'cancel_navigation': ['cancel navigation', 'stop navigation', 'रुक जाओ', 'नेविगेशन बंद करो', 'रूट कैंसिल करो'], # CHANGE TO DEVANAGARI
-            
-            # --- Entertainment ---
-            'tell_joke': ['tell me a joke', 'जोक सुनाओ', 'कोई चुटकुला सुनाओ', 'make me laugh', 'हंसाओ', 'एक जोक सुनाओ'], # CHANGE TO DEVANAGARI
-            'joke_feedback': ['not funny', 'that was a bad joke', 'बेकार था', 'अच्छा नहीं था', 'lame joke', 'मजा नहीं आया'], # CHANGE TO DEVANAGARI
-            'tell_riddle': ['tell me a riddle', 'ask me a riddle', 'रिडल पूछो', 'एक पहेली पूछो', 'पहेली सुनाओ'], # CHANGE TO DEVANAGARI
-            'answer_riddle': ['what is the answer', 'आंसर क्या है', 'tell me the solution', 'जवाब बताओ', 'रिडल का आंसर'], # CHANGE TO DEVANAGARI
-            'tell_fact': ['tell me a fact', 'share a fact', 'कोई तथ्य बताओ', 'ज्ञान की बात', 'इंट्रेस्टिंग फैक्ट'], # CHANGE TO DEVANAGARI
-
-            # --- Music Control (Simulated) ---
-            'play_music': ['play music', 'play a song', 'गाना बजाओ', 'म्यूजिक चलाओ', 'play something', 'सॉन्ग चलाओ'], # CHANGE TO DEVANAGARI
-            'pause_music': ['pause music', 'stop music', 'गाना रोको', 'म्यूजिक बंद करो', 'पॉज सॉन्ग'], # CHANGE TO DEVANAGARI
-            'next_song': ['next song', 'अगला गाना', 'skip song', 'नेक्स्ट ट्रैक'], # CHANGE TO DEVANAGARI
-            'previous_song': ['previous song', 'पिछला गाना', 'प्रीवियस ट्रैक'], # CHANGE TO DEVANAGARI
-            'volume_up': ['volume up', 'आवाज बढ़ाओ', 'raise volume', 'वॉल्यूम तेज करो'], # CHANGE TO DEVANAGARI
-            'volume_down': ['volume down', 'आवाज कम करो', 'lower volume', 'वॉल्यूम धीमा करो'], # CHANGE TO DEVANAGARI
-
-            # --- Calling/Messaging (Simulated) ---
-            'make_call': ['call', 'make a call', 'फ़ोन लगा दो', 'call someone', 'किसी को कॉल करो'], # CHANGE TO DEVANAGARI
-            'send_message': ['send message', 'text', 'मैसेज भेजो', 'टेक्स्ट करो'], # CHANGE TO DEVANAGARI
-            
-            # --- Utility & Help ---
-            'translate': ['translate', 'can you translate', 'ट्रांसलेट कर दो', 'अनुवाद करो'], # CHANGE TO DEVANAGARI
-            'help': ['what can you do', 'help', 'help me', 'क्या कर सकते हो', 'मदद करो', 'capabilities', 'commands', 'व्हाट कैन आई आस्क'], # CHANGE TO DEVANAGARI
-            'emergency': ['emergency', 'call police', 'call ambulance', 'i need help', 'trouble', 'sos', 'हेल्प मी नाउ'], # CHANGE TO DEVANAGARI
-            'set_reminder': ['set a reminder', 'remind me', 'मुझे याद दिलाओ', 'रिमाइंडर सेट करो'], # CHANGE TO DEVANAGARI
-            'open_app': ['open app', 'launch app', 'ऐप खोलो'], # CHANGE TO DEVANAGARI
-            'what_is': ['what is', 'define', 'क्या है'], # CHANGE TO DEVANAGARI
-        }
-        
         # --- TF-IDF Setup for Intent Recognition ---
-        self.corpus = []
-        self.intent_map = []
-        for intent, phrases in self.intents.items():
-            for phrase in phrases:
-                self.corpus.append(phrase)
-                self.intent_map.append(intent)
-
-        self.vectorizer = TfidfVectorizer()
-        self.corpus_vectors = self.vectorizer.fit_transform(self.corpus)
-        print("[JOEY] Language modules calibrated. Ready for your command!")
+        # Runs on this thread while the models load. The compiled model is memory-mapped from disk and
+        # only refitted (with scikit-learn) when the intent table or vectorizer settings have changed.
+        with self.startup.phase('nlu'):
+            intent_model = load_intent_model(self.intents)
+            if intent_model is None:
+                print("[JOEY] Intent table changed; compiling the intent model...")
+                intent_model = compile_intent_model(self.intents)
+            self.encoder, self.intent_index = intent_model
+            self.slot_extractor = SlotExtractor(self.intents)
+        # Normalized command -> (intent, confidence); entities are still extracted from what was actually said
+        self.classify = functools.lru_cache(maxsize=INTENT_CACHE_SIZE)(self._classify)
+
+        # Simple commands (SPECULATIVE_INTENTS) are acted on from confident partial results, before the
+        # driver has finished speaking; the final result then confirms or rolls them back.
+        self.early_commit = EarlyCommit(lambda text: (self.intent_candidates(text, 1) or [(None, 0.0)])[0]) if early_commit else None
 
         # --- Response Data ---
         self.jokes = {
@@ -217,402 +2217,1101 @@ class Joey:
                 "शहद कभी खराब नहीं होता। पुरातत्वविदों (archaeologists) ने हज़ारों साल पुराने शहद के बर्तन खोजे हैं जो अभी भी खाने लायक थे।"
             ]
         }
+        # Every reply Joey can give, built once. Templated ones ({entity}, {name}, ...) are filled in when spoken.
+        self.responses = {
+            'greeting': {'en': "Hello{name_part}! How can I help you today?", 'hi': "नमस्ते{name_part}! मैं आपकी क्या सहायता कर सकती हूँ?"},
+            'small_talk_how_are_you': {'en': "I'm doing great, thanks for asking! Ready for the road.", 'hi': "मैं ठीक हूँ, पूछने के लिए शुक्रिया! सफ़र के लिए तैयार।"},
+            'introduce_self': {'en': "Got it! Nice to meet you, {name}.", 'hi': "समझ गई! आपसे मिलकर खुशी हुई, {name}."},
+            'change_language_hi': {'hi': "ठीक है, अब मैं हिंदी में बात करूंगी।"},
+            'already_hindi': {'hi': "मैं पहले से ही हिंदी में बात कर रही हूँ।"},
+            'change_language_en': {'en': "Alright, switching back to English."},
+            'already_english': {'en': "I'm already speaking in English."},
+            'ask_name': {'en': "You can call me Joey. I'm your friendly co-pilot.", 'hi': "आप मुझे Joey बुला सकते हैं। मैं सफ़र में आपकी दोस्त हूँ।"},
+            'ask_creator': {'en': "I was brought to life by a team of clever developers for the OkDriver project. It's nice to be here!", 'hi': "I was brought to life by a team of clever developers for the OkDriver project. It's nice to be here!"},
+            'ask_time': {'en': "It's {time}.", 'hi': "अभी समय है {time} बजे।"},
+            'ask_weather': {'en': "Simulated weather for Faridabad is currently pleasant, around 28 degrees Celsius with clear skies.", 'hi': "फ़रीदाबाद में मौसम सुहाना है, लगभग 28 डिग्री सेल्सियस, और आसमान साफ़ है।"},
+            'ask_location': {'en': "Based on my simulated GPS, we are currently in Faridabad, Haryana, India.", 'hi': "मेरे सिमुलेटेड GPS के अनुसार, हम अभी फ़रीदाबाद, हरियाणा, भारत में हैं।"},
+            'vehicle_status': {'en': "Fuel is at {fuel}%, tire pressure is {tires}, the cabin is at {cabin} degrees and we're doing {speed} km/h.", 'hi': "फ़्यूल {fuel} प्रतिशत है, टायर प्रेशर {tires}, केबिन का तापमान {cabin} डिग्री है, और हम {speed} किलोमीटर प्रति घंटा पर चल रहे हैं।"},
+            'tires_normal': {'en': "normal", 'hi': "सामान्य है"},
+            'tires_low': {'en': "low on the {wheels}", 'hi': "{wheels} टायर में कम है"},
+            'ask_fuel_level': {'en': "Your fuel level is at {fuel}%.", 'hi': "आपका फ़्यूल लेवल {fuel}% है।"},
+            'ask_tire_pressure': {'en': "All tire pressures are normal, around {psi} PSI.", 'hi': "सभी टायरों का प्रेशर सामान्य है, लगभग {psi} PSI।"},
+            'tire_pressure_low': {'en': "Tire pressure is low on the {wheels}, down to {psi} PSI. Please get it checked.", 'hi': "{wheels} टायर में प्रेशर कम है, {psi} PSI। कृपया जाँच करवा लें।"},
+            'increase_temperature': {'en': "Increasing cabin temperature slightly. It's now set to {value} degrees Celsius.", 'hi': "केबिन का तापमान थोड़ा बढ़ा रही हूँ। अब यह {value} डिग्री सेल्सियस पर सेट है।"},
+            'decrease_temperature': {'en': "Decreasing cabin temperature. It's now set to {value} degrees Celsius.", 'hi': "केबिन का तापमान घटा रही हूँ। अब यह {value} डिग्री सेल्सियस पर सेट है।"},
+            'turn_ac_on': {'en': "Turning on the air conditioning.", 'hi': "एयर कंडीशनिंग चालू कर रही हूँ।"},
+            'turn_ac_off': {'en': "Turning off the air conditioning.", 'hi': "एयर कंडीशनिंग बंद कर रही हूँ।"},
+            'find_nearest': {
+                'en': "Simulated: Searching for the nearest {entity}. I found one 2 kilometers away.",
+                'hi': "सिमुलेटेड: सबसे नज़दीकी {entity} ढूंढ रही हूँ। मुझे 2 किलोमीटर दूर एक मिला।"
+            },
+            'find_nearest_prompt': {
+                'en': "What are you looking for? (e.g., gas station, restaurant, hospital, parking)",
+                'hi': "आप क्या ढूंढ रहे हैं? (उदाहरण के लिए, पेट्रोल पंप, रेस्टोरेंट, अस्पताल, पार्किंग)"
+            },
+            'traffic_update': {'en': "Simulated: Current traffic is light on your route. No major delays reported.", 'hi': "सिमुलेटेड: आपके मार्ग पर वर्तमान यातायात हल्का है। कोई बड़ी देरी नहीं बताई गई है।"},
+            'ask_eta': {'en': "Simulated: Your estimated time of arrival is 3:30 PM.", 'hi': "सिमुलेटेड: आपके पहुंचने का अनुमानित समय दोपहर 3:30 बजे है।"},
+            'headlights_on': {'en': "Headlights are now on.", 'hi': "हेडलाइट्स अब चालू हैं।"},
+            'headlights_off': {'en': "Headlights are now off.", 'hi': "हेडलाइट्स अब बंद हैं।"},
+            'vehicle_no_ack': {'en': "The car didn't confirm that. Please try again.", 'hi': "गाड़ी से पुष्टि नहीं मिली। कृपया फिर से कोशिश करें।"},
+            'vehicle_unavailable': {'en': "I can't read the car's status right now.", 'hi': "मैं अभी गाड़ी की स्थिति नहीं पढ़ पा रही हूँ।"},
+            'vehicle_not_connected': {'en': "I'm not connected to this car, so I can't do that.", 'hi': "मैं इस गाड़ी से जुड़ी नहीं हूँ, इसलिए यह नहीं कर सकती।"},
+            'navigate': {'en': "Okay, starting simulated navigation to {entity}. Let's go!", 'hi': "ठीक है, {entity} के लिए सिमुलेटेड नेविगेशन शुरू कर रही हूँ। चलिए!"},
+            'cancel_navigation': {'en': "Okay, canceling the current navigation.", 'hi': "ठीक है, नेविगेशन रद्द कर रही हूँ।"},
+            'play_music': {'en': "Simulated: Playing some relaxing tunes for your drive.", 'hi': "सिमुलेटेड: आपकी ड्राइव के लिए थोड़ा आरामदायक संगीत बजा रही हूँ।"},
+            'pause_music': {'en': "Simulated: Music paused.", 'hi': "सिमुलेटेड: संगीत रोक दिया गया है।"},
+            'next_song': {'en': "Simulated: Skipping to the next song.", 'hi': "सिमुलेटेड: अगले गाने पर जा रही हूँ।"},
+            'previous_song': {'en': "Simulated: Going back to the previous song.", 'hi': "सिमुलेटेड: पिछले गाने पर जा रही हूँ।"},
+            'volume_up': {'en': "Simulated: Turning volume up.", 'hi': "सिमुलेटेड: आवाज़ बढ़ा रही हूँ।"},
+            'volume_down': {'en': "Simulated: Turning volume down.", 'hi': "सिमुलेटेड: आवाज़ कम कर रही हूँ।"},
+            'make_call': {'en': "Simulated: Calling {entity}. This is a demo feature.", 'hi': "सिमुलेटेड: {entity} को कॉल कर रही हूँ। यह एक डेमो फ़ीचर है।"},
+            'make_call_prompt': {'en': "Whom would you like to call?", 'hi': "किसको कॉल करना चाहते हैं?"},
+            'send_message': {'en': "Simulated: Sending a message to {entity}. What's the message?", 'hi': "सिमुलेटेड: {entity} को मैसेज भेज रही हूँ। क्या मैसेज है?"},
+            'send_message_prompt': {'en': "Whom should I send the message to?", 'hi': "किसको मैसेज भेजना है?"},
+            'set_reminder': {'en': "Okay, I'll remind you to {entity} in {when}.", 'hi': "ठीक है, मैं आपको {when} में {entity} के लिए याद दिलाऊंगी।"},
+            'set_reminder_prompt': {'en': "What should I remind you about?", 'hi': "किस बारे में याद दिलाऊं?"},
+            'set_reminder_when': {'en': "When should I remind you? For example, 'in 10 minutes'.", 'hi': "कब याद दिलाऊं? जैसे, '10 मिनट में'।"},
+            'reminder_due': {'en': "Reminder: {task}.", 'hi': "याद दिला रही हूँ: {task}।"},
+            'low_fuel_alert': {'en': "Heads up: fuel is down to {fuel}%. Time to look for a petrol pump.", 'hi': "ध्यान दें: फ़्यूल {fuel} प्रतिशत रह गया है। पेट्रोल पंप ढूंढने का समय है।"},
+            'tire_pressure_alert': {'en': "Warning: tire pressure is dropping on the {wheels}, now {psi} PSI. Please slow down and get it checked.", 'hi': "चेतावनी: {wheels} टायर का प्रेशर कम हो रहा है, अब {psi} PSI है। कृपया धीरे चलें और जाँच करवाएँ।"},
+            'open_app': {'en': "Simulated: Opening {entity}. This is a demo feature.", 'hi': "सिमुलेटेड: {entity} खोल रही हूँ। यह एक डेमो फ़ीचर है।"},
+            'open_app_prompt': {'en': "Which app would you like to open?", 'hi': "कौन सा ऐप खोलना चाहते हैं?"},
+            'what_is': {'en': "Simulated: Searching for '{entity}'. For the demo, I'll say it's an important concept!", 'hi': "सिमुलेटेड: '{entity}' की जानकारी ढूंढ रही हूँ। डेमो के लिए, मैं कहूंगी यह एक महत्वपूर्ण अवधारणा है!"},
+            'what_is_prompt': {'en': "What would you like to know about?", 'hi': "किस बारे में जानना चाहते हैं?"},
+            'help': {'en': "I can tell you the time, weather, share jokes or facts, and simulate navigation, music control, calls, or messages. I can also help with car status, temperature, and finding nearby places. You can switch my language to Hindi. Just ask!", 'hi': "मैं आपको समय, मौसम, जोक्स या तथ्य बता सकती हूँ, और नेविगेशन, संगीत, कॉल, या मैसेज को सिमुलेट कर सकती हूँ। मैं गाड़ी की स्थिति, तापमान और आस-पास की जगहें ढूंढने में भी मदद कर सकती हूँ। आप मेरी भाषा हिंदी में भी बदल सकते हैं। बस पूछिए!"},
+            'thank_you': {'en': ["You're welcome!", "Anytime!", "Glad I could help!"], 'hi': ["कोई बात नहीं!", "आपका स्वागत है।", "खुशी हुई मदद करके!"]},
+            'emergency': {'en': "This is a serious situation. Please contact emergency services directly. I cannot make real calls."},
+            'goodbye': {'en': "Goodbye{name_part}! Drive safe.", 'hi': "Goodbye{name_part}! Drive safe."},
+            'riddle_answer': {'en': "The answer is... {answer}", 'hi': "The answer is... {answer}"},
+            'riddle_guess': {'en': "That's an interesting guess! But if you want the answer, just say 'what is the answer?'", 'hi': "That's an interesting guess! But if you want the answer, just say 'what is the answer?'"},
+            'translate_ask_target': {'en': "Got it. And should I translate that to English or Hindi?", 'hi': "Got it. And should I translate that to English or Hindi?"},
+            'translation_hi': {'en': "Simulated translation: '{phrase}' in Hindi would be 'यह एक डेमो अनुवाद है'.", 'hi': "Simulated translation: '{phrase}' in Hindi would be 'यह एक डेमो अनुवाद है'."},
+            'translation_en': {'en': "Simulated translation: '{phrase}' in English would be 'This is a demo translation'.", 'hi': "Simulated translation: '{phrase}' in English would be 'This is a demo translation'."},
+            'fallback': {
+                'en': "Sorry, I didn't quite get that. Could you please rephrase?",
+                'hi': "माफ़ कीजिए, मैं समझ नहीं पाई। क्या आप दूसरे शब्दों में दोहरा सकते हैं?"
+            },
+        }
+        self.wheel_names = {
+            'en': {'front_left': "front left", 'front_right': "front right", 'rear_left': "rear left", 'rear_right': "rear right"},
+            'hi': {'front_left': "आगे बाएँ", 'front_right': "आगे दाएँ", 'rear_left': "पीछे बाएँ", 'rear_right': "पीछे दाएँ"},
+        }
+
+        # --- Intent Handlers ---
+        # intent -> handler(entity). Intents with a plain reply in self.responses are registered automatically.
+        self.handlers = {
+            'greeting': self._handle_greeting,
+            'introduce_self': self._handle_introduce_self,
+            'change_language_hi': self._handle_change_language_hi,
+            'change_language_en': self._handle_change_language_en,
+            'ask_time': self._handle_ask_time,
+            'emergency': self._handle_emergency,
+            'goodbye': self._handle_goodbye,
+            'set_reminder': self._handle_set_reminder,
+            'vehicle_status': self._handle_vehicle_status,
+            'ask_fuel_level': self._handle_fuel_level,
+            'ask_tire_pressure': self._handle_tire_pressure,
+            'turn_ac_on': self._actuator_handler('turn_ac_on', 'ac_on', 1),
+            'turn_ac_off': self._actuator_handler('turn_ac_off', 'ac_on', 0),
+            'headlights_on': self._actuator_handler('headlights_on', 'headlights_on', 1),
+            'headlights_off': self._actuator_handler('headlights_off', 'headlights_on', 0),
+            'increase_temperature': self._actuator_handler('increase_temperature', 'ac_setpoint_c',
+                                                           lambda signals: min(signals['ac_setpoint_c'] + 1, AC_SETPOINT_RANGE[1])),
+            'decrease_temperature': self._actuator_handler('decrease_temperature', 'ac_setpoint_c',
+                                                           lambda signals: max(signals['ac_setpoint_c'] - 1, AC_SETPOINT_RANGE[0])),
+        }
+        for intent in SLOT_INTENTS:
+            self.handlers.setdefault(intent, self._slot_handler(intent))
+        for intent in self.intents:
+            if intent in self.responses:
+                self.handlers.setdefault(intent, self._reply_handler(intent))
+
+        # Multi-turn context: context['state'] -> handler(text), consulted before intent recognition
+        self.context_handlers = {
+            'awaiting_riddle_answer': self._handle_riddle_answer,
+            'awaiting_translation_phrase': self._handle_translation_phrase,
+            'awaiting_target_language': self._handle_target_language,
+            'awaiting_reminder': self._handle_reminder_details,
+        }
         
-    def speak(self, text, lang=None):
-        """Handles text-to-speech, defaulting to the active language."""
+    @property
+    def session(self):
+        """The session this thread is handling: a bound server session, otherwise the local driver's."""
+        return getattr(self._bound, 'session', None) or self.local_session
+
+    @contextlib.contextmanager
+    def bind(self, session):
+        """Handles everything in the block (on this thread) on behalf of session."""
+        previous = getattr(self._bound, 'session', None)
+        self._bound.session = session
+        try:
+            yield session
+        finally:
+            self._bound.session = previous
+
+    def speak(self, text, lang=None, priority=PRIORITY_NORMAL, wait=False, turn=None):
+        """
+        Queues text-to-speech, defaulting to the active language. Returns immediately unless wait=True.
+        turn is the turn the reply belongs to, if not the one being handled (a late car confirmation).
+        """
         lang_to_use = lang or self.active_language
-        print(f"[JOEY SPEAKS ({lang_to_use})] >> {text}")
-        if lang_to_use == 'hi':
+        if self.session.merged is not None:
+            self.session.merged.append((text, lang_to_use, priority))
+            return
+        if self.session.replies is not None: # Headless: the client speaks it
+            self.session.replies.append({'text': text, 'lang': lang_to_use})
+            return
+        self._say(text, lang_to_use, priority, self.turn if turn is None else turn)
+        if wait: self.output.wait()
+
+    def announce(self, session, text, lang, priority=PRIORITY_NORMAL):
+        """Speaks up unprompted (a reminder or an alert), outside any turn. Headless sessions get it with their next reply."""
+        if session.unprompted is not None:
+            session.unprompted.append({'text': text, 'lang': lang})
+            return
+        self._say(text, lang, priority, NULL_TURN)
+
+    def _say(self, text, lang, priority, turn):
+        if lang == 'hi' and self._renders is not None:
+            with self._render_lock:
+                self._unplayed.update(speech_chunks(text))
+            self._loop.call_soon_threadsafe(self._renders.put_nowait, text)
+        print(f"[JOEY SPEAKS ({lang})] >> {text}")
+        self.output.say(text, lang, priority, turn)
+
+    def _play_speech(self, text, lang, interrupted):
+        """Plays one reply on the speech worker thread, stopping early if interrupted is set."""
+        if lang == 'hi':
             try:
-                tts = gTTS(text=text, lang='hi', slow=False)
-                tts.save("response.mp3")
-                mixer.music.load("response.mp3")
-                mixer.music.play()
-                while mixer.music.get_busy(): time.sleep(0.1)
-                mixer.music.unload()
-                os.remove("response.mp3")
+                from pygame import mixer
+                if not mixer.get_init(): mixer.init() # For playing Hindi audio
+                # Chunk by chunk: the first plays as soon as it's rendered while the rest render behind it
+                chunks = speech_chunks(text)
+                try:
+                    while chunks:
+                        audio, audio_format = self._take_render(chunks.pop(0)).result()
+                        self.output.turn.mark('tts_ready', once=True)
+                        mixer.music.load(io.BytesIO(audio), audio_format) # Played straight from memory, no temp file
+                        mixer.music.play()
+                        self.output.turn.mark('playback_start', once=True)
+                        while mixer.music.get_busy() and not interrupted.is_set():
+                            time.sleep(0.02)
+                        mixer.music.stop()
+                        mixer.music.unload()
+                        if interrupted.is_set(): break
+                finally:
+                    self._drop_renders(chunks) # Cut short; nothing will play the rest
             except Exception as e:
                 print(f"[JOEY TTS ERROR] Could not play Hindi audio: {e}")
                 self.speak("Sorry, I'm having a little trouble speaking Hindi.", 'en')
         else: # English
+            if self.tts_engine_en is None:
+                import pyttsx3
+                self.tts_engine_en = pyttsx3.init()
+                self.tts_engine_en.setProperty('rate', 160)
+                # pyttsx3 can only be stopped from inside its own loop, so check for barge-in on every word
+                def stop_if_interrupted(name, location, length):
+                    if interrupted.is_set(): self.tts_engine_en.stop()
+                self.tts_engine_en.connect('started-word', stop_if_interrupted)
+                # pyttsx3 synthesizes and plays in one go, so both stages are marked when speech starts
+                def trace_start(name):
+                    self.output.turn.mark('tts_ready', once=True)
+                    self.output.turn.mark('playback_start', once=True)
+                self.tts_engine_en.connect('started-utterance', trace_start)
             self.tts_engine_en.say(text)
             self.tts_engine_en.runAndWait()
 
+    def _queue_render(self, text):
+        """
+        Starts rendering the chunks of a Hindi reply on the render thread, unless already under way. Chunks
+        playback has taken already, or that were dropped on barge-in, are skipped. Returns their Futures.
+        """
+        renderings = []
+        with self._render_lock:
+            for chunk in speech_chunks(text):
+                if not self._unplayed[chunk]: continue
+                rendering = self._rendering.get(chunk)
+                if rendering is None:
+                    rendering = self._rendering[chunk] = self._render_pool.submit(self._render_hindi, chunk)
+                renderings.append(rendering)
+        return renderings
+
+    def _take_render(self, chunk):
+        """The render of a chunk about to be played: the one started ahead of time, or a new one."""
+        with self._render_lock:
+            rendering = self._rendering.pop(chunk, None)
+            if rendering is None or rendering.cancelled():
+                rendering = self._render_pool.submit(self._render_hindi, chunk)
+            self._unplayed[chunk] -= 1
+            if self._unplayed[chunk] > 0: # The same words are queued again; they can reuse this render
+                self._rendering[chunk] = rendering
+            else:
+                del self._unplayed[chunk]
+        return rendering
+
+    def _drop_renders(self, chunks):
+        """Forgets chunks that will never be played, cancelling renders no other queued reply is waiting for."""
+        with self._render_lock:
+            for chunk in chunks:
+                if self._unplayed[chunk] > 1:
+                    self._unplayed[chunk] -= 1
+                    continue
+                self._unplayed.pop(chunk, None)
+                rendering = self._rendering.pop(chunk, None)
+                if rendering is not None: rendering.cancel() # A no-op once it has started
+
+    def _render_hindi(self, text):
+        """Returns (audio bytes, format) for Hindi text from the first backend that manages it."""
+        errors = []
+        for backend in self.tts_hi:
+            try:
+                return self._render_with(backend, text), backend.format
+            except Exception as e:
+                errors.append(f"{backend.name}: {e}")
+        raise RuntimeError('; '.join(errors))
+
+    def _render_with(self, backend, text):
+        """Renders text with one backend, through the speech cache if the backend's clips are worth keeping."""
+        audio = self.tts_cache.get(text, 'hi', backend.voice) if backend.cacheable else None
+        if audio is None:
+            audio = backend.render(text)
+            if backend.cacheable: self.tts_cache.put(text, 'hi', backend.voice, audio)
+        return audio
+
+    def _static_hindi_phrases(self):
+        """Every fixed Hindi reply, joke, fact and riddle, i.e. everything that can be rendered ahead of time."""
+        phrases = []
+        for response in self.responses.values():
+            hindi = response.get('hi')
+            for reply in (hindi if isinstance(hindi, list) else [hindi]):
+                if reply and '{' not in reply: # Templated replies depend on the turn
+                    phrases.append(reply)
+        phrases.extend(self.jokes['hi'])
+        phrases.extend(self.facts['hi'])
+        for riddle in [self.riddles['hi']] + self.riddles['hi_extra']:
+            phrases.append(riddle['riddle'])
+            phrases.append(self.responses['riddle_answer']['hi'].format(answer=riddle['answer']))
+        return list(dict.fromkeys(phrases)) # De-duplicate, keep order
+
+    def warm_tts_cache(self):
+        """Pre-renders all static Hindi speech so cached replies start instantly and work offline."""
+        backend = next((backend for backend in self.tts_hi if backend.cacheable), None)
+        if backend is None: return # Offline backends render everything on demand
+        chunks = list(dict.fromkeys(chunk for text in self._static_hindi_phrases() for chunk in speech_chunks(text)))
+        rendered = 0
+        for chunk in chunks:
+            if self.tts_cache.get(chunk, 'hi', backend.voice) is not None: continue
+            try:
+                self._render_with(backend, chunk)
+                rendered += 1
+            except Exception as e:
+                print(f"[JOEY TTS WARNING] Stopped warming the Hindi speech cache (offline?): {e}")
+                break
+        print(f"[JOEY] Hindi speech cache warm: {len(chunks)} phrases, {rendered} newly rendered.")
+
+    def intent_candidates(self, text, k=INTENT_TOP_K):
+        """Top-k (intent, score) candidates for already-lowercased text, best first."""
+        term_ids, weights = self.encoder.transform(text)
+        return [(intent, score) for intent, score, _ in self.intent_index.top_k(term_ids, weights, k)]
+
+    def _classify(self, prepared):
+        """Best (intent, score) for text already through the encoder's front end; (None, 0.0) if nothing matches."""
+        top = self.intent_index.top_k(*self.encoder.encode(prepared), k=1)
+        return (top[0][0], top[0][1]) if top else (None, 0.0)
+
+    def choose_hypothesis(self, results, primary):
+        """
+        Picks the (language, text) to act on from every recognizer's hypotheses. All of them are scored
+        against the intent index in one batch; the best blend of ASR likelihood and intent similarity wins,
+        ties going to the active language. Falls back to the longest transcript when none matches an
+        intent well enough, or when a free-form reply is expected (multi-turn context).
+        """
+        candidates = [(lang, text, likelihood) for lang, hyps in results.items() for text, likelihood in relative_likelihoods(hyps)]
+        if self.asr_alternatives and candidates and not self.context.get('state'):
+            indptr, term_ids, weights = self.encoder.transform_batch([text for _, text, _ in candidates])
+            matches = self.intent_index.best_batch(indptr, term_ids, weights)
+            scored = [((1 - ASR_WEIGHT) * similarity + ASR_WEIGHT * likelihood, lang == primary, lang, text)
+                      for (lang, text, likelihood), (_, similarity) in zip(candidates, matches) if similarity >= CONFIDENCE_THRESHOLD]
+            if scored:
+                _, _, lang, text = max(scored, key=lambda item: item[:2])
+                return lang, text
+        return BilingualDecoder.pick({lang: best_text(hyps) for lang, hyps in results.items()}, primary)
+
+    def split_compound(self, text):
+        """
+        Splits a compound command ("headlights on and volume up", "एसी चालू करो और गाना बजाओ") into
+        [(text, intent, confidence)], one per command, or [] when it is a single command. The pieces and the
+        whole utterance are scored in one batch. A piece that matches no intent on its own stays with the one
+        before it, so slot text such as "call ram and shyam" isn't cut.
+        """
+        pieces = [(separator, piece) for separator, piece in compound_pieces(text.lower()) if piece not in WAKE_PHRASES]
+        if len(pieces) < 2: return []
+        indptr, term_ids, weights = self.encoder.transform_batch([piece for _, piece in pieces] + [without_pauses(text)])
+        matches = self.intent_index.best_batch(indptr, term_ids, weights)
+        segments = []
+        for (separator, piece), (intent, confidence) in zip(pieces, matches):
+            if segments and confidence < CONFIDENCE_THRESHOLD: # Not a command of its own
+                segments[-1][0] = ' '.join(filter(None, (segments[-1][0], separator, piece)))
+            elif segments and segments[-1][2] < CONFIDENCE_THRESHOLD: # Lead-in before the first command ("joey, ...")
+                segments[-1] = [f"{segments[-1][0]} {piece}", intent, confidence]
+            else:
+                segments.append([piece, intent, confidence])
+        if len(segments) < 2 or segments[0][2] < CONFIDENCE_THRESHOLD: return []
+        if sum(confidence for *_, confidence in segments) / len(segments) <= matches[-1][1]:
+            return [] # Reads better as one command
+        return [tuple(segment) for segment in segments]
+
     def recognize_intent(self, text):
         """Uses TF-IDF for intent recognition and rule-based for entity extraction."""
         text = text.lower().strip()
         if not text: return None, None
         
-        command_vector = self.vectorizer.transform([text])
-        similarities = cosine_similarity(command_vector, self.corpus_vectors)
-        max_score_index = np.argmax(similarities)
-        confidence = similarities[0, max_score_index]
+        intent, confidence = self.classify(self.encoder.prepare(text))
+        if intent is None: # No word in common with any known phrase
+            print(f"DEBUG: No intent candidate for text: '{text}'")
+            self.turn.mark('intent', intent=None, confidence=0.0)
+            return None, None
+        self.turn.mark('intent', intent=intent, confidence=round(confidence, 3))
 
         # --- DEBUGGING LINE ---
         # This will show you the highest matched intent and its confidence score
-        if self.intent_map: # Check if intent_map is populated to avoid IndexError
-            print(f"DEBUG: Intent candidate: '{self.intent_map[max_score_index]}' with confidence: {confidence:.2f} for text: '{text}'")
+        print(f"DEBUG: Intent candidate: '{intent}' with confidence: {confidence:.2f} for text: '{text}'")
         # --- END DEBUGGING LINE ---
 
         if confidence < CONFIDENCE_THRESHOLD:
             return None, None
         
-        intent = self.intent_map[max_score_index]
-        entity = None
-
-        # More robust entity extraction for specific intents
-        if intent == 'navigate':
-            phrases_to_remove = ['navigate to', 'take me to', 'mujhe le jao', 'get directions to', 'mujhe jana hai', 'chalo', 'go to', 'drive to', 'mujhe ghar le chalo', 'mujhe hospital le jaao', 'navigasyon shuru karo', 'rasta batao', 'navigated to', 'मुझे ले जाओ', 'मुझे जाना है', 'चलो', 'मुझे घर ले चलो', 'मुझे अस्पताल ले जाओ', 'नेविगेशन शुरू करो', 'रास्ता बताओ', 'नेविगेट करो']
-            for phrase in phrases_to_remove:
-                if text.startswith(phrase):
-                    entity = text.replace(phrase, '', 1).strip()
-                    if entity: break
-        elif intent == 'introduce_self':
-            phrases_to_remove = ['my name is', 'i am', 'मेरा नाम है', 'मैं हूँ']
-            for phrase in phrases_to_remove:
-                if phrase in text:
-                    entity = text.split(phrase, 1)[-1].strip()
-                    if entity: break
-        elif intent == 'make_call':
-            if 'call' in text or 'फ़ोन लगा दो' in text or 'किसी को कॉल करो' in text:
-                entity = text.replace('call', '', 1).replace('फ़ोन लगा दो', '', 1).replace('किसी को कॉल करो', '', 1).strip()
-        elif intent == 'send_message':
-            if 'send message to' in text or 'मैसेज भेजो' in text:
-                entity = text.replace('send message to', '', 1).replace('मैसेज भेजो', '', 1).strip()
-            elif 'text' in text:
-                entity = text.replace('text', '', 1).strip()
-        elif intent == 'set_reminder':
-            if 'remind me to' in text or 'मुझे याद दिलाओ' in text:
-                entity = text.replace('remind me to', '', 1).replace('मुझे याद दिलाओ', '', 1).strip()
-            elif 'set a reminder for' in text:
-                entity = text.replace('set a reminder for', '', 1).strip()
-        elif intent == 'open_app':
-            if 'open' in text or 'ऐप खोलो' in text:
-                entity = text.replace('open', '', 1).replace('ऐप खोलो', '', 1).strip()
-            elif 'launch' in text:
-                entity = text.replace('launch', '', 1).strip()
-        elif intent == 'what_is':
-            if 'what is' in text or 'क्या है' in text:
-                entity = text.replace('what is', '', 1).replace('क्या है', '', 1).strip()
-            elif 'define' in text:
-                entity = text.replace('define', '', 1).strip()
-        # --- NEW ENTITY EXTRACTION FOR DRIVER FEATURES ---
-        elif intent == 'find_nearest':
-            phrases_to_remove = ['find nearest', 'where is the nearest', 'locate nearest', 'सबसे नज़दीकी कहाँ है', 'नज़दीकी ढूंढो']
-            for phrase in phrases_to_remove:
-                if text.startswith(phrase):
-                    entity = text.replace(phrase, '', 1).strip()
-                    if entity: break
-        # --- END NEW ENTITY EXTRACTION ---
-        
+        entity = self.slot_extractor.extract(intent, text)
         return intent, entity
         
-    def _audio_callback(self, indata, frames, time, status):
-        """Captures audio data into a queue."""
-        if status: print(status, file=sys.stderr)
-        self.q.put(bytes(indata))
-
-    def listen(self):
+    def _load_model(self, lang, path):
+        """Loads one Vosk model on a loader thread and hands its recognizer to the decoder."""
+        with self.startup.phase(f'model_{lang}'):
+            model = Model(path)
+            recognizer = self._open_recognizer(model)
+            command = self._command_recognizer(lang, model) if self.command_mode != 'off' else None
+        self.decoder.add_recognizer(lang, recognizer)
+        if command is not None:
+            self.decoder.add_command_recognizer(lang, command)
+        if self.profile_startup and 'ready' in self.startup.phases:
+            print(f"[JOEY] '{lang}' model finished loading in the background at {self.startup.elapsed():.2f}s.")
+        return model
+
+    def _open_recognizer(self, model):
+        recognizer = KaldiRecognizer(model, self.samplerate)
+        recognizer.SetWords(True) # Ensure words are recognized
+        if self.asr_alternatives: recognizer.SetMaxAlternatives(self.asr_alternatives)
+        return recognizer
+
+    def _unload_model(self, lang):
+        """Drops every recognizer built on a language's model so the model can be freed."""
+        self.decoder.remove_recognizer(lang)
+        if self.wake_gate is not None: self.wake_gate.remove_recognizer(lang)
+        with self._grammar_lock:
+            self.grammar_models.pop(lang, None)
+
+    def _check_grammar_models(self, feature):
+        """Raises RuntimeError if a language's GRAMMAR_MODEL_PATHS entry can't take a grammar, before a feature needing one starts."""
+        missing = [path for path in (GRAMMAR_MODEL_PATHS.get(lang, self.model_paths[lang]) for lang in self.model_paths)
+                   if not supports_grammar(path)]
+        if missing:
+            raise RuntimeError(f"{feature} needs Vosk models with a runtime graph (graph/HCLr.fst and graph/Gr.fst); "
+                               f"missing in {', '.join(repr(path) for path in missing)}. "
+                               f"Point GRAMMAR_MODEL_PATHS in main.py at small Vosk models.")
+
+    def _grammar_model(self, lang, model):
+        """The model a language's grammar recognizers are built on: its GRAMMAR_MODEL_PATHS entry."""
+        with self._grammar_lock:
+            if lang not in self.grammar_models:
+                path = GRAMMAR_MODEL_PATHS.get(lang, self.model_paths[lang])
+                if not supports_grammar(path):
+                    raise RuntimeError(f"'{path}' has no runtime graph, so '{lang}' can't use command mode or the wake word.")
+                self.grammar_models[lang] = model if path == self.model_paths[lang] else Model(path)
+            return self.grammar_models[lang]
+
+    def _grammar_recognizer(self, lang, model, grammar):
+        model = self._grammar_model(lang, model)
+        return KaldiRecognizer(model, self.samplerate, json.dumps(grammar, ensure_ascii=False))
+
+    def _command_recognizer(self, lang, model):
+        """Builds a language's command recognizer from the intent table."""
+        return self._grammar_recognizer(lang, model, command_grammar(self.intents, lang))
+
+    def _add_wake_spotter(self, lang):
+        """Adds a language's wake-word spotter once its model has loaded."""
+        model = self.models.get(lang)
+        if model is None or lang not in self.wake_gate.wake_words: return
+        self.wake_gate.add_recognizer(lang, self._grammar_recognizer(lang, model, self.wake_gate.grammar(lang)))
+
+    def wait_for_model(self, lang):
+        """Blocks until a language's model is loaded (re-raising any load error), loading it if needed."""
+        return self.model_manager.ensure(lang).result()
+
+    def set_language(self, lang):
+        """Switches the active language and preloads its model in the background if it isn't resident."""
+        self.active_language = lang
+        if self.session is self.local_session: # Server sessions share models that stay resident
+            self.model_manager.activate(lang)
+
+    def close(self):
+        """Stops the audio source, decoder and speech workers at the end of the session."""
+        self.audio_source.close()
+        self.decoder.close()
+        self.output.close()
+        self._render_pool.shutdown(wait=False)
+        self.model_manager.close()
+        self.local_session.vehicle.close()
+        self.scheduler.close()
+
+    def _read_block(self):
+        """
+        Reads the next capture block, resampled to the decoding rate. Returns (bytes for the recognizers,
+        int16 samples), or (None, None) if no audio arrived within a second.
+        """
+        try:
+            samples = self.audio_source.read(timeout=1.0) # Get with a timeout to prevent infinite wait
+        except queue.Empty:
+            print("[JOEY WARNING] No audio from the input for a second. Is the microphone still connected?")
+            return None, None
+        if self.audio_source.dropped > self._dropped:
+            lost_ms = (self.audio_source.dropped - self._dropped) * 1000 / self.capture_rate
+            self._dropped = self.audio_source.dropped
+            print(f"[JOEY WARNING] Decoding fell behind; dropped the oldest {lost_ms:.0f} ms of audio.")
+        if self.resampler is not None:
+            samples = self.resampler.process(samples)
+        self.audio_seconds += len(samples) / self.samplerate
+        return samples.tobytes(), samples # Vosk wants bytes; the VAD works on the samples directly
+
+    def wait_for_wake_word(self):
+        """
+        Sleeps until the driver says a wake phrase. Only blocks the VAD calls speech (with a little
+        pre-roll) reach the spotters. Returns the phrase, or None if Joey stopped first.
+        """
+        print(f"[JOEY] Sleeping. Say '{WAKE_WORDS['en'][0].title()}' to wake me up.")
+        self.audio_source.start()
+        preroll = collections.deque(maxlen=max(1, VAD_PREROLL_MS // BLOCK_DURATION_MS))
+        try:
+            while self.is_listening:
+                if not self.wake_gate.recognizers and not self.model_manager.loading:
+                    raise RuntimeError("No wake-word spotter could be built; every model failed to load.")
+                data, samples = self._read_block()
+                if samples is None: continue
+                event = self.vad.process(samples, BARGE_IN_FACTOR if self.output.is_busy else 1.0, adapt=not self.output.is_busy)
+                if event == 'start':
+                    blocks = list(preroll) + [data]
+                    preroll.clear()
+                elif self.vad.in_speech or event == 'end':
+                    blocks = [data]
+                else:
+                    preroll.append(data)
+                    continue
+                for block in blocks:
+                    phrase = self.wake_gate.accept(block)
+                    if phrase:
+                        print(f"[JOEY] Wake word: '{phrase}'.")
+                        return phrase
+                if event == 'end':
+                    self.wake_gate.reset() # Passenger chatter; start fresh on the next utterance
+        finally:
+            self.vad.reset()
+
+    def listen(self, turn=None):
         """
         Smarter listening: Uses both models but prioritizes the one matching the active language.
+        The VAD decides when the utterance is over, so short commands return as soon as the driver stops talking.
         If active language model yields no result, it checks the other model.
+        With a turn, waiting for speech can overlap the handling of the last command; the turn becomes
+        the current one at speech onset, once that command has been handled.
         """
         print("\n[JOEY] Listening...")
-        rec_en = KaldiRecognizer(self.model_en, self.samplerate)
-        rec_hi = KaldiRecognizer(self.model_hi, self.samplerate)
-
-        # Resetting recognizers for a clean start to avoid residual data
-        rec_en.SetWords(True) # Ensure words are recognized
-        rec_hi.SetWords(True)
-
-        with sd.RawInputStream(samplerate=self.samplerate, blocksize=8000, device=self.device_info['index'],
-                               dtype='int16', channels=1, callback=self._audio_callback):
-            
-            start_time = time.time()
-            # Listen for a maximum of 5 seconds to prevent hanging
-            while (time.time() - start_time) < 5: 
-                data = self.q.get(timeout=1.0) # Get with a timeout to prevent infinite wait
-                
-                # Try with active language model first
-                if self.active_language == 'en':
-                    if rec_en.AcceptWaveform(data):
-                        text_en = json.loads(rec_en.Result()).get('text', '')
-                        if text_en:
-                            print(f"[VOSK] Heard (EN primary): '{text_en}'")
-                            return text_en
-                    rec_hi.AcceptWaveform(data) # Still process Hindi in background
-                else: # self.active_language == 'hi'
-                    if rec_hi.AcceptWaveform(data):
-                        text_hi = json.loads(rec_hi.Result()).get('text', '')
-                        if text_hi:
-                            print(f"[VOSK] Heard (HI primary): '{text_hi}'")
-                            return text_hi
-                    rec_en.AcceptWaveform(data) # Still process English in background
-            
-            # If nothing definitive was heard, try the final results of both
-            final_en_res = json.loads(rec_en.FinalResult()).get('text', '')
-            final_hi_res = json.loads(rec_hi.FinalResult()).get('text', '')
-
-            # Choose the longest and most likely non-empty result
-            if final_en_res and (not final_hi_res or len(final_en_res) >= len(final_hi_res)):
-                chosen_text = final_en_res
-            elif final_hi_res:
-                chosen_text = final_hi_res
-            else:
-                chosen_text = "" # Nothing heard
+        self.audio_source.start()
+        preroll = collections.deque(maxlen=max(1, VAD_PREROLL_MS // BLOCK_DURATION_MS))
+        early_commit = None
+        # Timeouts count seconds of audio rather than wall time, so replayed audio behaves like the microphone
+        waited = 0.0
+        speech_seconds = None
+        try:
+            while True:
+                if not self.is_listening: return "" # Shutting down
+                data, samples = self._read_block()
+                if samples is None: # The capture stream stalled; finish with what we have
+                    if speech_seconds is None: return ""
+                    break
+                block_seconds = len(samples) / self.samplerate
+                # Joey's own voice leaks into the mic, so while she talks only a louder voice counts as speech
+                talking = self.output.is_busy
+                event = self.vad.process(samples, BARGE_IN_FACTOR if talking else 1.0, adapt=not talking)
+
+                if speech_seconds is None:
+                    if event != 'start':
+                        # Still waiting for the driver to speak; keep a little audio for the onset
+                        preroll.append(data)
+                        waited += block_seconds
+                        if waited > LISTEN_TIMEOUT:
+                            return ""
+                        continue
+                    speech_seconds = 0.0
+                    if talking:
+                        print("[JOEY] Barge-in: the driver is speaking, stopping playback.")
+                        dropped = self.output.cancel()
+                        self._drop_renders([chunk for text, lang in dropped if lang == 'hi' for chunk in speech_chunks(text)])
+                    with self._handled:
+                        self._handled.wait_for(lambda: not self._unhandled or not self.is_listening)
+                    if not self.is_listening: return "" # The last command was goodbye
+                    if turn is not None: self.turn = turn
+                    self.turn.mark('vad_start')
+                    primary = self._primary_language()
+                    # Mid-conversation replies (riddle answers, translations) go to context handlers, never speculate on them
+                    early_commit = self.early_commit if not self.context.get('state') else None
+                    self.speculative_intent = None
+                    blocks = list(preroll) + [data]
+                    preroll.clear()
+                else:
+                    blocks = [data]
+
+                for block in blocks:
+                    # The active language model can endpoint on its own before the VAD does
+                    if self.decoder.accept(block, primary):
+                        _, text = self.choose_hypothesis({primary: self.decoder.result(primary)}, primary)
+                        if text:
+                            self.turn.mark('asr_final', recognizer=primary, endpoint='asr', text=text)
+                            print(f"[VOSK] Heard ({primary.upper()} primary): '{text}'")
+                            return text
+                    elif early_commit is not None:
+                        intent = early_commit.update(self.decoder.partial(primary))
+                        if intent: self._commit_early(intent)
+
+                speech_seconds += block_seconds
+                if event == 'end' or speech_seconds > MAX_UTTERANCE_SECONDS:
+                    self.turn.mark('vad_end')
+                    break
+
+            # The utterance is over; take the final results of both
+            results = self.decoder.final_results(primary)
+            chosen_lang, chosen_text = self.choose_hypothesis(results, primary)
+            self.turn.mark('asr_final', recognizer=chosen_lang if chosen_text else None, endpoint='vad', text=chosen_text)
 
             if chosen_text:
-                print(f"[VOSK] Final Heard: '{chosen_text}' (en: '{final_en_res}', hi: '{final_hi_res}')")
+                print(f"[VOSK] Final Heard: '{chosen_text}' (en: '{best_text(results.get('en'))}', hi: '{best_text(results.get('hi'))}')")
             else:
                 print("[VOSK] No clear command heard.")
             return chosen_text
+        finally:
+            # Ready the long-lived recognizers for the next utterance
+            self.decoder.reset()
+            self.vad.reset()
+            if early_commit is not None: early_commit.reset()
+
+    def _primary_language(self):
+        """The language to prioritize for this utterance: the active one, or a resident one while it loads."""
+        primary = self.active_language
+        if primary not in self.decoder.recognizers:
+            if not self.decoder.recognizers: # Nothing resident to fall back on
+                self.wait_for_model(primary)
+            else:
+                # The active language's model is still loading; decode with what's ready meanwhile
+                primary = next(iter(self.decoder.recognizers))
+                print(f"[JOEY] The '{self.active_language}' model is still loading; listening in '{primary}' meanwhile.")
+        return primary
+
+    def _commit_early(self, intent):
+        """Acts on a speculative intent while the driver is still speaking; its reply is held until the command is checked."""
+        print(f"[JOEY] Early commit: '{intent}' from the partial result.")
+        self.speculative_intent = intent
+        self.turn.mark('early_commit', early_intent=intent)
+        self.session.merged = [] # Spoken by handle_command with whatever follows (see merged_replies)
+        self.handlers[intent](None)
+
+
+    def take_turn(self):
+        """Listens for one command and handles it, tracing the turn from capture to the end of the reply."""
+        captured = self.capture_turn()
+        if captured is not None: self.finish_turn(*captured)
+
+    def capture_turn(self):
+        """
+        Waits for the wake word (if gated), starts a turn and listens for one command. Returns
+        (turn, command), the command being '' if nothing was heard, or None if Joey stopped before a turn started.
+        """
+        if self.wake_gate is not None and self.audio_seconds >= self.awake_until:
+            if self.wait_for_wake_word() is None: return None
+            self.awake_until = self.audio_seconds + WAKE_FOLLOW_UP_SECONDS
+        turn = self.tracer.begin()
+        try:
+            command = self.listen(turn)
+        except BaseException:
+            turn.release()
+            if self.turn is turn: self.turn = NULL_TURN
+            self.session.merged = None # Nothing will speak what an early commit held back
+            raise
+        if not command and not self.is_listening: # Said goodbye while this capture was waiting for speech
+            turn.release()
+            return None
+        if command or (self.turn is turn and self.speculative_intent):
+            self.awake_until = self.audio_seconds + WAKE_FOLLOW_UP_SECONDS # Follow-ups don't need the wake word
+        return turn, command
+
+    def finish_turn(self, turn, command):
+        """Handles a captured command and closes its turn."""
+        self.turn = turn # Already current if the driver spoke
+        try:
+            if command or self.speculative_intent:
+                self.handle_command(command)
+        finally:
+            self.turn.release() # Replies still playing keep the turn open until they finish
+            self.turn = NULL_TURN
+            self.speculative_intent = None
 
+    # --- Main Loop ---
+
+    async def run(self):
+        """
+        The assistant as an asyncio application. Each stage is a task, fed by the one before through a queue:
+        capture and decoding (listen, on an executor thread) -> intent handling -> Hindi TTS rendering.
+        The next capture starts as soon as a command is queued; it only waits for that command's handling
+        once the driver starts speaking again. Playback stays on the speech output's thread, as the audio APIs block. Other work (timers,
+        telemetry) can run as tasks on the same loop. Ends on goodbye, an error, or cancellation (Ctrl+C).
+        """
+        self._loop = asyncio.get_running_loop()
+        self._renders = asyncio.Queue() if self._render_ahead else None
+        self._restore_reminders()
+        self._alert_job = self.scheduler.call_later(ALERT_CHECK_SECONDS, self._check_vehicle_alerts)
+        utterances = asyncio.Queue(maxsize=1)
+        pipeline = [asyncio.create_task(self._capture_stage(utterances), name='joey-capture'),
+                    asyncio.create_task(self._intent_stage(utterances), name='joey-intent')]
+        render = asyncio.create_task(self._render_stage(self._renders), name='joey-render') if self._renders is not None else None
+        stages = pipeline + ([render] if render else [])
+        try:
+            await asyncio.gather(*pipeline)
+        except asyncio.CancelledError:
+            print("\n[JOEY] Shutting down on user request.")
+        except Exception as e:
+            print(f"[JOEY CRITICAL ERROR] An unexpected error occurred: {e}")
+            self.speak("Oops, something went wrong. I'm going to need a moment to reboot.", 'en')
+        finally:
+            self.is_listening = False # A capture still running on its executor thread returns at the next block
+            with self._handled:
+                self._handled.notify_all() # Or at once, if it was waiting for the intent stage
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            self.scheduler.cancel(self._alert_job)
+            self._renders = None
+            with self._render_lock: # Renders of replies that were never played
+                self._rendering.clear()
+                self._unplayed.clear()
+
+    async def _capture_stage(self, utterances):
+        """Captures commands and hands them to the intent stage, listening for the next while one is handled."""
+        loop = asyncio.get_running_loop()
+        while self.is_listening:
+            captured = await loop.run_in_executor(None, self.capture_turn)
+            if captured is None: break
+            # A command can change how the next one is heard (language, multi-turn context, goodbye),
+            # so the next capture waits at speech onset until this one has been handled
+            with self._handled:
+                self._unhandled += 1
+            await utterances.put(captured)
+        await utterances.put(None)
+
+    async def _intent_stage(self, utterances):
+        """Recognizes and handles each captured command; replies are queued for rendering and playback."""
+        loop = asyncio.get_running_loop()
+        while (captured := await utterances.get()) is not None:
+            try:
+                await loop.run_in_executor(None, self.finish_turn, *captured)
+            finally:
+                with self._handled:
+                    self._unhandled -= 1
+                    self._handled.notify_all()
+
+    async def _render_stage(self, replies):
+        """Renders Hindi replies in order as soon as they're queued, so rendering overlaps the playback before them."""
+        while True:
+            text = await replies.get()
+            for rendering in self._queue_render(text):
+                try:
+                    await asyncio.wrap_future(rendering)
+                except Exception:
+                    pass # Playback reports it when it takes the reply
+
+    def respond(self, key, lang=None, priority=PRIORITY_NORMAL, **fields):
+        """Speaks a reply from the response table, filling in its template fields if any are given."""
+        lang = lang or self.active_language
+        reply = self.responses[key][lang]
+        if isinstance(reply, list): reply = random.choice(reply)
+        self.speak(reply.format(**fields) if fields else reply, lang, priority)
 
     def handle_command(self, text):
-        """Processes the recognized text and triggers the appropriate action, including multi-turn context."""
-        
+        """Processes the recognized text and dispatches it to its handler, including multi-turn context."""
         # --- Context Handling ---
-        # Riddle context
-        if self.context.get('state') == 'awaiting_riddle_answer':
-            if 'answer' in text.lower() or 'jawab' in text.lower() or 'solution' in text.lower() or 'batao' in text.lower() or 'जवाब बताओ' in text or 'आंसर क्या है' in text:
-                answer = self.context.get('riddle_answer', "I forgot the answer myself!")
-                self.speak(f"The answer is... {answer}", self.active_language) # Specify language
-                self.context = {} # Clear context after answer
-            else:
-                self.speak("That's an interesting guess! But if you want the answer, just say 'what is the answer?'", self.active_language)
-            return # Exit after handling context
-
-        # Translation context (multi-turn)
-        if self.context.get('state') == 'awaiting_translation_phrase':
-            self.context['phrase_to_translate'] = text
-            self.context['state'] = 'awaiting_target_language'
-            self.speak("Got it. And should I translate that to English or Hindi?", self.active_language)
+        context_handler = self.context_handlers.get(self.context.get('state'))
+        if context_handler:
+            context_handler(without_pauses(text))
             return
 
-        if self.context.get('state') == 'awaiting_target_language':
-            phrase = self.context.get('phrase_to_translate', 'that')
-            target_lang_spoken = 'en' if 'english' in text.lower() or 'इंग्लिश' in text else 'hi' # Crude but effective for demo
-            
-            # Simulated translation response
-            if target_lang_spoken == 'hi':
-                self.speak(f"Simulated translation: '{phrase}' in Hindi would be 'यह एक डेमो अनुवाद है'.", self.active_language)
-            else:
-                self.speak(f"Simulated translation: '{phrase}' in English would be 'This is a demo translation'.", self.active_language)
-            self.context = {} # Clear context
+        # --- Compound Commands ---
+        segments = self.split_compound(text)
+        if segments:
+            self.handle_compound(segments)
             return
 
-
         # --- Intent Recognition and Handling ---
-        intent, entity = self.recognize_intent(text)
-        
-        if intent == 'greeting':
-            name_part = f", {self.user_name}" if self.user_name else ""
-            responses = {'en': f"Hello{name_part}! How can I help you today?", 'hi': f"नमस्ते{name_part}! मैं आपकी क्या सहायता कर सकती हूँ?"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'small_talk_how_are_you':
-            responses = {'en': "I'm doing great, thanks for asking! Ready for the road.", 'hi': "मैं ठीक हूँ, पूछने के लिए शुक्रिया! सफ़र के लिए तैयार।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'introduce_self' and entity:
-            self.user_name = entity.split()[0].capitalize() # Take the first word as the name
-            responses = {'en': f"Got it! Nice to meet you, {self.user_name}.", 'hi': f"समझ गई! आपसे मिलकर खुशी हुई, {self.user_name}."}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'change_language_hi':
-            if self.active_language == 'hi':
-                self.speak("मैं पहले से ही हिंदी में बात कर रही हूँ।", 'hi')
-            else:
-                self.active_language = 'hi'
-                self.speak("ठीक है, अब मैं हिंदी में बात करूंगी।", 'hi')
-
-        elif intent == 'change_language_en':
-            if self.active_language == 'en':
-                self.speak("I'm already speaking in English.", 'en')
+        intent, entity = self.recognize_intent(without_pauses(text))
+        if self.speculative_intent:
+            with self.merged_replies(): # The early commit's reply, held until now, goes out with whatever follows
+                committed, self.speculative_intent = self.speculative_intent, None
+                if intent in (committed, None): # Confirmed (or nothing better was heard); it's already done
+                    self.turn.mark('early_commit_checked', early_commit='confirmed')
+                    return
+                print(f"[JOEY] Early commit of '{committed}' was wrong (final: '{intent}'); rolling it back.")
+                self.turn.mark('early_commit_checked', early_commit='rolled_back')
+                undo = self.early_commit.intents[committed]
+                self.handlers[undo](None)
+                if intent == undo: return # Undoing it was exactly what the driver asked for
+                self.handlers.get(intent, self._handle_fallback)(entity)
+            return
+        self.handlers.get(intent, self._handle_fallback)(entity)
+
+    def handle_compound(self, segments):
+        """Acts on each command of a compound utterance in order, then speaks their replies as one."""
+        intents = [intent for _, intent, _ in segments]
+        print(f"[JOEY] Compound command: {' + '.join(intents)}")
+        self.turn.mark('intent', intent=intents[0], confidence=round(min(c for *_, c in segments), 3), intents=intents)
+        with self.merged_replies():
+            if self.speculative_intent:
+                committed, self.speculative_intent = self.speculative_intent, None
+                if committed in intents: # Already done while the driver was still talking; its reply is held for this one
+                    self.turn.mark('early_commit_checked', early_commit='confirmed')
+                    segments = [segment for i, segment in enumerate(segments) if i != intents.index(committed)]
+                else:
+                    print(f"[JOEY] Early commit of '{committed}' was wrong (final: {intents}); rolling it back.")
+                    self.turn.mark('early_commit_checked', early_commit='rolled_back')
+                    self.handlers[self.early_commit.intents[committed]](None)
+            for text, intent, _ in segments:
+                self.handlers.get(intent, self._handle_fallback)(self.slot_extractor.extract(intent, text))
+
+    @contextlib.contextmanager
+    def merged_replies(self):
+        """
+        Holds back everything spoken in the block, then speaks it as one reply per run of the same language.
+        Replies already held back (an early commit's) are spoken with them.
+        """
+        session = self.session
+        if session.merged is None: session.merged = []
+        merged = session.merged
+        try:
+            yield
+        finally:
+            # Car commands confirm in the background; their replies belong in this one (a timeout fires by then)
+            deadline = time.monotonic() + VEHICLE_ACK_TIMEOUT
+            for confirmed in session.confirmations:
+                confirmed.wait(max(0.0, deadline - time.monotonic()))
+            session.merged, session.confirmations = None, []
+            replies = []
+            for text, lang, priority in merged:
+                if replies and replies[-1][1] == lang:
+                    replies[-1] = (f"{replies[-1][0]} {text}", lang, min(replies[-1][2], priority))
+                else:
+                    replies.append((text, lang, priority))
+            for text, lang, priority in replies:
+                self.speak(text, lang, priority)
+
+    # --- Handler Factories ---
+
+    def _reply_handler(self, key):
+        """Handler that just speaks a fixed reply."""
+        return lambda entity: self.respond(key)
+
+    def _slot_handler(self, intent):
+        """Handler for a slot intent: templated reply with the entity, a prompt for it, or the fallback."""
+        def handler(entity):
+            if entity:
+                self.respond(intent, entity=entity)
+            elif f'{intent}_prompt' in self.responses:
+                self.respond(f'{intent}_prompt')
             else:
-                self.active_language = 'en'
-                self.speak("Alright, switching back to English.", 'en')
-        
-        elif intent == 'ask_name':
-            responses = {'en': "You can call me Joey. I'm your friendly co-pilot.", 'hi': "आप मुझे Joey बुला सकते हैं। मैं सफ़र में आपकी दोस्त हूँ।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'ask_creator':
-            self.speak("I was brought to life by a team of clever developers for the OkDriver project. It's nice to be here!", self.active_language)
-
-        elif intent == 'ask_time':
-            current_time = datetime.now().strftime("%I:%M %p")
-            responses = {'en': f"It's {current_time}.", 'hi': f"अभी समय है {current_time} बजे।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'ask_weather':
-            responses = {'en': "Simulated weather for Faridabad is currently pleasant, around 28 degrees Celsius with clear skies.", 'hi': "फ़रीदाबाद में मौसम सुहाना है, लगभग 28 डिग्री सेल्सियस, और आसमान साफ़ है।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'ask_location':
-            responses = {'en': "Based on my simulated GPS, we are currently in Faridabad, Haryana, India.", 'hi': "मेरे सिमुलेटेड GPS के अनुसार, हम अभी फ़रीदाबाद, हरियाणा, भारत में हैं।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'vehicle_status':
-            responses = {'en': "Simulated status: Everything looks good! Fuel is at 80%, tire pressure is normal, and we're cruising at a safe speed.", 'hi': "सिमुलेटेड स्टेटस: सब ठीक लग रहा है! फ़्यूल 80 प्रतिशत है, टायर प्रेशर सामान्य है, और हम एक सुरक्षित गति पर चल रहे हैं।"}
-            self.speak(responses[self.active_language])
-            
-        # --- NEW DRIVER FEATURE RESPONSES ---
-        elif intent == 'ask_fuel_level':
-            responses = {'en': "Simulated: Your fuel level is at 75%. Plenty for your journey.", 'hi': "सिमुलेटेड: आपका फ़्यूल लेवल 75% है। आपकी यात्रा के लिए काफ़ी है।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'ask_tire_pressure':
-            responses = {'en': "Simulated: All tire pressures are normal, around 32 PSI.", 'hi': "सिमुलेटेड: सभी टायरों का प्रेशर सामान्य है, लगभग 32 PSI।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'increase_temperature':
-            responses = {'en': "Simulated: Increasing cabin temperature slightly. It's now 22 degrees Celsius.", 'hi': "सिमुलेटेड: केबिन का तापमान थोड़ा बढ़ा रही हूँ। अब यह 22 डिग्री सेल्सियस है।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'decrease_temperature':
-            responses = {'en': "Simulated: Decreasing cabin temperature. It's now 19 degrees Celsius.", 'hi': "सिमुलेटेड: केबिन का तापमान घटा रही हूँ। अब यह 19 डिग्री सेल्सियस है।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'turn_ac_on':
-            responses = {'en': "Simulated: Turning on the air conditioning.", 'hi': "सिमुलेटेड: एयर कंडीशनिंग चालू कर रही हूँ।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'turn_ac_off':
-            responses = {'en': "Simulated: Turning off the air conditioning.", 'hi': "सिमुलेटेड: एयर कंडीशनिंग बंद कर रही हूँ।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'find_nearest' and entity:
-            responses = {
-                'en': f"Simulated: Searching for the nearest {entity}. I found one 2 kilometers away.",
-                'hi': f"सिमुलेटेड: सबसे नज़दीकी {entity} ढूंढ रही हूँ। मुझे 2 किलोमीटर दूर एक मिला।"
-            }
-            self.speak(responses[self.active_language])
-        elif intent == 'find_nearest' and not entity:
-            responses = {
-                'en': "What are you looking for? (e.g., gas station, restaurant, hospital, parking)",
-                'hi': "आप क्या ढूंढ रहे हैं? (उदाहरण के लिए, पेट्रोल पंप, रेस्टोरेंट, अस्पताल, पार्किंग)"
-            }
-            self.speak(responses[self.active_language])
-
-        elif intent == 'traffic_update':
-            responses = {'en': "Simulated: Current traffic is light on your route. No major delays reported.", 'hi': "सिमुलेटेड: आपके मार्ग पर वर्तमान यातायात हल्का है। कोई बड़ी देरी नहीं बताई गई है।"}
-            self.speak(responses[self.active_language])
+                self._handle_fallback(entity)
+        return handler
 
-        elif intent == 'ask_eta':
-            responses = {'en': "Simulated: Your estimated time of arrival is 3:30 PM.", 'hi': "सिमुलेटेड: आपके पहुंचने का अनुमानित समय दोपहर 3:30 बजे है।"}
-            self.speak(responses[self.active_language])
-            
-        elif intent == 'headlights_on':
-            responses = {'en': "Simulated: Headlights are now on.", 'hi': "सिमुलेटेड: हेडलाइट्स अब चालू हैं।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'headlights_off':
-            responses = {'en': "Simulated: Headlights are now off.", 'hi': "सिमुलेटेड: हेडलाइट्स अब बंद हैं।"}
-            self.speak(responses[self.active_language])
-        # --- END NEW DRIVER FEATURE RESPONSES ---
-
-        elif intent == 'navigate' and entity:
-            responses = {'en': f"Okay, starting simulated navigation to {entity}. Let's go!", 'hi': f"ठीक है, {entity} के लिए सिमुलेटेड नेविगेशन शुरू कर रही हूँ। चलिए!"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'cancel_navigation':
-            responses = {'en': "Okay, canceling the current navigation.", 'hi': "ठीक है, नेविगेशन रद्द कर रही हूँ।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'play_music':
-            responses = {'en': "Simulated: Playing some relaxing tunes for your drive.", 'hi': "सिमुलेटेड: आपकी ड्राइव के लिए थोड़ा आरामदायक संगीत बजा रही हूँ।"}
-            self.speak(responses[self.active_language])
-        
-        elif intent == 'pause_music':
-            responses = {'en': "Simulated: Music paused.", 'hi': "सिमुलेटेड: संगीत रोक दिया गया है।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'next_song':
-            responses = {'en': "Simulated: Skipping to the next song.", 'hi': "सिमुलेटेड: अगले गाने पर जा रही हूँ।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'previous_song':
-            responses = {'en': "Simulated: Going back to the previous song.", 'hi': "सिमुलेटेड: पिछले गाने पर जा रही हूँ।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'volume_up':
-            responses = {'en': "Simulated: Turning volume up.", 'hi': "सिमुलेटेड: आवाज़ बढ़ा रही हूँ।"}
-            self.speak(responses[self.active_language])
-        
-        elif intent == 'volume_down':
-            responses = {'en': "Simulated: Turning volume down.", 'hi': "सिमुलेटेड: आवाज़ कम कर रही हूँ।"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'make_call' and entity:
-            responses = {'en': f"Simulated: Calling {entity}. This is a demo feature.", 'hi': f"सिमुलेटेड: {entity} को कॉल कर रही हूँ। यह एक डेमो फ़ीचर है।"}
-            self.speak(responses[self.active_language])
-        elif intent == 'make_call' and not entity:
-            responses = {'en': "Whom would you like to call?", 'hi': "किसको कॉल करना चाहते हैं?"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'send_message' and entity:
-            responses = {'en': f"Simulated: Sending a message to {entity}. What's the message?", 'hi': f"सिमुलेटेड: {entity} को मैसेज भेज रही हूँ। क्या मैसेज है?"}
-            self.speak(responses[self.active_language])
-            # Add context for message content if needed
-        elif intent == 'send_message' and not entity:
-            responses = {'en': "Whom should I send the message to?", 'hi': "किसको मैसेज भेजना है?"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'set_reminder' and entity:
-            responses = {'en': f"Simulated: Okay, I'll remind you to {entity}.", 'hi': f"सिमुलेटेड: ठीक है, मैं आपको {entity} के लिए याद दिलाऊंगी।"}
-            self.speak(responses[self.active_language])
-        elif intent == 'set_reminder' and not entity:
-            responses = {'en': "What should I remind you about?", 'hi': "किस बारे में याद दिलाऊं?"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'open_app' and entity:
-            responses = {'en': f"Simulated: Opening {entity}. This is a demo feature.", 'hi': f"सिमुलेटेड: {entity} खोल रही हूँ। यह एक डेमो फ़ीचर है।"}
-            self.speak(responses[self.active_language])
-        elif intent == 'open_app' and not entity:
-            responses = {'en': "Which app would you like to open?", 'hi': "कौन सा ऐप खोलना चाहते हैं?"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'what_is' and entity:
-            responses = {'en': f"Simulated: Searching for '{entity}'. For the demo, I'll say it's an important concept!", 'hi': f"सिमुलेटेड: '{entity}' की जानकारी ढूंढ रही हूँ। डेमो के लिए, मैं कहूंगी यह एक महत्वपूर्ण अवधारणा है!"}
-            self.speak(responses[self.active_language])
-        elif intent == 'what_is' and not entity:
-            responses = {'en': "What would you like to know about?", 'hi': "किस बारे में जानना चाहते हैं?"}
-            self.speak(responses[self.active_language])
-
-        elif intent == 'help':
-            responses = {'en': "I can tell you the time, weather, share jokes or facts, and simulate navigation, music control, calls, or messages. I can also help with car status, temperature, and finding nearby places. You can switch my language to Hindi. Just ask!", 'hi': "मैं आपको समय, मौसम, जोक्स या तथ्य बता सकती हूँ, और नेविगेशन, संगीत, कॉल, या मैसेज को सिमुलेट कर सकती हूँ। मैं गाड़ी की स्थिति, तापमान और आस-पास की जगहें ढूंढने में भी मदद कर सकती हूँ। आप मेरी भाषा हिंदी में भी बदल सकते हैं। बस पूछिए!"}
-            self.speak(responses[self.active_language])
-            
-        elif intent == 'thank_you':
-            responses = {'en': ["You're welcome!", "Anytime!", "Glad I could help!"], 'hi': ["कोई बात नहीं!", "आपका स्वागत है।", "खुशी हुई मदद करके!"]}
-            self.speak(random.choice(responses[self.active_language]))
-
-        elif intent == 'emergency':
-            self.speak("This is a serious situation. Please contact emergency services directly. I cannot make real calls.", 'en')
-        
-        elif intent == 'goodbye':
-            name_part = f", {self.user_name}" if self.user_name else ""
-            self.speak(f"Goodbye{name_part}! Drive safe.", self.active_language)
-            self.is_listening = False
-
-        else: # If intent is None or not handled above
-            responses = {
-                'en': "Sorry, I didn't quite get that. Could you please rephrase?", 
-                'hi': "माफ़ कीजिए, मैं समझ नहीं पाई। क्या आप दूसरे शब्दों में दोहरा सकते हैं?"
-            }
-            self.speak(responses[self.active_language])
+    def _actuator_handler(self, intent, signal, value):
+        """
+        Handler that sends the car an actuator command and confirms it once acknowledged. It returns without
+        waiting for the car, so it never holds up capture (early commits) or the next command; the reply is
+        spoken from the acknowledgement. value may be a function of the current signals.
+        """
+        def handler(entity):
+            if self.vehicle is None:
+                self.respond('vehicle_not_connected')
+                return
+            target = value
+            if callable(value):
+                signals = self._vehicle_signals()
+                if signals is None: return
+                target = value(signals)
+            session, turn, lang = self.session, self.turn, self.active_language
+            turn.hold() # The turn stays open until the confirmation has been spoken
+            confirmed = threading.Event()
+            if session.merged is not None: session.confirmations.append(confirmed) # Part of a compound command's reply
+            ack = self.vehicle.command(signal, target)
+            timeout = self.scheduler.call_later(VEHICLE_ACK_TIMEOUT, ack.cancel)
+            ack.add_done_callback(lambda ack: self._confirm_actuator(ack, timeout, intent, signal, target, lang, session, turn, confirmed))
+        return handler
+
+    def _confirm_actuator(self, ack, timeout, intent, signal, target, lang, session, turn, confirmed):
+        """Speaks the outcome of an actuator command for its session, on whichever thread resolved it (bus reader or scheduler)."""
+        self.scheduler.cancel(timeout)
+        try:
+            with self.bind(session):
+                if ack.cancelled() or ack.exception() is not None:
+                    print(f"[JOEY VEHICLE ERROR] No acknowledgement for {signal} = {target}: "
+                          f"{'timed out' if ack.cancelled() else repr(ack.exception())}")
+                    self.speak(self.responses['vehicle_no_ack'][lang], lang, turn=turn)
+                else:
+                    self.speak(self.responses[intent][lang].format(value=f"{target:g}"), lang, turn=turn)
+        finally:
+            turn.release()
+            confirmed.set()
+
+    # --- Intent Handlers ---
+
+    def _name_part(self):
+        return f", {self.user_name}" if self.user_name else ""
+
+    def _handle_greeting(self, entity):
+        self.respond('greeting', name_part=self._name_part())
+
+    def _handle_introduce_self(self, entity):
+        if entity:
+            self.user_name = entity.split()[0].capitalize() # Take the first word as the name
+            self.respond('introduce_self', name=self.user_name)
+        else:
+            self._handle_fallback(entity)
+
+    def _handle_change_language_hi(self, entity):
+        if self.active_language == 'hi':
+            self.respond('already_hindi', 'hi')
+        else:
+            self.set_language('hi')
+            self.respond('change_language_hi', 'hi')
+
+    def _handle_change_language_en(self, entity):
+        if self.active_language == 'en':
+            self.respond('already_english', 'en')
+        else:
+            self.set_language('en')
+            self.respond('change_language_en', 'en')
+
+    def _handle_ask_time(self, entity):
+        self.respond('ask_time', time=datetime.now().strftime("%I:%M %p"))
+
+    def _vehicle_signals(self):
+        """The car's latest signals, or None (after telling the driver) if there's no car or nothing has come over the bus yet."""
+        if self.vehicle is None:
+            self.respond('vehicle_not_connected')
+            return None
+        snapshot = self.vehicle.snapshot
+        if snapshot.version: return snapshot.signals
+        self.respond('vehicle_unavailable')
+        return None
+
+    def _low_tires(self, signals):
+        """The wheels whose pressure is below TIRE_PRESSURE_MIN_PSI, named in the active language ('' if none)."""
+        names = self.wheel_names[self.active_language]
+        return ', '.join(names[wheel] for wheel in VEHICLE_WHEELS if signals[f'tire_{wheel}_psi'] < TIRE_PRESSURE_MIN_PSI)
+
+    def _handle_vehicle_status(self, entity):
+        signals = self._vehicle_signals()
+        if signals is None: return
+        low = self._low_tires(signals)
+        tires = self.responses['tires_low' if low else 'tires_normal'][self.active_language].format(wheels=low)
+        self.respond('vehicle_status', fuel=round(signals['fuel_percent']), tires=tires, cabin=round(signals['cabin_temp_c']),
+                     speed=round(signals['speed_kmh']))
+
+    def _handle_fuel_level(self, entity):
+        signals = self._vehicle_signals()
+        if signals is not None: self.respond('ask_fuel_level', fuel=round(signals['fuel_percent']))
+
+    def _handle_tire_pressure(self, entity):
+        signals = self._vehicle_signals()
+        if signals is None: return
+        pressures = [signals[f'tire_{wheel}_psi'] for wheel in VEHICLE_WHEELS]
+        low = self._low_tires(signals)
+        if low:
+            self.respond('tire_pressure_low', wheels=low, psi=round(min(pressures)))
+        else:
+            self.respond('ask_tire_pressure', psi=round(sum(pressures) / len(pressures)))
+
+    def _handle_emergency(self, entity):
+        self.respond('emergency', 'en', PRIORITY_URGENT)
+
+    def _handle_goodbye(self, entity):
+        self.respond('goodbye', name_part=self._name_part())
+        self.is_listening = False
+
+    def _handle_fallback(self, entity):
+        """Used when no intent was recognized or it has no handler."""
+        self.respond('fallback')
+
+    def _handle_set_reminder(self, entity):
+        delay, task = parse_duration(entity or '')
+        self._set_reminder(task, delay)
+
+    def _set_reminder(self, task, delay, retry=True):
+        """Schedules a reminder, first asking for the task or the time if either is missing."""
+        if not task or delay is None:
+            if not retry: # Asked once already
+                self.context = {}
+                self._handle_fallback(None)
+                return
+            self.context = {'state': 'awaiting_reminder', 'task': task, 'delay': delay}
+            self.respond('set_reminder_prompt' if not task else 'set_reminder_when')
+            return
+        self.context = {}
+        session, lang = self.session, self.active_language
+        if session is self.local_session: # Saved, so it survives a restart
+            reminder = self.reminder_store.add(time.time() + delay, task, lang)
+            self._reminder_jobs[reminder['id']] = self.scheduler.call_at(reminder['due'], self._fire_reminder, session, reminder)
+        else: # Server sessions don't outlive the process
+            self.scheduler.call_later(delay, self._fire_reminder, session, {'task': task, 'lang': lang})
+        self.respond('set_reminder', entity=task, when=describe_duration(delay, lang))
+
+    def _restore_reminders(self):
+        """Schedules the local driver's saved reminders; any that came due while Joey was off fire right away."""
+        for reminder in list(self.reminder_store.reminders.values()):
+            if reminder['id'] not in self._reminder_jobs:
+                self._reminder_jobs[reminder['id']] = self.scheduler.call_at(reminder['due'], self._fire_reminder, self.local_session, reminder)
+
+    def _fire_reminder(self, session, reminder):
+        if 'id' in reminder:
+            self._reminder_jobs.pop(reminder['id'], None)
+            self.reminder_store.remove(reminder['id'])
+        self.announce(session, self.responses['reminder_due'][reminder['lang']].format(task=reminder['task']), reminder['lang'])
+
+    def _check_vehicle_alerts(self):
+        """Speaks up about low fuel or a tyre losing pressure, once per occurrence. Re-arms itself on the scheduler."""
+        self._alert_job = self.scheduler.call_later(ALERT_CHECK_SECONDS, self._check_vehicle_alerts)
+        session = self.local_session
+        snapshot = session.vehicle.snapshot
+        if not snapshot.version: return
+        signals = snapshot.signals
+        lang = session.active_language
+        alerts = {}
+        if signals['fuel_percent'] < LOW_FUEL_PERCENT:
+            alerts['low_fuel_alert'] = (PRIORITY_NORMAL, {'fuel': round(signals['fuel_percent'])})
+        low = self._low_tires(signals) # Named in the local driver's language (this thread isn't bound to a session)
+        if low: # A tyre losing pressure at speed is a safety issue
+            psi = min(signals[f'tire_{wheel}_psi'] for wheel in VEHICLE_WHEELS)
+            alerts['tire_pressure_alert'] = (PRIORITY_URGENT, {'wheels': low, 'psi': round(psi)})
+        for key, (priority, fields) in alerts.items():
+            if key not in self._alerted:
+                self.announce(session, self.responses[key][lang].format(**fields), lang, priority)
+        self._alerted = set(alerts)
+
+    # --- Context Handlers ---
+
+    def _handle_riddle_answer(self, text):
+        if 'answer' in text.lower() or 'jawab' in text.lower() or 'solution' in text.lower() or 'batao' in text.lower() or 'जवाब बताओ' in text or 'आंसर क्या है' in text:
+            answer = self.context.get('riddle_answer', "I forgot the answer myself!")
+            self.respond('riddle_answer', answer=answer)
+            self.context = {} # Clear context after answer
+        else:
+            self.respond('riddle_guess')
+
+    def _handle_translation_phrase(self, text):
+        self.context['phrase_to_translate'] = text
+        self.context['state'] = 'awaiting_target_language'
+        self.respond('translate_ask_target')
+
+    def _handle_target_language(self, text):
+        phrase = self.context.get('phrase_to_translate', 'that')
+        target_lang_spoken = 'en' if 'english' in text.lower() or 'इंग्लिश' in text else 'hi' # Crude but effective for demo
+        self.respond(f'translation_{target_lang_spoken}', phrase=phrase) # Simulated translation response
+        self.context = {} # Clear context
+
+    def _handle_reminder_details(self, text):
+        delay, rest = parse_duration(text)
+        known_task, known_delay = self.context.get('task'), self.context.get('delay')
+        # An answer that filled in the missing half (say, the time when asked for the task) earns one more question
+        learned = (not known_task and bool(rest)) or (known_delay is None and delay is not None)
+        self._set_reminder(known_task or rest, delay if known_delay is None else known_delay, retry=learned)
+
+    # --- Server Mode ---
+
+    def open_session(self, session_id, language='en'):
+        """A headless session for one client conversation (see JoeyServer)."""
+        return Session(session_id, language, headless=True)
+
+    def converse(self, text=None, audio=None, final=False):
+        """
+        Handles one request of the bound headless session: a text command, or a chunk of 16 kHz int16
+        mono audio. An utterance ends when its recognizer endpoints or the client sets final.
+        Returns what was heard (None while the utterance is still going), the intent (every intent of a
+        compound command under 'intents') and the replies.
+        """
+        session = self.session
+        if session.turn is NULL_TURN:
+            session.turn = self.tracer.begin() # For audio, the turn spans every chunk of the utterance
+        if audio is not None:
+            text = self._decode_stream(session, audio, final)
+            if text is None: return {'session': session.id, 'heard': None}
+        session.replies = []
+        while session.unprompted: # Reminders that fired since the last request come first
+            session.replies.append(session.unprompted.popleft())
+        try:
+            if text: self.handle_command(text)
+        finally:
+            record = session.turn.record or {}
+            session.turn.release()
+            session.turn = NULL_TURN
+        return {'session': session.id, 'heard': text, 'intent': record.get('intent'), 'intents': record.get('intents') or [record.get('intent')],
+                'confidence': record.get('confidence'), 'language': session.active_language, 'replies': session.replies, 'closed': not session.is_listening}
+
+    def _decode_stream(self, session, audio, final):
+        """Feeds a headless session's audio to its own recognizers. Returns the text once the utterance ends, else None."""
+        if session.decoder is None:
+            session.decoder = BilingualDecoder({lang: self._open_recognizer(model) for lang, model in list(self.models.items())},
+                                               SERVER_DECODE_POLICY)
+        decoder = session.decoder
+        primary = session.active_language if session.active_language in decoder.recognizers else next(iter(decoder.recognizers))
+        if audio and decoder.accept(audio, primary):
+            _, text = self.choose_hypothesis({primary: decoder.result(primary)}, primary)
+            if text:
+                session.turn.mark('asr_final', recognizer=primary, endpoint='asr', text=text)
+                decoder.reset()
+                return text
+        if not final: return None
+        results = decoder.final_results(primary)
+        chosen_lang, chosen_text = self.choose_hypothesis(results, primary)
+        session.turn.mark('asr_final', recognizer=chosen_lang if chosen_text else None, endpoint='client', text=chosen_text)
+        decoder.reset()
+        return chosen_text
+
+    def serve(self, host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS):
+        """Server mode: no microphone or speakers, many client sessions over a local socket."""
+        for lang in self.model_paths:
+            self.wait_for_model(lang) # Sessions may speak either language
+        server = JoeyServer(self, workers)
+        try:
+            asyncio.run(server.serve(host, port))
+        except KeyboardInterrupt:
+            print("\n[JOEY] Shutting down the server on user request.")
+        finally:
+            server.close()
+            if self.tracer.turns: self.tracer.report()
+            self.close()
 
     def test_microphone_recording(self):
         """Runs a diagnostic to check microphone input levels."""
+        import sounddevice as sd
         print("\n--- Microphone Diagnostic Test ---")
-        self.speak("Let's test your microphone. Please say 'Hello Joey' after the beep.", 'en')
+        self.speak("Let's test your microphone. Please say 'Hello Joey' after the beep.", 'en', wait=True)
         # A simple beep sound
         sd.play(0.3 * np.sin(2 * np.pi * 440 * np.arange(44100) / 44100), samplerate=44100)
         time.sleep(1) # Give a moment for the beep to play
 
         try:
-            myrecording = sd.rec(int(3 * self.samplerate), samplerate=self.samplerate, channels=1, dtype='int16')
+            myrecording = sd.rec(int(3 * self.capture_rate), samplerate=self.capture_rate, channels=1, dtype='int16')
             sd.wait() # Wait for the recording to finish
             
             # Simple volume check (normalize and check magnitude)
@@ -627,26 +3326,175 @@ class Joey:
             return False
         return True
 
-    def start(self):
-        """The main loop of the assistant."""
-        if self.test_microphone_recording():
+    def start(self, wake_word=None):
+        """
+        The main loop of the assistant. With wake_word=True (default: WAKE_WORD_GATE) Joey sleeps on a
+        wake-word spotter and only runs the full recognizers for WAKE_FOLLOW_UP_SECONDS after a wake word.
+        """
+        if WAKE_WORD_GATE if wake_word is None else wake_word:
+            self._check_grammar_models('The wake word')
+            self.wake_gate = WakeWordGate()
+            # Spotters for the models already resident now, the rest as (and whenever) they load
+            self.model_manager.add_listener(self._add_wake_spotter)
+            for lang in list(self.models):
+                self._add_wake_spotter(lang)
+        # Fill the Hindi speech cache in the background; only uncached phrases go to the network
+        threading.Thread(target=self.warm_tts_cache, daemon=True).start()
+        # The mic diagnostic overlaps with the models still loading in the background
+        with self.startup.phase('mic_test'):
+            mic_ok = self.test_microphone_recording() if self.audio_source.live else True
+        if mic_ok:
+            with self.startup.phase('wait_model'):
+                self.wait_for_model(self.active_language)
+            self.startup.mark('ready')
+            print("[JOEY] Language modules calibrated. Ready for your command!")
+            if self.profile_startup: self.startup.report()
             time.sleep(0.5) # A small pause to feel more natural
             self.speak("Hi, I'm Joey. I'm ready when you are.", 'en')
-            while self.is_listening:
-                try:
-                    command = self.listen()
-                    if command:
-                        self.handle_command(command)
-                except KeyboardInterrupt:
-                    print("\n[JOEY] Shutting down on user request.")
-                    self.is_listening = False
-                except Exception as e:
-                    print(f"[JOEY CRITICAL ERROR] An unexpected error occurred: {e}")
-                    self.speak("Oops, something went wrong. I'm going to need a moment to reboot.", 'en')
-                    self.is_listening = False
+            try:
+                asyncio.run(self.run())
+            except KeyboardInterrupt: # Raised here instead of cancelling run() on older Pythons
+                print("\n[JOEY] Shutting down on user request.")
+                self.is_listening = False
+        self.output.wait() # Let the last reply (e.g. the goodbye) finish before shutting down
+        if self.tracer.turns: self.tracer.report()
+        self.close()
+
+# --- Server Mode ---
+
+class JoeyServer:
+    """
+    Serves many in-car clients from one Joey, sharing its models. Clients connect to a local socket and
+    exchange newline-delimited JSON; every request names its session and gets one reply:
+        {"session": "car-17", "lang": "hi", "text": "turn on the ac"}
+        {"session": "car-17", "audio": "<base64 16 kHz int16 mono>", "final": false}
+        {"session": "car-17", "close": true}
+    Replies echo "session" (and "seq", if sent) with what was heard, the intent and Joey's replies.
+    Decoding and intent recognition run on a bounded thread pool shared by all sessions; each session's
+    requests are handled one at a time, in order. When the pool is backed up, the server stops reading.
+    """
+    def __init__(self, joey, workers=SERVER_WORKERS, max_sessions=SERVER_MAX_SESSIONS, queue_per_worker=SERVER_QUEUE_PER_WORKER):
+        self.joey = joey
+        self.workers = workers
+        self.max_sessions = max_sessions
+        self.queue_limit = workers * queue_per_worker
+        self.sessions = {}
+        self._locks = {} # Per session: keeps its requests in order
+        self._slots = None # Bounds requests in flight; created on the server's event loop
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='joey-server')
+
+    async def start(self, host=SERVER_HOST, port=SERVER_PORT):
+        """Starts listening (port 0 picks a free one) and returns the asyncio server."""
+        self._slots = asyncio.Semaphore(self.queue_limit)
+        server = await asyncio.start_server(self._serve_client, host, port, limit=SERVER_LINE_LIMIT)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"[JOEY] Serving sessions on {host}:{port} with {self.workers} workers.")
+        return server
+
+    async def serve(self, host=SERVER_HOST, port=SERVER_PORT):
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def _serve_client(self, reader, writer):
+        pending = set()
+        try:
+            while line := await reader.readline():
+                await self._slots.acquire() # Backpressure: stop reading while the workers are saturated
+                task = asyncio.create_task(self._answer(line, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            await asyncio.gather(*pending)
+        finally:
+            writer.close()
+
+    async def _answer(self, line, writer):
+        try:
+            message = json.loads(line)
+            reply = await self.handle(message)
+            if 'seq' in message: reply['seq'] = message['seq']
+        except Exception as e:
+            reply = {'error': f"{type(e).__name__}: {e}"}
+        finally:
+            self._slots.release()
+        writer.write((json.dumps(reply, ensure_ascii=False) + '\n').encode('utf-8'))
+        await writer.drain()
+
+    async def handle(self, message):
+        """Handles one request and returns the reply."""
+        session_id = message.get('session')
+        if session_id is None:
+            return {'error': "Every request needs a 'session'."}
+        if message.get('close'):
+            self.close_session(session_id)
+            return {'session': session_id, 'closed': True}
+        if session_id not in self.sessions:
+            if len(self.sessions) >= self.max_sessions:
+                return {'session': session_id, 'error': f"Too many sessions (limit {self.max_sessions})."}
+            self.sessions[session_id] = self.joey.open_session(session_id, message.get('lang', 'en'))
+            self._locks[session_id] = asyncio.Lock()
+        session = self.sessions[session_id]
+        audio = base64.b64decode(message['audio']) if 'audio' in message else None
+        async with self._locks[session_id]:
+            reply = await asyncio.get_running_loop().run_in_executor(
+                self._pool, self._converse, session, message.get('text'), audio, message.get('final', False))
+        if reply.get('closed'): self.close_session(session_id) # The driver said goodbye
+        return reply
+
+    def _converse(self, session, text, audio, final):
+        with self.joey.bind(session):
+            return self.joey.converse(text, audio, final)
+
+    def close_session(self, session_id):
+        session = self.sessions.pop(session_id, None)
+        self._locks.pop(session_id, None)
+        if session is not None: session.close()
+
+    def close(self):
+        for session_id in list(self.sessions):
+            self.close_session(session_id)
+        self._pool.shutdown(wait=False)
 
 # --- Entry Point ---
 if __name__ == "__main__":
-    joey_assistant = Joey()
-
-    joey_assistant.start()
+    parser = argparse.ArgumentParser(description="Joey: your smart in-car AI assistant.")
+    parser.add_argument('--profile-startup', action='store_true', help="Print the wall time of each startup phase.")
+    parser.add_argument('--compile-intents', action='store_true', help=f"Compile the intent model into '{INTENT_MODEL_DIR}' and exit.")
+    parser.add_argument('--command-mode', choices=COMMAND_MODES, default=COMMAND_MODE,
+                        help="Decode fixed commands with a grammar built from the intent table (needs runtime-graph models).")
+    parser.add_argument('--model-policy', choices=MODEL_POLICIES, default=MODEL_POLICY,
+                        help="Which Vosk models stay in memory: both, only the active language, or what fits the budget.")
+    parser.add_argument('--model-budget-mb', type=int, default=MODEL_MEMORY_BUDGET_MB, help="Memory budget for the 'budget' policy.")
+    parser.add_argument('--asr-alternatives', type=int, default=ASR_ALTERNATIVES,
+                        help="Hypotheses per recognizer rescored against the intents (0: longest 1-best transcript wins).")
+    parser.add_argument('--tts-backend', choices=TTS_BACKENDS, default=TTS_BACKEND_HI,
+                        help="Hindi speech: gTTS over the network with espeak-ng as a fallback (default), offline espeak-ng, "
+                             "or auto (espeak-ng when installed).")
+    parser.add_argument('--wake-word', action='store_true', help="Sleep between commands until the driver says 'Hey Joey'.")
+    parser.add_argument('--serve', nargs='?', const=f'{SERVER_HOST}:{SERVER_PORT}', metavar='HOST:PORT',
+                        help="Run headless for many client sessions over a local socket instead of the microphone.")
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS, help="Decoding threads shared by all sessions in server mode.")
+    parser.add_argument('--trace', nargs='?', const=TRACE_FILE, metavar='PATH',
+                        help=f"Record per-turn stage timings as JSON lines (default path: {TRACE_FILE}) and print a summary on exit.")
+    args = parser.parse_args()
+
+    if args.compile_intents:
+        encoder, index = compile_intent_model(INTENTS)
+        print(f"[JOEY] Intent model compiled to '{INTENT_MODEL_DIR}' ({intent_table_hash(INTENTS)[:12]}): "
+              f"{len(encoder.vocabulary)} terms, {len(index.rows)} postings.")
+        sys.exit(0)
+
+    if args.serve:
+        # Every model stays resident and every turn is traced, for the latency summary on exit
+        host, _, port = args.serve.rpartition(':')
+        joey_server = Joey(profile_startup=args.profile_startup, audio_source=ReplaySource(), speech_sink=NullSpeechSink(),
+                           tracer=TurnTracer(enabled=True, path=args.trace), early_commit=False, model_policy='both',
+                           asr_alternatives=args.asr_alternatives)
+        joey_server.serve(host or SERVER_HOST, int(port), args.workers)
+        sys.exit(0)
+
+    joey_assistant = Joey(profile_startup=args.profile_startup, tracer=TurnTracer(path=args.trace) if args.trace else None,
+                          command_mode=args.command_mode, model_policy=args.model_policy, model_budget_mb=args.model_budget_mb,
+                          asr_alternatives=args.asr_alternatives, tts_backend=args.tts_backend)
+
+    joey_assistant.start(wake_word=args.wake_word or None)
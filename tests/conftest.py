@@ -0,0 +1,40 @@
+"""
+Shared fixtures. Joey is built on empty model folders, so the Vosk loads fail in the background;
+everything after speech recognition (intents, handlers, replies) works as usual.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+
+@pytest.fixture(scope='session')
+def workdir(tmp_path_factory):
+    path = tmp_path_factory.mktemp('joey')
+    for model_path in (main.MODEL_EN_PATH, main.MODEL_HI_PATH):
+        (path / model_path).mkdir()
+    return path
+
+
+@pytest.fixture
+def sink():
+    return main.NullSpeechSink()
+
+
+@pytest.fixture
+def joey(workdir, tmp_path, monkeypatch, sink):
+    monkeypatch.chdir(workdir) # The compiled intent model and the speech cache are kept here between tests
+    joey = main.Joey(audio_source=main.ReplaySource(), speech_sink=sink, early_commit=False,
+                     reminder_file=str(tmp_path / 'reminders.json'))
+    yield joey
+    joey.close()
+
+
+def said(joey, sink):
+    """Everything Joey has spoken so far, once the speech queue has drained."""
+    joey.output.wait()
+    return [text for _, text, _ in sink.played]
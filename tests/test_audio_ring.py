@@ -0,0 +1,52 @@
+import queue
+
+import numpy as np
+import pytest
+
+import main
+
+def frames(start, count):
+    return np.arange(start, start + count, dtype=np.int16)
+
+def test_reads_across_the_wrap_point_are_contiguous():
+    ring = main.AudioRing(8)
+    reader = ring.reader('asr')
+    ring.write(frames(0, 6))
+    assert list(reader.read(6)) == list(range(6))
+    ring.write(frames(6, 6)) # Wraps past the end of the buffer
+    view = reader.read(6)
+    assert list(view) == list(range(6, 12))
+    assert view.base is not None # A view into the ring, not a copy
+    assert reader.dropped == 0
+
+def test_lapped_reader_skips_ahead_and_counts_the_loss():
+    ring = main.AudioRing(8)
+    reader = ring.reader('asr')
+    ring.write(frames(0, 6))
+    ring.write(frames(6, 6)) # 12 frames waiting in a ring of 8
+    assert list(reader.read(2)) == [8, 9] # Resumes half the capacity behind the writer
+    assert reader.dropped == 8
+    assert ring.stats() == {'capacity': 8, 'written': 12, 'readers': {'asr': {'occupancy': 2, 'dropped': 8}}}
+
+def test_oversized_write_keeps_the_newest_frames():
+    ring = main.AudioRing(4)
+    reader = ring.reader('asr')
+    ring.write(frames(0, 10))
+    assert ring.written == 4
+    assert list(reader.read(4)) == [6, 7, 8, 9]
+
+def test_readers_are_independent():
+    ring = main.AudioRing(8)
+    first = ring.reader('asr')
+    ring.write(frames(0, 4))
+    second = ring.reader('wake') # Starts at the current write position
+    ring.write(frames(4, 4))
+    assert list(first.read(8)) == list(range(8))
+    assert list(second.read(4)) == [4, 5, 6, 7]
+
+def test_read_times_out():
+    ring = main.AudioRing(8)
+    reader = ring.reader('asr')
+    ring.write(frames(0, 2))
+    with pytest.raises(queue.Empty):
+        reader.read(4, timeout=0.01)
@@ -0,0 +1,40 @@
+import pytest
+
+import main
+from conftest import said
+
+
+def test_conjunctions_split_commands():
+    assert main.compound_pieces('turn on the ac and play music') == [('', 'turn on the ac'), ('and', 'play music')]
+    assert main.compound_pieces('turn on the ac, play music') == [('', 'turn on the ac'), ('', 'play music')]
+    assert main.compound_pieces('एसी चलाओ और गाना चलाओ') == [('', 'एसी चलाओ'), ('और', 'गाना चलाओ')]
+
+
+@pytest.mark.parametrize('text', ['remind me in one hour and ten minutes to call mom',
+                                  'मुझे याद दिलाओ एक घंटे और दस मिनट में दवाई लेना'])
+def test_conjunction_inside_a_duration_does_not_split(text):
+    assert main.compound_pieces(text) == [('', text)]
+
+
+def test_command_after_a_duration_still_splits():
+    assert main.compound_pieces('remind me in ten minutes to call mom and turn on the ac') == [
+        ('', 'remind me in ten minutes to call mom'), ('and', 'turn on the ac')]
+
+
+@pytest.mark.parametrize('text, lang, task', [
+    ('remind me in one hour and ten minutes to call mom', 'en', 'call mom'),
+    ('मुझे याद दिलाओ एक घंटे और दस मिनट में दवाई लेना', 'hi', 'दवाई लेना'),
+])
+def test_reminder_with_compound_duration_is_one_command(joey, sink, text, lang, task):
+    joey.active_language = lang
+    assert not joey.split_compound(text)
+    joey.handle_command(text)
+    [reminder] = joey.reminder_store.reminders.values()
+    assert reminder['task'] == task
+    assert reminder['due'] == pytest.approx(main.time.time() + 4200, abs=5)
+    assert said(joey, sink) == [joey.responses['set_reminder'][lang].format(entity=task, when=main.describe_duration(4200, lang))]
+
+
+def test_compound_command_merges_replies(joey, sink):
+    joey.handle_command('what time is it and tell me the weather')
+    assert len(said(joey, sink)) == 1
@@ -0,0 +1,38 @@
+import time
+
+import pytest
+
+import main
+from conftest import said
+
+@pytest.fixture
+def early(joey):
+    joey.early_commit = main.EarlyCommit(lambda text: (None, 0.0))
+    return joey
+
+def reply(joey, *intents):
+    return ' '.join(joey.responses[intent]['en'] for intent in intents)
+
+def test_reply_waits_for_the_end_of_the_command(early, sink):
+    early._commit_early('volume_up')
+    assert said(early, sink) == [] # Acted on, but Joey doesn't talk over the driver
+    early.handle_command('volume up')
+    assert said(early, sink) == [reply(early, 'volume_up')]
+
+def test_car_command_confirmation_waits_too(early, sink):
+    early._commit_early('headlights_on')
+    time.sleep(0.3) # The car acknowledges within a bus cycle or two
+    assert said(early, sink) == []
+    assert early.vehicle.bus.state['headlights_on'] == 1
+    early.handle_command('headlights on')
+    assert said(early, sink) == [reply(early, 'headlights_on')]
+
+def test_wrong_early_commit_is_rolled_back(early, sink):
+    early._commit_early('volume_up')
+    early.handle_command('play music')
+    assert said(early, sink) == [reply(early, 'volume_up', 'volume_down', 'play_music')]
+
+def test_early_commit_joins_the_compound_reply(early, sink):
+    early._commit_early('volume_up')
+    early.handle_command('volume up and play music')
+    assert said(early, sink) == [reply(early, 'volume_up', 'play_music')]
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+import main
+
+QUERIES = ['turn on the ac please', 'what is the weather like', 'play some music', 'hindi mein bolo', 'गाना चलाओ',
+           'remind me to call mom', 'headlights', 'xyzzy']
+
+@pytest.fixture(scope='module')
+def table():
+    corpus, intent_map = main.build_corpus(main.INTENTS)
+    vectorizer = TfidfVectorizer()
+    vectors = vectorizer.fit_transform(corpus)
+    return corpus, intent_map, vectorizer, vectors, main.IntentIndex.from_matrix(vectors, intent_map)
+
+def dense_top_k(similarities, intent_map, k):
+    """The old linear scan: every phrase scored, each intent by its best phrase (the earliest on a tie)."""
+    best = {}
+    for row in np.argsort(-similarities, kind='stable'):
+        if similarities[row] > 0: best.setdefault(intent_map[row], similarities[row])
+    return list(best.items())[:k]
+
+def test_top_k_matches_the_dense_scan(table):
+    corpus, intent_map, vectorizer, vectors, index = table
+    for query in corpus[::7] + QUERIES:
+        vector = vectorizer.transform([query])
+        expected = dense_top_k(cosine_similarity(vector, vectors)[0], intent_map, 5)
+        found = [(intent, score) for intent, score, _ in index.top_k(vector.indices, vector.data, 5)]
+        assert [score for _, score in found] == pytest.approx([score for _, score in expected])
+        # Equal scores may be ranked either way; distinct ones must agree on the intent
+        for (intent, score), (expected_intent, _) in zip(found, expected):
+            if sum(abs(score - other) < 1e-9 for _, other in expected) == 1:
+                assert intent == expected_intent
+
+def test_top_k_row_is_the_best_phrase(table):
+    corpus, intent_map, vectorizer, vectors, index = table
+    vector = vectorizer.transform(['play some music'])
+    for intent, score, row in index.top_k(vector.indices, vector.data):
+        assert intent_map[row] == intent
+        assert cosine_similarity(vector, vectors[row])[0, 0] == pytest.approx(score)
+
+def test_best_batch_matches_top_k():
+    encoder, index = main.compile_intent_model(main.INTENTS, path=None)
+    query_ptr, term_ids, weights = encoder.transform_batch(QUERIES)
+    for query, best in zip(QUERIES, index.best_batch(query_ptr, term_ids, weights)):
+        top = index.top_k(*encoder.transform(query), 1)
+        assert best == ((top[0][0], pytest.approx(top[0][1])) if top else (None, 0.0))
+
+def test_unknown_words_match_nothing(table):
+    *_, index = table
+    assert index.top_k(np.empty(0, dtype=np.int64), np.empty(0)) == []
+    assert index.best_batch(np.array([0, 0]), np.empty(0, dtype=np.int64), np.empty(0)) == [(None, 0.0)]
+
+def test_intent_table_hash():
+    intents = {'greet': ['hello', 'hi there'], 'bye': ['goodbye']}
+    digest = main.intent_table_hash(intents)
+    assert digest == main.intent_table_hash({'greet': ['hello', 'hi there'], 'bye': ['goodbye']})
+    assert digest != main.intent_table_hash({'greet': ['hello', 'hi there'], 'bye': ['goodbye', 'see you']})
+    assert digest != main.intent_table_hash({'greet': ['hello', 'hi there'], 'farewell': ['goodbye']})
+    assert digest != main.intent_table_hash(intents, dict(main.VECTORIZER_SETTINGS, sublinear_tf=True))
+
+def test_compiled_model_reloads_memory_mapped(tmp_path):
+    path = str(tmp_path / 'intent_model')
+    encoder, index = main.compile_intent_model(main.INTENTS, path)
+    loaded = main.load_intent_model(main.INTENTS, path)
+    assert loaded is not None
+    loaded_encoder, loaded_index = loaded
+    assert isinstance(loaded_index.weights, np.memmap)
+    for query in QUERIES:
+        assert loaded_index.top_k(*loaded_encoder.transform(query)) == index.top_k(*encoder.transform(query))
+
+def test_stale_or_missing_model_is_not_loaded(tmp_path):
+    path = str(tmp_path / 'intent_model')
+    assert main.load_intent_model(main.INTENTS, path) is None
+    main.compile_intent_model(main.INTENTS, path)
+    changed = dict(main.INTENTS, greet=main.INTENTS.get('greet', []) + ['namaskar joey'])
+    assert main.load_intent_model(changed, path) is None
+    (tmp_path / 'intent_model' / 'meta.json').write_text('{not json', encoding='utf-8')
+    assert main.load_intent_model(main.INTENTS, path) is None
@@ -0,0 +1,27 @@
+import pytest
+
+import main
+
+@pytest.mark.parametrize('devanagari, roman', [
+    ('हिंदी में बोलो', 'hindi mein bolo'),
+    ('गाना चलाओ', 'gaana chalao'),
+    ('अच्छा', 'accha'),
+    ('ज़रा', 'jara'), # Nukta folded
+    ('नमस्ते।', 'namaste'), # Danda dropped
+])
+def test_devanagari_and_roman_hindi_coincide(devanagari, roman):
+    assert main.normalize_text(devanagari) == main.normalize_text(roman)
+
+@pytest.mark.parametrize('text, expected', [
+    ('कमरा', 'kamra'), # Schwa deleted in the middle of the word...
+    ('गाना', 'gana'), # ...and at its end
+    ('१२ बजे', '12 baje'),
+    ('Hello, Joey!', 'helo joey'),
+    ('phone karo', 'fone karo'),
+])
+def test_normalize_text(text, expected):
+    assert main.normalize_text(text) == expected
+
+def test_spelling_variants_fold():
+    assert main.normalize_text('gaana') == main.normalize_text('gana')
+    assert main.normalize_text('zaroor') == main.normalize_text('jarur')
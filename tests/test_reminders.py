@@ -0,0 +1,65 @@
+import pytest
+
+import main
+from conftest import said
+
+
+@pytest.mark.parametrize('text, seconds, rest', [
+    ('call mom in 10 minutes', 600, 'call mom'),
+    ('in twenty five minutes to take medicine', 1500, 'take medicine'),
+    ('in one hour thirty minutes stretch', 5400, 'stretch'),
+    ('in an hour and ten minutes call mom', 4200, 'call mom'),
+    ('2 hours 15 minutes 10 seconds from now check oil', 8110, 'check oil'),
+    ('एक घंटे और दस मिनट में दवाई लेना', 4200, 'दवाई लेना'),
+    ('डेढ़ घंटे बाद मीटिंग', 5400, 'मीटिंग'),
+    ('aadhe ghante baad chai', 1800, 'chai'),
+    ('buy milk', None, 'buy milk'),
+])
+def test_parse_duration(text, seconds, rest):
+    assert main.parse_duration(text) == (seconds, rest)
+
+
+def reminders(joey):
+    return sorted((reminder['task'], round(reminder['due'] - main.time.time())) for reminder in joey.reminder_store.reminders.values())
+
+
+@pytest.mark.parametrize('text, task, seconds', [
+    ('remind me in one hour thirty minutes to stretch', 'stretch', 5400),
+    ('remind me in one hour and ten minutes to call mom', 'call mom', 4200),
+    ('मुझे याद दिलाओ एक घंटे और दस मिनट में दवाई लेना', 'दवाई लेना', 4200),
+])
+def test_compound_durations_through_handle_command(joey, text, task, seconds):
+    joey.handle_command(text)
+    assert reminders(joey) == [(task, pytest.approx(seconds, abs=2))]
+    assert joey.context == {}
+
+
+def test_missing_time_is_asked_for(joey, sink):
+    joey.handle_command('remind me')
+    joey.handle_command('stretch')
+    joey.handle_command('in one hour thirty minutes')
+    assert reminders(joey) == [('stretch', pytest.approx(5400, abs=2))]
+    assert said(joey, sink)[:2] == [joey.responses['set_reminder_prompt']['en'], joey.responses['set_reminder_when']['en']]
+
+
+def test_time_given_for_the_task_is_kept(joey, sink):
+    joey.handle_command('remind me')
+    joey.handle_command('एक घंटे और दस मिनट में')
+    assert joey.context['delay'] == 4200
+    joey.handle_command('दवाई लेना')
+    assert reminders(joey) == [('दवाई लेना', pytest.approx(4200, abs=2))]
+    assert said(joey, sink)[:2] == [joey.responses['set_reminder_prompt']['en']] * 2
+
+
+def test_second_unusable_answer_gives_up(joey):
+    joey.handle_command('remind me')
+    joey.handle_command('in five minutes')
+    joey.handle_command('in ten minutes')
+    assert reminders(joey) == []
+    assert joey.context == {}
+
+
+def test_reminders_survive_a_restart(joey, tmp_path):
+    joey.handle_command('remind me in ten minutes to call mom')
+    store = main.ReminderStore(str(tmp_path / 'reminders.json'))
+    assert [reminder['task'] for reminder in store.reminders.values()] == ['call mom']
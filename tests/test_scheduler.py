@@ -0,0 +1,52 @@
+import json
+import threading
+import time
+
+import pytest
+
+import main
+
+@pytest.fixture
+def scheduler():
+    scheduler = main.Scheduler()
+    yield scheduler
+    scheduler.close()
+
+def test_jobs_run_in_time_order(scheduler):
+    ran, done = [], threading.Event()
+    scheduler.call_later(0.06, lambda: (ran.append('late'), done.set()))
+    scheduler.call_later(0.02, ran.append, 'early') # Added after, due before
+    scheduler.call_at(time.time() - 1, ran.append, 'overdue')
+    assert done.wait(1.0)
+    assert ran == ['overdue', 'early', 'late']
+
+def test_cancelled_job_does_not_run(scheduler):
+    ran, done = [], threading.Event()
+    job = scheduler.call_later(0.02, ran.append, 'cancelled')
+    scheduler.call_later(0.04, done.set)
+    scheduler.cancel(job)
+    assert done.wait(1.0)
+    assert ran == []
+
+def test_failing_job_does_not_stop_the_scheduler(scheduler):
+    done = threading.Event()
+    scheduler.call_later(0.0, lambda: 1 / 0)
+    scheduler.call_later(0.02, done.set)
+    assert done.wait(1.0)
+
+def test_reminder_store_persists(tmp_path):
+    path = str(tmp_path / 'reminders.json')
+    store = main.ReminderStore(path)
+    first = store.add(2000.0, 'call mom', 'en')
+    second = store.add(1000.0, 'दवाई लेना', 'hi')
+    assert (first['id'], second['id']) == (1, 2)
+    with open(path, encoding='utf-8') as f:
+        assert [reminder['task'] for reminder in json.load(f)] == ['दवाई लेना', 'call mom'] # Soonest first
+    store.remove(first['id'])
+    assert main.ReminderStore(path).reminders == {2: second}
+    assert main.ReminderStore(path).add(3000.0, 'fuel up', 'en')['id'] == 3
+
+def test_unreadable_reminder_file_starts_empty(tmp_path):
+    path = tmp_path / 'reminders.json'
+    path.write_text('[{"due": 1}', encoding='utf-8')
+    assert main.ReminderStore(str(path)).reminders == {}
@@ -0,0 +1,44 @@
+import gtts
+import pytest
+
+import main
+
+class SlowNetwork(Exception):
+    pass
+
+def test_gtts_gives_up_on_a_slow_network(monkeypatch):
+    timeouts = []
+    def hanging_gtts(*args, timeout=None, **kwargs):
+        timeouts.append(timeout)
+        raise SlowNetwork('read timed out')
+    monkeypatch.setattr(gtts, 'gTTS', hanging_gtts)
+    with pytest.raises(SlowNetwork):
+        main.GTTSBackend().render('नमस्ते')
+    assert timeouts == [main.TTS_NETWORK_TIMEOUT]
+
+def test_slow_gtts_falls_back_to_the_next_backend(joey, monkeypatch):
+    class Offline:
+        name, voice, format, cacheable = 'offline', 'hi', 'wav', False
+        def render(self, text):
+            return b'RIFF'
+    def slow_render(self, text):
+        raise SlowNetwork('read timed out')
+    monkeypatch.setattr(main.GTTSBackend, 'render', slow_render)
+    monkeypatch.setattr(joey, 'tts_hi', [main.GTTSBackend(), Offline()])
+    assert joey._render_hindi('कोई नया जवाब') == (b'RIFF', 'wav')
+
+def streamed_wav(payload):
+    """A WAV as espeak-ng writes it to a pipe: both chunk sizes left as 0xFFFFFFFF placeholders."""
+    fmt = b'fmt ' + (16).to_bytes(4, 'little') + bytes(16)
+    return b'RIFF' + b'\xff' * 4 + b'WAVE' + fmt + b'data' + b'\xff' * 4 + payload
+
+def test_fix_wav_sizes():
+    fixed = main.fix_wav_sizes(streamed_wav(b'\x01\x02' * 50))
+    assert int.from_bytes(fixed[4:8], 'little') == len(fixed) - 8
+    marker = fixed.find(b'data')
+    assert int.from_bytes(fixed[marker + 4:marker + 8], 'little') == 100
+    assert fixed[marker + 8:] == b'\x01\x02' * 50
+
+def test_fix_wav_sizes_leaves_other_data_alone():
+    assert main.fix_wav_sizes(b'ID3 not a wav') == b'ID3 not a wav'
+    assert main.fix_wav_sizes(b'RIFF\x00\x00\x00\x00WAVE') == b'RIFF\x00\x00\x00\x00WAVE' # No data chunk
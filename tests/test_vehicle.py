@@ -0,0 +1,25 @@
+import time
+
+import main
+from conftest import said
+
+def test_actuator_confirmation_is_spoken(joey, sink):
+    joey.handle_command('headlights on') # Returns at once; the confirmation follows the car's acknowledgement
+    deadline = time.monotonic() + main.VEHICLE_ACK_TIMEOUT
+    while not sink.played and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert said(joey, sink) == [joey.responses['headlights_on']['en']]
+    assert joey.vehicle.bus.state['headlights_on'] == 1
+
+def test_compound_command_merges_actuator_confirmations(joey, sink):
+    joey.handle_command('headlights on and turn ac on')
+    replies = said(joey, sink)
+    assert len(replies) == 1 # Both confirmations, in one reply
+    assert joey.responses['headlights_on']['en'] in replies[0]
+    assert joey.responses['turn_ac_on']['en'] in replies[0]
+
+def test_unacknowledged_command_times_out(joey, sink, monkeypatch):
+    monkeypatch.setattr(main, 'VEHICLE_ACK_TIMEOUT', 0.05)
+    monkeypatch.setattr(joey.vehicle.bus, 'send', lambda frame: None) # The car never hears it
+    joey.handle_command('headlights on and turn ac on')
+    assert said(joey, sink) == [' '.join([joey.responses['vehicle_no_ack']['en']] * 2)]